@@ -41,6 +41,47 @@ async function loadCsv(path) {
   return parsed.data;
 }
 
+let manifestPromise = null;
+
+function loadManifest() {
+  if (!manifestPromise) {
+    // The manifest is tiny and must be fresh; the bundles it points to are
+    // versioned by content hash and can come straight from the browser cache.
+    manifestPromise = fetch(`${REMOTE_BASE}/players/manifest.json`, { cache: 'no-cache' })
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return manifestPromise;
+}
+
+function expandTable(table) {
+  if (!table || !Array.isArray(table.columns)) return [];
+  return table.rows.map((row) => {
+    const record = {};
+    table.columns.forEach((column, index) => {
+      record[column] = row[index] ?? '';
+    });
+    return record;
+  });
+}
+
+async function loadBundle(uid) {
+  const manifest = await loadManifest();
+  const entry = manifest && manifest.players && manifest.players[uid];
+  if (!entry) return null;
+  const response = await fetch(`${REMOTE_BASE}/${entry.path}?v=${entry.hash}`);
+  if (!response.ok) return null;
+  return response.json();
+}
+
+function findLatestSummaryRow(summary, latest) {
+  const fallbackRow =
+    summary.find((row) => row.Month === 'ALL') || summary[summary.length - 1] || null;
+  return latest
+    ? summary.find((row) => row.Month === latest.monthName && row.Year === latest.year) || fallbackRow
+    : fallbackRow;
+}
+
 function formatNumber(value) {
   if (value === null || value === undefined || value === '') return '-';
   const num = Number(value);
@@ -87,6 +128,14 @@ function createSection(player) {
     <div class="chart-wrapper">
       <div id="chart-${player.uid}" class="chart"></div>
     </div>
+    <div class="chart-controls" id="history-controls-${player.uid}" hidden>
+      <button type="button" data-level="daily">Recent (daily)</button>
+      <button type="button" data-level="weekly">Weekly</button>
+      <button type="button" data-level="monthly">All time (monthly)</button>
+    </div>
+    <div class="chart-wrapper">
+      <div id="history-chart-${player.uid}" class="chart" hidden></div>
+    </div>
     <h3>Likes Activity</h3>
     <div class="table-wrapper">
       <table class="table" id="likes-table-${player.uid}">
@@ -218,7 +267,93 @@ function renderChart(uid, series, monthLabel) {
   chart.render();
 }
 
+const HISTORY_TITLES = {
+  daily: 'Recent daily XP',
+  weekly: 'Weekly XP (end of week)',
+  monthly: 'All-time XP (end of month)',
+};
+
+async function loadHistory(uid) {
+  const manifest = await loadManifest();
+  const entry = manifest && manifest.players && manifest.players[uid];
+  if (!entry || !entry.history) return null;
+  const response = await fetch(`${REMOTE_BASE}/${entry.history.path}?v=${entry.history.hash}`);
+  if (!response.ok) return null;
+  return response.json();
+}
+
+function renderHistory(uid, history) {
+  const controls = document.getElementById(`history-controls-${uid}`);
+  const target = document.getElementById(`history-chart-${uid}`);
+  if (!history || !history.levels) return;
+
+  // Every level is already downsampled to a fixed point budget, so switching
+  // between them costs the same whatever the length of the player's history.
+  let chart = null;
+  const show = (level) => {
+    const points = (history.levels[level] && history.levels[level].xp) || [];
+    controls.querySelectorAll('button').forEach((button) => {
+      button.classList.toggle('is-active', button.dataset.level === level);
+    });
+    const options = {
+      chart: {
+        type: 'line',
+        height: 320,
+        toolbar: { show: false },
+        fontFamily: 'Inter, sans-serif',
+        foreColor: '#e2e8f0',
+      },
+      stroke: { width: 2, curve: 'straight' },
+      dataLabels: { enabled: false },
+      colors: ['#38bdf8'],
+      series: [{ name: 'XP', data: points.map(([date, xp]) => ({ x: date, y: xp })) }],
+      xaxis: { type: 'datetime', labels: { style: { colors: '#94a3b8' } } },
+      yaxis: {
+        labels: {
+          formatter: (value) => Number(value).toLocaleString(),
+          style: { colors: '#94a3b8' },
+        },
+      },
+      tooltip: { theme: 'dark', y: { formatter: (value) => Number(value).toLocaleString() } },
+      title: {
+        text: HISTORY_TITLES[level] || 'XP history',
+        style: { fontSize: '16px', color: '#e2e8f0' },
+      },
+    };
+    if (chart) chart.destroy();
+    chart = new ApexCharts(target, options);
+    chart.render();
+  };
+
+  controls.hidden = false;
+  target.hidden = false;
+  controls.querySelectorAll('button').forEach((button) => {
+    button.addEventListener('click', () => show(button.dataset.level));
+  });
+  show('monthly');
+}
+
+async function loadPlayerFromBundle(uid) {
+  const bundle = await loadBundle(uid).catch(() => null);
+  if (!bundle) return null;
+
+  const summary = expandTable(bundle.summary);
+  const latest = bundle.latestMonth;
+  return {
+    summary,
+    likes: expandTable(bundle.likes),
+    dailySeries: latest
+      ? (latest.series || []).map(([date, xp]) => ({ date, xp: Number(xp) }))
+      : [],
+    monthLabel: latest ? `${latest.monthName} ${latest.year}` : '',
+    latestSummaryRow: findLatestSummaryRow(summary, latest),
+  };
+}
+
 async function loadPlayer(uid) {
+  const bundled = await loadPlayerFromBundle(uid);
+  if (bundled) return bundled;
+
   const summary = await loadCsv(`${REMOTE_BASE}/players/${uid}/summary.csv`);
   const likes = await loadCsv(`${REMOTE_BASE}/players/${uid}/likes_activity.csv`).catch(() => []);
 
@@ -242,18 +377,12 @@ async function loadPlayer(uid) {
     }
   }
 
-  const fallbackRow =
-    summary.find((row) => row.Month === 'ALL') || summary[summary.length - 1] || null;
-  const latestSummaryRow = latest
-    ? summary.find((row) => row.Month === latest.monthName && row.Year === latest.year) || fallbackRow
-    : fallbackRow;
-
   return {
     summary,
     likes,
     dailySeries,
     monthLabel,
-    latestSummaryRow,
+    latestSummaryRow: findLatestSummaryRow(summary, latest),
   };
 }
 
@@ -271,9 +400,13 @@ async function init() {
     container.appendChild(section);
   });
 
-  for (const player of PLAYERS) {
+  // Load every player in parallel; rendering still happens in roster order.
+  const loads = PLAYERS.map((player) => loadPlayer(player.uid).catch((error) => ({ error })));
+  const histories = PLAYERS.map((player) => loadHistory(player.uid).catch(() => null));
+  for (const [index, player] of PLAYERS.entries()) {
     try {
-      const data = await loadPlayer(player.uid);
+      const data = await loads[index];
+      if (data.error) throw data.error;
       const summaryRow =
         data.latestSummaryRow ||
         data.summary.find((row) => row.Month === 'ALL') ||
@@ -282,6 +415,7 @@ async function init() {
       populateCards(player.uid, summaryRow);
       populateLikesTable(player.uid, data.likes);
       renderChart(player.uid, data.dailySeries, data.monthLabel || 'latest month');
+      renderHistory(player.uid, await histories[index]);
       setBadge(player.uid, `Latest month: ${data.monthLabel || 'N/A'}`);
     } catch (error) {
       console.error(`Failed to render player ${player.uid}:`, error);
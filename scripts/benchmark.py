@@ -0,0 +1,337 @@
+"""End-to-end benchmarks of the logging scripts against synthetic player trees.
+
+``run`` copies the ``scripts`` package into a scratch project, generates
+``N`` UIDs x ``M`` years of monthly CSVs and likes logs there, and times the
+hot paths in a child process against ``scripts/stub_api.py``. The stub runs
+in the parent and its URL reaches the child only through
+``FREEFIRE_API_BASE_URL`` / ``FREEFIRE_LIKES_API_BASE_URL``; the child refuses
+to time anything unless ``scripts.config`` resolved to the stub, so a
+benchmark can never reach the real APIs. The results are written as JSON so
+two commits can be compared with ``compare``.
+
+Usage::
+
+    python -m scripts.benchmark run [--uids N] [--years M] [--repeat R] [--output FILE]
+    python -m scripts.benchmark generate DIR [--uids N] [--years M]
+    python -m scripts.benchmark compare BASE.json NEW.json
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.player_history import MONTHLY_HEADER
+from scripts.stub_api import StubConfig, start_server
+from scripts.timeseries_store import format_day
+
+RESULTS_VERSION = 1
+STUB_URL_PREFIX = "http://127.0.0.1:"
+FIRST_UID = 1_000_000_000
+LIKES_LOG_HEADER = ["Date", "Likes Before", "Likes After", "Likes Received", "Success"]
+SOURCE_HEADER = ["UID", "Date", "XP", "XP Gained", "Notes"]
+
+
+def synthetic_uids(count: int) -> List[str]:
+    return [str(FIRST_UID + index) for index in range(count)]
+
+
+def write_rows(path: Path, header: List[str], rows: List[List[object]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate_player(
+    player_dir: Path, days: List[date], rng: random.Random
+) -> List[List[object]]:
+    """Write one player's monthly CSVs and likes log; return its backfill source rows."""
+    months: Dict[Tuple[int, int], List[List[object]]] = {}
+    likes_rows: List[List[object]] = []
+    source_rows: List[List[object]] = []
+    xp = rng.randint(1_000_000, 5_000_000)
+    br = rng.randint(1_000, 4_000)
+    likes = rng.randint(1_000, 100_000)
+    for day in days:
+        xp_gained = rng.randint(0, 40_000)
+        rank_gained = rng.randint(-50, 120)
+        likes_gained = rng.randint(0, 300)
+        xp += xp_gained
+        br += rank_gained
+        likes += likes_gained
+        notes = "Double XP Card Activated" if rng.random() < 0.1 else ""
+        date_str = format_day(day.toordinal())
+        months.setdefault((day.year, day.month), []).append(
+            [date_str, br, rank_gained or "", likes, likes_gained or "", xp, xp_gained or "", notes]
+        )
+        source_rows.append([player_dir.name, date_str, xp, xp_gained or "", notes])
+
+        roll = rng.random()
+        success = "TRUE" if roll < 0.8 else ("true" if roll < 0.85 else "FALSE")
+        received = 100 if success != "FALSE" else 0
+        likes_rows.append([day.isoformat(), likes, likes + received, received, success])
+
+    for (year, month), rows in months.items():
+        write_rows(player_dir / f"{year} {month:02d}.CSV", MONTHLY_HEADER, rows)
+    write_rows(player_dir / "likes_activity.csv", LIKES_LOG_HEADER, likes_rows)
+    return source_rows
+
+
+def generate_corpus(root: Path, uids: int, years: int, seed: int = 0) -> List[str]:
+    """Create ``root/players/<uid>/`` trees and ``root/old_data.csv`` ending yesterday."""
+    rng = random.Random(seed)
+    today = date.today()
+    first = today - timedelta(days=365 * years)
+    days = [first + timedelta(days=offset) for offset in range((today - first).days)]
+    source_rows: List[List[object]] = []
+    names = synthetic_uids(uids)
+    for uid in names:
+        source_rows.extend(generate_player(root / "players" / uid, days, rng))
+    write_rows(root / "old_data.csv", SOURCE_HEADER, source_rows)
+    return names
+
+
+def timed(
+    run: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None
+) -> Dict[str, object]:
+    runs: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs": [round(value, 6) for value in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+    }
+
+
+def require_stub_urls() -> None:
+    """Exit unless ``scripts.config`` points both APIs at the parent's loopback stub."""
+    from scripts import config
+
+    expected = os.environ.get("FREEFIRE_API_BASE_URL", "")
+    if not expected.startswith(STUB_URL_PREFIX):
+        raise SystemExit(f"Refusing to benchmark: FREEFIRE_API_BASE_URL is {expected!r}, not the stub")
+    for name, value, wanted in (
+        ("API_BASE_URL", config.API_BASE_URL, expected),
+        ("LIKES_API_BASE_URL", config.LIKES_API_BASE_URL, f"{expected}/api/sg"),
+    ):
+        if value != wanted:
+            raise SystemExit(f"Refusing to benchmark: config.{name} is {value!r}, expected {wanted!r}")
+
+
+def run_suite(root: Path, uids: List[str], repeat: int, workers: int) -> Dict[str, Dict[str, object]]:
+    """Time each stage inside the scratch project at ``root`` (run in the child process)."""
+    from scripts import cleanup_likes_log, fetch_and_append, generate_old_csvs, send_likes
+
+    results: Dict[str, Dict[str, object]] = {}
+    players = root / "players"
+
+    results["load_last_logged_entry"] = timed(
+        lambda: [fetch_and_append.load_last_logged_entry(uid) for uid in uids], repeat
+    )
+    results["update_summary_full"] = timed(
+        lambda: [fetch_and_append.update_summary(uid, full_rebuild=True) for uid in uids], repeat
+    )
+    results["update_summary_cached"] = timed(
+        lambda: [fetch_and_append.update_summary(uid) for uid in uids], repeat
+    )
+
+    logs = [players / uid / "likes_activity.csv" for uid in uids]
+    pristine = {path: path.read_bytes() for path in logs}
+
+    def restore_logs() -> None:
+        for path, data in pristine.items():
+            path.write_bytes(data)
+
+    results["clean_likes_log"] = timed(
+        lambda: [cleanup_likes_log.clean_likes_log(path) for path in logs], repeat, restore_logs
+    )
+    results["clean_likes_log_incremental"] = timed(
+        lambda: [cleanup_likes_log.clean_likes_log(path, incremental=True) for path in logs], repeat
+    )
+
+    # The first run appends today's row for every UID; later runs find it already logged.
+    results["fetch_main"] = timed(lambda: fetch_and_append.main([]), 1)
+    results["fetch_main_noop"] = timed(lambda: fetch_and_append.main([]), repeat)
+    results["send_likes_main"] = timed(lambda: send_likes.main([]), 1)
+    results["send_likes_main_noop"] = timed(lambda: send_likes.main([]), repeat)
+
+    results["generate_old_csvs"] = timed(
+        lambda: generate_old_csvs.main([str(root / "old_data.csv"), "--workers", str(workers)]),
+        repeat,
+    )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="ff-bench-") as tmp:
+        root = Path(tmp)
+        shutil.copytree(SCRIPT_DIR, root / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+        started = time.perf_counter()
+        uids = generate_corpus(root, args.uids, args.years, args.seed)
+        generated = time.perf_counter() - started
+        print(f"Generated {len(uids)} player(s) x {args.years} year(s) in {generated:.2f}s.")
+
+        results_path = root / "results.json"
+        server, base_url = start_server(StubConfig(latency=args.latency))
+        env = {
+            **os.environ,
+            "FREEFIRE_API_BASE_URL": base_url,
+            "FREEFIRE_LIKES_API_BASE_URL": f"{base_url}/api/sg",
+            "FREEFIRE_UIDS": ",".join(uids),
+            "FREEFIRE_LIKES_UIDS": ",".join(uids),
+            "FREEFIRE_FETCH_WORKERS": str(args.workers),
+            "FREEFIRE_HTTP_RATE": "0",
+            "FREEFIRE_INFO_CACHE": "0",
+            "FREEFIRE_STORAGE": "csv",
+            "FREEFIRE_LIKES_RETRY_ROUNDS": "0",
+        }
+        env.pop("FREEFIRE_UID", None)
+        command = [
+            sys.executable,
+            "-m",
+            "scripts.benchmark",
+            "inner",
+            str(results_path),
+            "--repeat",
+            str(args.repeat),
+            "--workers",
+            str(args.workers),
+        ]
+        output = None if args.verbose else subprocess.DEVNULL
+        try:
+            subprocess.run(command, cwd=root, env=env, stdout=output, check=True)
+        finally:
+            server.shutdown()
+        results = json.loads(results_path.read_text(encoding="utf-8"))
+
+    return {
+        "version": RESULTS_VERSION,
+        "label": args.label,
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "uids": args.uids,
+            "years": args.years,
+            "repeat": args.repeat,
+            "workers": args.workers,
+            "seed": args.seed,
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, object], new: Dict[str, object]) -> None:
+    print(f"{'benchmark':<30} {'base':>10} {'new':>10} {'change':>9}")
+    base_results = base.get("results", {})
+    for name, stats in new.get("results", {}).items():
+        if name not in base_results:
+            print(f"{name:<30} {'-':>10} {stats['median']:>9.3f}s {'new':>9}")
+            continue
+        before = base_results[name]["median"]
+        after = stats["median"]
+        change = (after - before) / before if before else 0.0
+        print(f"{name:<30} {before:>9.3f}s {after:>9.3f}s {change:>+8.1%}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_corpus_args(target: argparse.ArgumentParser) -> None:
+        target.add_argument("--uids", type=int, default=20, help="number of synthetic players")
+        target.add_argument("--years", type=int, default=2, help="years of daily history each")
+        target.add_argument("--seed", type=int, default=0, help="random seed for the corpus")
+
+    run_parser = sub.add_parser("run", help="generate a corpus and time every stage")
+    add_corpus_args(run_parser)
+    run_parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    run_parser.add_argument("--workers", type=int, default=4, help="fetch/backfill workers")
+    run_parser.add_argument("--latency", default="none", help="stub API latency spec, e.g. uniform:0.01:0.05")
+    run_parser.add_argument("--label", default="", help="free-form label stored in the output")
+    run_parser.add_argument("--output", type=Path, help="write the JSON results here")
+    run_parser.add_argument("--verbose", action="store_true", help="show the scripts' output")
+
+    generate_parser = sub.add_parser("generate", help="only write a synthetic corpus")
+    generate_parser.add_argument("directory", type=Path)
+    add_corpus_args(generate_parser)
+
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("base", type=Path)
+    compare_parser.add_argument("new", type=Path)
+
+    inner_parser = sub.add_parser("inner", help=argparse.SUPPRESS)
+    inner_parser.add_argument("output", type=Path)
+    inner_parser.add_argument("--repeat", type=int, default=3)
+    inner_parser.add_argument("--workers", type=int, default=4)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.command == "generate":
+        uids = generate_corpus(args.directory, args.uids, args.years, args.seed)
+        print(f"Wrote {len(uids)} synthetic player(s) to {args.directory / 'players'}.")
+    elif args.command == "compare":
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        compare(base, new)
+    elif args.command == "inner":
+        require_stub_urls()
+        uids = [uid for uid in os.environ["FREEFIRE_UIDS"].split(",") if uid]
+        results = run_suite(PROJECT_ROOT, uids, args.repeat, args.workers)
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    else:
+        payload = run_benchmarks(args)
+        text = json.dumps(payload, indent=2, sort_keys=True)
+        if args.output:
+            args.output.write_text(text + "\n", encoding="utf-8")
+            print(f"Wrote results to {args.output}.")
+        for name, stats in payload["results"].items():
+            print(f"{name:<30} median {stats['median']:.3f}s  min {stats['min']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 """Prune unsuccessful entries from the likes activity logs."""
 from __future__ import annotations
 
+import argparse
 import csv
 import os
 import sys
-import shutil
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -15,6 +15,15 @@ if str(PROJECT_ROOT) not in sys.path:
 PLAYERS_DIR = PROJECT_ROOT / "players"
 
 from scripts.config import DEFAULT_LIKES_UIDS, parse_uid_list
+from scripts.dashboard_bundle import write_bundle
+from scripts.metrics import write_reports
+from scripts.player_history import cell, column_positions, open_records
+from scripts.player_state import load_state, update_section
+from scripts.profiling import add_profile_argument, profiled
+from scripts.safe_io import atomic_open, mirror_file, player_lock
+
+# Bytes just before the checkpoint offset that must be unchanged for it to stay valid.
+CHECKPOINT_TAIL_BYTES = 64
 
 LIKES_LOG_HEADER = [
     "Date",
@@ -23,6 +32,7 @@ LIKES_LOG_HEADER = [
     "Likes Received",
     "Success",
 ]
+SUCCESS_INDEX = LIKES_LOG_HEADER.index("Success")
 
 
 
@@ -30,7 +40,7 @@ def sync_default_likes_log(uid: str, path: Path) -> None:
     """Mirror the cleaned default likes log to the repository root."""
     if not DEFAULT_LIKES_UIDS or uid != DEFAULT_LIKES_UIDS[0]:
         return
-    shutil.copyfile(path, PROJECT_ROOT / 'likes_activity.csv')
+    mirror_file(path, PROJECT_ROOT / 'likes_activity.csv')
 
 def ensure_player_dir(uid: str) -> Path:
     path = PLAYERS_DIR / uid
@@ -54,56 +64,140 @@ def log_path_for(uid: str) -> Path:
     return ensure_player_dir(uid) / "likes_activity.csv"
 
 
-def clean_likes_log(path: Path) -> bool:
-    """Return True if the log was modified by removing failed rows or normalising case."""
+def read_checkpoint_tail(path: Path, offset: int) -> str:
+    with path.open("rb") as handle:
+        handle.seek(max(offset - CHECKPOINT_TAIL_BYTES, 0))
+        return handle.read(min(offset, CHECKPOINT_TAIL_BYTES)).hex()
+
+
+def load_clean_offset(path: Path) -> int:
+    """Return the byte offset up to which the log is known to be clean, or 0."""
+    section = load_state(path.parent).get("cleanup")
+    if not section or section.get("file") != path.name:
+        return 0
+    offset = section.get("offset")
+    if not isinstance(offset, int) or offset <= 0 or offset > path.stat().st_size:
+        return 0
+    if read_checkpoint_tail(path, offset) != section.get("tail"):
+        return 0
+    return offset
+
+
+def save_clean_offset(path: Path) -> None:
+    offset = path.stat().st_size
+    update_section(
+        path.parent,
+        "cleanup",
+        {"file": path.name, "offset": offset, "tail": read_checkpoint_tail(path, offset)},
+    )
+
+
+def iter_rows(path: Path, start: int) -> Iterator[List[str]]:
+    """Stream log rows in ``LIKES_LOG_HEADER`` order from byte offset ``start``.
+
+    An offset of 0 means just after the header.
+    """
+    with open_records(path, start) as (header, records):
+        positions = column_positions(header or LIKES_LOG_HEADER, LIKES_LOG_HEADER)
+        for values in records:
+            yield [cell(values, position) for position in positions]
+
+
+def normalise_row(row: List[str]) -> Optional[List[str]]:
+    """Return the row with Success normalised to TRUE, or None if it should be dropped."""
+    success = row[SUCCESS_INDEX]
+    if success.strip().lower() != "true":
+        return None
+    if success == "TRUE":
+        return row
+    return row[:SUCCESS_INDEX] + ["TRUE"] + row[SUCCESS_INDEX + 1:]
+
+
+def replace_atomically(path: Path, start: int) -> Tuple[int, int]:
+    """Rewrite ``path`` through an fsynced temp file, keeping bytes before ``start`` verbatim."""
+    kept = removed = 0
+    with atomic_open(path) as handle:
+        if start:
+            with path.open("rb") as source:
+                remaining = start
+                while remaining:
+                    chunk = source.read(min(remaining, 1 << 16))
+                    if not chunk:
+                        break
+                    handle.buffer.write(chunk)
+                    remaining -= len(chunk)
+        writer = csv.writer(handle)
+        if not start:
+            writer.writerow(LIKES_LOG_HEADER)
+        for row in iter_rows(path, start):
+            cleaned = normalise_row(row)
+            if cleaned is None:
+                removed += 1
+                continue
+            kept += 1
+            writer.writerow(cleaned)
+    return kept, removed
+
+
+def clean_likes_log(path: Path, incremental: bool = False) -> bool:
+    """Return True if the log was modified by removing failed rows or normalising case.
+
+    Rows are streamed, and the cleaned log replaces the original through an atomic
+    rename, so a crash can never leave a truncated file. With ``incremental`` only
+    rows appended after the last clean checkpoint are checked.
+    """
     if not path.exists():
         print(f"Log file not found: {path}")
         return False
 
-    with path.open("r", newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        rows = list(reader)
-
-    changes_made = False
-    kept_rows = []
-    for row in rows:
-        success_raw = (row.get("Success") or "").strip()
-        if success_raw.lower() == "true":
-            if success_raw != "TRUE":
-                changes_made = True
-            row["Success"] = "TRUE"
-            kept_rows.append(row)
-        else:
-            if success_raw:
-                changes_made = True
-
-    if len(kept_rows) != len(rows):
-        changes_made = True
+    start = load_clean_offset(path) if incremental else 0
+    changes_made = any(normalise_row(row) is not row for row in iter_rows(path, start))
 
     if not changes_made:
+        save_clean_offset(path)
         print("No unsuccessful rows found; log already clean.")
         return False
 
-    with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(LIKES_LOG_HEADER)
-        for row in kept_rows:
-            writer.writerow([row.get(column, "") for column in LIKES_LOG_HEADER])
-
-    removed = len(rows) - len(kept_rows)
-    print(f"Removed {removed} unsuccessful entries; {len(kept_rows)} remain in {path.parent.name}.")
+    kept, removed = replace_atomically(path, start)
+    save_clean_offset(path)
+    scope = "new " if start else ""
+    print(
+        f"Removed {removed} unsuccessful entries; {kept} {scope}rows remain in {path.parent.name}."
+    )
     return True
 
 
-def main() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only check rows appended since the last clean checkpoint",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def clean_all(incremental: bool = False) -> bool:
+    """Clean every configured likes log; return True if any log changed."""
     changed_any = False
     for uid in determine_target_uids() or [DEFAULT_LIKES_UIDS[0]]:
         path = log_path_for(uid)
-        if clean_likes_log(path):
-            sync_default_likes_log(uid, path)
-            changed_any = True
+        with player_lock(path.parent):
+            if clean_likes_log(path, incremental):
+                sync_default_likes_log(uid, path)
+                write_bundle(path.parent)
+                changed_any = True
     if not changed_any:
         print("No logs required cleaning.")
+    return changed_any
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    with profiled("cleanup_likes_log", args.profile):
+        clean_all(args.incremental)
+    write_reports("cleanup_likes_log")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,58 @@
 """Central configuration for Free Fire logging and automation scripts."""
 from __future__ import annotations
 
+import os
 from typing import Dict, Iterable, List, Optional, Sequence
 
 DEFAULT_UIDS: List[str] = ["2805365702", "667352678"]
 DEFAULT_UID = DEFAULT_UIDS[0]
-API_BASE_URL = "https://7ama-info.vercel.app"
+# Both base URLs are overridable so the scripts can run against scripts/stub_api.py.
+API_BASE_URL = os.getenv("FREEFIRE_API_BASE_URL") or "https://7ama-info.vercel.app"
 API_INFO_ENDPOINT = "/info"
 
-LIKES_API_BASE_URL = "https://likes.api.freefireofficial.com/api/sg"
+LIKES_API_BASE_URL = (
+    os.getenv("FREEFIRE_LIKES_API_BASE_URL") or "https://likes.api.freefireofficial.com/api/sg"
+)
 DEFAULT_LIKES_UIDS: List[str] = ["667352678"]
 DEFAULT_LIKES_UID = DEFAULT_LIKES_UIDS[0]
 DEFAULT_LIKES_API_KEY = "astute2k3"
+DEFAULT_LIKES_WORKERS = 4
+DEFAULT_LIKES_IN_FLIGHT = 2  # concurrent likes requests per API key
+DEFAULT_LIKES_KEY_QUOTA = 0  # likes calls per API key per run; 0 means unlimited
+# In-run retries of transient likes failures, so one blip does not wait for the next cron slot.
+DEFAULT_LIKES_RETRY_ROUNDS = 1
+DEFAULT_LIKES_RETRY_DELAY = 15.0  # seconds before each retry round
+
+DEFAULT_FETCH_WORKERS = 4
+
+DEFAULT_HTTP_TIMEOUT = 30.0
+DEFAULT_HTTP_RATE = 5.0  # requests per second, per host
+DEFAULT_HTTP_BURST = 5.0
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_HTTP_BACKOFF = 1.0  # seconds; doubled on each retry with full jitter
+DEFAULT_HTTP_BREAKER_THRESHOLD = 5
+DEFAULT_HTTP_BREAKER_COOLDOWN = 60.0
+DEFAULT_HTTP_RETRY_AFTER_MAX = 60.0  # seconds; a longer 429 Retry-After fails the request
+
+DEFAULT_INFO_CACHE_TTL = 600.0  # seconds an /info response stays fresh
+DEFAULT_INFO_CACHE_MAX_ENTRIES = 5000
+
+# Scheduler daemon (times are Asia/Colombo, matching the GitHub Actions crons).
+DEFAULT_SCHEDULE_FETCH_AT = "08:00"
+DEFAULT_SCHEDULE_LIKES_WINDOW = "00:00-06:00"
+DEFAULT_SCHEDULE_CLEANUP_AT = "23:59"
+DEFAULT_SCHEDULE_RETRY_EVERY = 1800.0  # seconds between attempts of an unfinished job
+DEFAULT_SCHEDULE_POLL = 30.0  # seconds between checks for due jobs
+
+# Local read-only query service (scripts/query_service.py).
+DEFAULT_QUERY_PORT = 8780
+DEFAULT_QUERY_CACHE_ENTRIES = 256  # parsed files kept in memory
+
+# Months kept as live CSVs by scripts/month_archive.py, including the current one.
+DEFAULT_ARCHIVE_KEEP_MONTHS = 1
+
+DEFAULT_STORAGE_BACKEND = "csv"
+DEFAULT_SQLITE_PATH = "players/freefire.sqlite3"
 
 
 def build_api_url(uid: str) -> str:
@@ -67,6 +108,39 @@ def resolve_primary_uid(
     return uids[0]
 
 
+def parse_worker_count(raw: Optional[str], fallback: int) -> int:
+    """Parse a positive worker count from an env var value, falling back when invalid."""
+    if raw is None:
+        return fallback
+    try:
+        value = int(raw.strip())
+    except ValueError:
+        return fallback
+    return value if value > 0 else fallback
+
+
+def parse_count(raw: Optional[str], fallback: int) -> int:
+    """Parse a non-negative count from an env var value, falling back when invalid."""
+    if raw is None:
+        return fallback
+    try:
+        value = int(raw.strip())
+    except ValueError:
+        return fallback
+    return value if value >= 0 else fallback
+
+
+def parse_seconds(raw: Optional[str], fallback: float) -> float:
+    """Parse a non-negative duration from an env var value, falling back when invalid."""
+    if raw is None:
+        return fallback
+    try:
+        value = float(raw.strip())
+    except ValueError:
+        return fallback
+    return value if value >= 0 else fallback
+
+
 def default_env_vars() -> Dict[str, str]:
     """Return mapping of environment variable names to their default values."""
     values = {
@@ -75,6 +149,8 @@ def default_env_vars() -> Dict[str, str]:
         "FREEFIRE_LIKES_UID": DEFAULT_LIKES_UID,
         "FREEFIRE_LIKES_UIDS": serialise_uid_list(DEFAULT_LIKES_UIDS),
         "FREEFIRE_LIKES_KEY": DEFAULT_LIKES_API_KEY,
+        "FREEFIRE_FETCH_WORKERS": str(DEFAULT_FETCH_WORKERS),
+        "FREEFIRE_STORAGE": DEFAULT_STORAGE_BACKEND,
     }
     return {key: value for key, value in values.items() if value}
 
@@ -0,0 +1,158 @@
+"""Pre-aggregated JSON bundles for the docs/ dashboard.
+
+Each player gets ``players/<UID>/bundle.json`` holding the summary table, the
+most recent likes rows and the latest month's daily XP series, and
+``players/manifest.json`` lists every bundle (and history pyramid) with a
+content hash. The dashboard
+fetches the manifest and then each bundle with ``?v=<hash>``, so unchanged
+bundles are served from the browser cache and no CSV parsing happens client-side.
+
+Usage::
+
+    python -m scripts.dashboard_bundle [UID ...]
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import csv
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.history_pyramid import HISTORY_FILENAME
+from scripts.player_history import monthly_paths, parse_monthly_filename
+from scripts.profiling import add_profile_argument, profiled
+from scripts.safe_io import atomic_write_bytes, player_lock, write_if_changed
+
+PLAYERS_DIR = PROJECT_ROOT / "players"
+BUNDLE_FILENAME = "bundle.json"
+MANIFEST_FILENAME = "manifest.json"
+BUNDLE_VERSION = 1
+LIKES_ROWS = 10
+MONTH_NUMBERS = {name: number for number, name in enumerate(calendar.month_name) if name}
+
+
+def read_table(path: Path) -> Dict[str, List]:
+    if not path.exists():
+        return {"columns": [], "rows": []}
+    with path.open("r", newline="", encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        columns = next(reader, [])
+        rows = [row for row in reader if any(cell.strip() for cell in row)]
+    return {"columns": columns, "rows": rows}
+
+
+def latest_month(summary: Dict[str, List]) -> Optional[Dict[str, object]]:
+    if "Month" not in summary["columns"]:
+        return None
+    year_index = summary["columns"].index("Year")
+    month_index = summary["columns"].index("Month")
+    month_rows = [row for row in summary["rows"] if row[month_index] not in ("", "ALL")]
+    if not month_rows:
+        return None
+    last = month_rows[-1]
+    return {
+        "year": last[year_index],
+        "monthName": last[month_index],
+        "monthNumber": f"{MONTH_NUMBERS.get(last[month_index], 1):02d}",
+    }
+
+
+def daily_series(path: Path) -> List[List[object]]:
+    if not path.exists():
+        return []
+    series: List[List[object]] = []
+    with path.open("r", newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            date = row.get("Date")
+            xp = (row.get("XP") or "").replace(",", "").strip()
+            if date and xp.lstrip("-").isdigit():
+                series.append([date, int(xp)])
+    return series
+
+
+def build_bundle(player_dir: Path) -> Dict[str, object]:
+    summary = read_table(player_dir / "summary.csv")
+    likes = read_table(player_dir / "likes_activity.csv")
+    likes["rows"] = likes["rows"][-LIKES_ROWS:]
+    month = latest_month(summary)
+    if month is not None:
+        key = (int(month["year"]), int(month["monthNumber"]))
+        sources = {parse_monthly_filename(path): path for path in monthly_paths(player_dir)}
+        month["series"] = daily_series(sources[key]) if key in sources else []
+    return {
+        "version": BUNDLE_VERSION,
+        "uid": player_dir.name,
+        "summary": summary,
+        "likes": likes,
+        "latestMonth": month,
+    }
+
+
+def encode(payload: Dict[str, object]) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def write_bundle(player_dir: Path) -> bool:
+    """Rebuild one player's bundle and its manifest entry; return True if either changed."""
+    uid = player_dir.name
+    players_root = player_dir.parent
+    data = encode(build_bundle(player_dir))
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    bundle_path = player_dir / BUNDLE_FILENAME
+    with player_lock(player_dir):
+        changed = write_if_changed(bundle_path, data)
+
+    manifest_path = players_root / MANIFEST_FILENAME
+    with player_lock(players_root):
+        manifest: Dict[str, object] = {"version": BUNDLE_VERSION, "players": {}}
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except ValueError:
+                pass
+        players = manifest.setdefault("players", {})
+        entry: Dict[str, object] = {
+            "path": f"players/{uid}/{BUNDLE_FILENAME}",
+            "hash": digest,
+            "bytes": len(data),
+        }
+        history_path = player_dir / HISTORY_FILENAME
+        if history_path.exists():
+            history = history_path.read_bytes()
+            entry["history"] = {
+                "path": f"players/{uid}/{HISTORY_FILENAME}",
+                "hash": hashlib.sha256(history).hexdigest()[:16],
+                "bytes": len(history),
+            }
+        if players.get(uid) != entry:
+            players[uid] = entry
+            atomic_write_bytes(
+                manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8") + b"\n"
+            )
+            changed = True
+    return changed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard JSON bundles.")
+    parser.add_argument("uids", nargs="*", help="UIDs to rebuild (defaults to every player)")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    uids = args.uids or sorted(path.name for path in PLAYERS_DIR.iterdir() if path.is_dir())
+    with profiled("dashboard_bundle", args.profile):
+        for uid in uids:
+            status = "updated" if write_bundle(PLAYERS_DIR / uid) else "unchanged"
+            print(f"[{uid}] Dashboard bundle {status}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 """Daily Free Fire progress fetcher that updates monthly CSV exports."""
 from __future__ import annotations
 
+import argparse
 import calendar
 import csv
+import io
+import json
 import os
 import sys
 from collections import defaultdict
-import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Iterator, List, Optional, Tuple
@@ -19,7 +23,29 @@ BASE_DIR = SCRIPT_DIR.parent
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
-from scripts.config import DEFAULT_UIDS, build_api_url, parse_uid_list
+from scripts.config import (
+    DEFAULT_FETCH_WORKERS,
+    DEFAULT_UIDS,
+    parse_uid_list,
+    parse_worker_count,
+)
+from scripts.dashboard_bundle import write_bundle
+from scripts.http_client import HttpClient
+from scripts.info_cache import disable_default_cache, fetch_info
+from scripts.metrics import count_bytes, default_metrics, stage, track_uid, write_reports
+from scripts.month_archive import ArchivedMonth
+from scripts.safe_io import append_csv_row, mirror_file, write_if_changed
+from scripts.player_history import (
+    MONTHLY_HEADER,
+    PlayerHistory,
+    monthly_paths,
+    parse_int,
+    parse_monthly_filename,
+)
+from scripts.player_state import file_signature, load_state, section_is_fresh, update_section
+from scripts.profiling import add_profile_argument, profiled
+from scripts.storage import StorageBackend, open_backend
+from scripts.timeseries_store import append_row as append_series_row
 
 PLAYERS_DIR = BASE_DIR / "players"
 
@@ -49,16 +75,9 @@ def determine_target_uids() -> List[str]:
     return deduped
 
 
-MONTHLY_HEADER = [
-    "Date",
-    "BR Score",
-    "Rank Gained",
-    "Likes",
-    "Likes Gained",
-    "XP",
-    "XP Gained",
-    "Notes",
-]
+def determine_worker_count() -> int:
+    return parse_worker_count(os.getenv("FREEFIRE_FETCH_WORKERS"), DEFAULT_FETCH_WORKERS)
+
 
 SUMMARY_HEADER = [
     "Year",
@@ -83,98 +102,114 @@ def monthly_file_path(uid: str, dt: datetime) -> Path:
     return player_dir / filename
 
 
-def ensure_monthly_header(path: Path) -> None:
-    if not path.exists():
-        with path.open("w", newline="", encoding="utf-8") as handle:
-            writer = csv.writer(handle)
-            writer.writerow(MONTHLY_HEADER)
-
-
-def monthly_already_logged(path: Path, today_str: str) -> bool:
-    if not path.exists():
-        return False
-    with path.open("r", newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            if row.get("Date") == today_str:
-                return True
-    return False
-
-
-def parse_monthly_filename(path: Path) -> Tuple[int, int]:
-    if path.suffix.lower() != ".csv":
-        raise ValueError(f"Unexpected monthly filename format: {path.name}")
-    parts = path.stem.split(" ")
-    if len(parts) != 2 or not all(part.isdigit() for part in parts):
-        raise ValueError(f"Unexpected monthly filename format: {path.name}")
-    year = int(parts[0])
-    month = int(parts[1])
-    if not 1 <= month <= 12:
-        raise ValueError(f"Unexpected monthly filename format: {path.name}")
-    return year, month
-
-
 def iter_monthly_files(uid: str) -> Iterator[Path]:
-    player_dir = ensure_player_dir(uid)
-    paths: List[Tuple[int, int, Path]] = []
-    for candidate in player_dir.glob('*.[cC][sS][vV]'):
-        if candidate.is_file():
-            try:
-                year, month = parse_monthly_filename(candidate)
-            except ValueError:
-                continue
-            paths.append((year, month, candidate))
-    for _, _, path in sorted(paths, key=lambda item: (item[0], item[1])):
-        yield path
-
-
-def parse_int(value: Optional[str]) -> Optional[int]:
-    if value is None:
-        return None
-    value = value.strip()
-    if not value:
-        return None
-    value = value.replace(",", "")
-    try:
-        return int(value)
-    except ValueError:
+    yield from monthly_paths(ensure_player_dir(uid))
+
+
+TAIL_BLOCK_SIZE = 4096
+
+
+def read_tail_row(path: Path) -> Optional[Dict[str, str]]:
+    """Return the final data row of a monthly CSV by seeking backwards from the end.
+
+    Returns None when the file holds no data rows and raises ValueError when the
+    tail cannot be parsed safely (e.g. a quoted field spanning several lines).
+    """
+    with stage("csv_read"), path.open("rb") as handle:
+        header_line = handle.readline()
+        header_end = handle.tell()
+        handle.seek(0, os.SEEK_END)
+        position = handle.tell()
+        buffer = b""
+        while position > header_end:
+            step = min(TAIL_BLOCK_SIZE, position - header_end)
+            position -= step
+            handle.seek(position)
+            buffer = handle.read(step) + buffer
+            lines = [line for line in buffer.splitlines() if line.strip()]
+            # The first line in the buffer may be cut off unless we reached the header.
+            if len(lines) > 1 or (lines and position == header_end):
+                break
+        else:
+            lines = [line for line in buffer.splitlines() if line.strip()]
+        count_bytes("read", header_end + len(buffer))
+
+    if not lines:
         return None
+    last_line = lines[-1].decode("utf-8")
+    if last_line.count('"') % 2:
+        raise ValueError(f"Unbalanced quotes in the last row of {path}")
+    header = next(csv.reader([header_line.decode("utf-8")]), [])
+    values = next(csv.reader([last_line]), [])
+    if not header or len(values) != len(header):
+        raise ValueError(f"Could not parse the last row of {path}")
+    row = dict(zip(header, values))
+    if not row.get("Date"):
+        raise ValueError(f"Last row of {path} has no date")
+    return row
+
+
+def scan_last_logged_entry(
+    paths: List[Path],
+) -> Tuple[Optional[Dict[str, str]], Optional[Path]]:
+    last_row = PlayerHistory.from_paths(paths).last_row()
+    if last_row is None:
+        return None, None
+    return last_row.as_dict(), last_row.path
 
 
 def load_last_logged_entry(uid: str) -> Tuple[Optional[Dict[str, str]], Optional[Path]]:
-    last_row: Optional[Dict[str, str]] = None
-    last_path: Optional[Path] = None
-    for path in iter_monthly_files(uid):
-        with path.open("r", newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for row in reader:
-                if row.get("Date"):
-                    last_row = row
-                    last_path = path
-    return last_row, last_path
+    paths = list(iter_monthly_files(uid))
+    for path in reversed(paths):
+        try:
+            row = read_tail_row(path)
+        except (ValueError, UnicodeDecodeError):
+            return scan_last_logged_entry(paths)
+        if row is not None:
+            return row, path
+    return None, None
+
+
+def monthly_state_values(
+    newest_path: Path,
+    last_path: Optional[Path],
+    row: Optional[Dict[str, object]],
+) -> Dict[str, object]:
+    values: Dict[str, object] = dict(file_signature(newest_path))
+    values["last_file"] = last_path.name if last_path else None
+    values["last_date"] = str(row.get("Date")) if row else None
+    for key, column in (("br", "BR Score"), ("likes", "Likes"), ("xp", "XP")):
+        raw = row.get(column) if row else None
+        values[key] = raw if isinstance(raw, int) else parse_int(raw)
+    return values
+
+
+def load_last_logged_state(uid: str) -> Optional[Dict[str, object]]:
+    """Return the last logged date and BR/likes/XP values, rebuilding the index if stale."""
+    player_dir = ensure_player_dir(uid)
+    paths = list(iter_monthly_files(uid))
+    if not paths:
+        return None
+    section = load_state(player_dir).get("monthly")
+    if section_is_fresh(section, paths[-1]):
+        return section
+    last_row, last_path = load_last_logged_entry(uid)
+    values = monthly_state_values(paths[-1], last_path, last_row)
+    update_section(player_dir, "monthly", values)
+    return values
 
 
 def append_monthly_entry(path: Path, row: Dict[str, object]) -> None:
-    ensure_monthly_header(path)
-    with path.open("a", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow([row.get(column, "") for column in MONTHLY_HEADER])
+    with stage("csv_write"):
+        append_csv_row(path, MONTHLY_HEADER, [row.get(column, "") for column in MONTHLY_HEADER])
+        append_series_row(path.parent, row)
 
 
 def load_monthly_stats(path: Path) -> Tuple[int, int, Dict[str, float]]:
     year, month_number = parse_monthly_filename(path)
-    xp_values: List[int] = []
-    xp_gains: List[int] = []
-
-    with path.open("r", newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            xp = parse_int(row.get("XP"))
-            if xp is not None:
-                xp_values.append(xp)
-            xp_gain = parse_int(row.get("XP Gained"))
-            if xp_gain is not None:
-                xp_gains.append(xp_gain)
+    history = PlayerHistory.from_paths([path])
+    xp_values = history.values("xp")
+    xp_gains = history.values("xp_gained")
 
     if not xp_values:
         raise ValueError(f"Monthly file {path} contains no XP data")
@@ -200,24 +235,80 @@ def sync_default_exports(uid: str, month_path: Path) -> None:
     """Copy default UID exports back to the root for compatibility."""
     if not DEFAULT_UIDS or uid != DEFAULT_UIDS[0]:
         return
-    root_month_path = BASE_DIR / month_path.name
-    shutil.copyfile(month_path, root_month_path)
-    summary_src = ensure_player_dir(uid) / 'summary.csv'
-    summary_dst = BASE_DIR / 'summary.csv'
-    if summary_src.exists():
-        shutil.copyfile(summary_src, summary_dst)
-
-def update_summary(uid: str) -> None:
-    player_dir = ensure_player_dir(uid)
-    summary_path = player_dir / "summary.csv"
-    month_stats: List[Tuple[int, int, Dict[str, float]]] = []
+    with stage("mirror"):
+        root_month_path = BASE_DIR / month_path.name
+        mirror_file(month_path, root_month_path)
+        summary_src = ensure_player_dir(uid) / 'summary.csv'
+        summary_dst = BASE_DIR / 'summary.csv'
+        if summary_src.exists():
+            mirror_file(summary_src, summary_dst)
+
+STATS_CACHE_NAME = ".stats_cache.json"
+STATS_CACHE_VERSION = 1
+
+MonthStats = Tuple[int, int, Dict[str, float]]
+
+
+def load_stats_cache(path: Path) -> Dict[str, Dict[str, object]]:
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != STATS_CACHE_VERSION:
+        return {}
+    months = payload.get("months")
+    return months if isinstance(months, dict) else {}
+
+
+def save_stats_cache(path: Path, months: Dict[str, Dict[str, object]]) -> None:
+    payload = json.dumps({"version": STATS_CACHE_VERSION, "months": months}, sort_keys=True)
+    write_if_changed(path, payload.encode("utf-8"))
+
+
+def collect_month_stats(uid: str, full_rebuild: bool = False) -> List[MonthStats]:
+    """Return stats for every monthly file, re-parsing only months whose size or mtime changed.
+
+    Archived months carry their stats in the archive index and are never parsed.
+    """
+    cache_path = ensure_player_dir(uid) / STATS_CACHE_NAME
+    cached = {} if full_rebuild else load_stats_cache(cache_path)
+    refreshed: Dict[str, Dict[str, object]] = {}
+    month_stats: List[MonthStats] = []
+    dirty = full_rebuild
+
     for path in iter_monthly_files(uid):
-        try:
-            stats = load_monthly_stats(path)
-        except ValueError:
+        if isinstance(path, ArchivedMonth):
+            if path.stats is not None:
+                year, month_number = parse_monthly_filename(path)  # type: ignore[arg-type]
+                month_stats.append((year, month_number, dict(path.stats)))
             continue
-        month_stats.append(stats)
+        stat = path.stat()
+        entry = cached.get(path.name)
+        if (
+            entry is None
+            or entry.get("size") != stat.st_size
+            or entry.get("mtime_ns") != stat.st_mtime_ns
+        ):
+            try:
+                _, _, stats = load_monthly_stats(path)
+            except ValueError:
+                stats = None
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "stats": stats}
+            dirty = True
+        refreshed[path.name] = entry
+        if entry["stats"] is not None:
+            year, month_number = parse_monthly_filename(path)
+            month_stats.append((year, month_number, dict(entry["stats"])))
+
+    if dirty or refreshed.keys() != cached.keys():
+        save_stats_cache(cache_path, refreshed)
+    return month_stats
+
 
+def build_summary_rows(month_stats: List[MonthStats]) -> List[List[str]]:
     rows: List[List[str]] = []
     if month_stats:
         by_year: Dict[int, List[Tuple[int, Dict[str, float]]]] = defaultdict(list)
@@ -256,50 +347,46 @@ def update_summary(uid: str) -> None:
                     f"{avg_gain:.2f}",
                 ]
             )
+    return rows
 
-    with summary_path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(SUMMARY_HEADER)
-        writer.writerows(rows)
 
+def write_summary_csv(summary_path: Path, rows: List[List[str]]) -> bool:
+    """Write the summary unless it already holds these rows; return True if written."""
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
+    writer.writerow(SUMMARY_HEADER)
+    writer.writerows(rows)
+    return write_if_changed(summary_path, buffer.getvalue().encode("utf-8"))
 
-def process_uid(uid: str) -> None:
-    now_colombo = datetime.now(TIMEZONE)
-    today_str = format_mdY(now_colombo)
 
-    api_url = build_api_url(uid)
-    try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        print(f"[{uid}] Failed to fetch profile data: {exc}")
-        return
+def update_summary(uid: str, full_rebuild: bool = False) -> None:
+    player_dir = ensure_player_dir(uid)
+    summary_path = player_dir / "summary.csv"
+    with stage("summary"):
+        month_stats = collect_month_stats(uid, full_rebuild)
+        write_summary_csv(summary_path, build_summary_rows(month_stats))
+    with stage("bundle"):
+        write_bundle(player_dir)
 
-    data = response.json()
+
+def build_daily_row(
+    data: Dict[str, object], today_str: str, last_state: Optional[Dict[str, object]]
+) -> Dict[str, object]:
+    """Derive the monthly CSV row from an ``/info`` payload and the previous logged values."""
     basic_info = data.get("basicInfo", {})
     ranking_points = int(basic_info.get("rankingPoints", 0))
     likes = int(basic_info.get("liked", 0))
     xp = int(basic_info.get("exp", 0))
 
-    current_month_path = monthly_file_path(uid, now_colombo)
-    last_row, last_path = load_last_logged_entry(uid)
-    if (
-        last_row
-        and last_row.get("Date") == today_str
-        and last_path == current_month_path
-    ):
-        print(f"[{uid}] Row for {today_str} already exists; no changes.")
-        return
-
-    last_br = parse_int(last_row.get("BR Score")) if last_row else None
-    last_likes = parse_int(last_row.get("Likes")) if last_row else None
-    last_xp = parse_int(last_row.get("XP")) if last_row else None
+    last_br = last_state.get("br") if last_state else None
+    last_likes = last_state.get("likes") if last_state else None
+    last_xp = last_state.get("xp") if last_state else None
 
     rank_gained = ranking_points - last_br if last_br is not None else 0
     likes_gained = likes - last_likes if last_likes is not None else 0
     xp_gained = xp - last_xp if last_xp is not None else 0
 
-    row = {
+    return {
         "Date": today_str,
         "BR Score": ranking_points,
         "Rank Gained": rank_gained if rank_gained else "",
@@ -310,19 +397,101 @@ def process_uid(uid: str) -> None:
         "Notes": "",
     }
 
-    append_monthly_entry(current_month_path, row)
-    update_summary(uid)
-    sync_default_exports(uid, current_month_path)
+
+def process_uid(
+    uid: str,
+    client: Optional[HttpClient] = None,
+    backend: Optional[StorageBackend] = None,
+) -> bool:
+    """Log today's row for ``uid``; return False if the profile could not be fetched."""
+    now_colombo = datetime.now(TIMEZONE)
+    today_str = format_mdY(now_colombo)
+
+    try:
+        with stage("http"):
+            data = fetch_info(uid, client, journal="info")
+    except requests.RequestException as exc:
+        print(f"[{uid}] Failed to fetch profile data: {exc}")
+        return False
+
+    backend = backend if backend is not None else open_backend()
+    current_month_name = f"{now_colombo.year} {now_colombo.strftime('%m')}.CSV"
+    last_state = backend.last_logged(uid)
+    if (
+        last_state
+        and last_state.get("last_date") == today_str
+        and last_state.get("last_file") == current_month_name
+    ):
+        print(f"[{uid}] Row for {today_str} already exists; no changes.")
+        default_metrics().count("rows_unchanged")
+        return True
+
+    row = build_daily_row(data, today_str, last_state)
+    backend.append_daily(uid, now_colombo, row)
     print(f"[{uid}] Appended: {row}")
+    default_metrics().count("rows_appended")
+    return True
 
 
-def main() -> None:
-    uids = determine_target_uids()
-    for uid in uids:
+def run_uid(uid: str, client: HttpClient, backend: StorageBackend) -> bool:
+    with track_uid(uid):
         try:
-            process_uid(uid)
+            return process_uid(uid, client, backend)
         except Exception as exc:  # pylint: disable=broad-except
             print(f"[{uid}] Unexpected failure: {exc}")
+            return False
+
+
+def run_fetch(
+    uids: List[str], client: HttpClient, backend: StorageBackend, workers: int
+) -> List[str]:
+    """Fetch and log every UID; return the UIDs that failed."""
+    # Each UID only writes inside its own players/<uid>/ directory, so the
+    # workers never share a CSV; the client only shares pooled connections and
+    # the per-host rate limit / circuit breaker.
+    if workers <= 1:
+        succeeded = [run_uid(uid, client, backend) for uid in uids]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            succeeded = list(executor.map(lambda uid: run_uid(uid, client, backend), uids))
+    failed = [uid for uid, ok in zip(uids, succeeded) if not ok]
+    default_metrics().count("uids_failed", len(failed))
+    return failed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="ignore the per-month stats cache and re-parse every monthly CSV",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always call the info API instead of reusing a fresh cached response",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.no_cache:
+        disable_default_cache()
+    uids = determine_target_uids()
+    workers = min(determine_worker_count(), len(uids))
+    started = time.perf_counter()
+    backend = open_backend(args.full_rebuild)
+    with profiled("fetch_and_append", args.profile), HttpClient(pool_size=workers) as client:
+        try:
+            run_fetch(uids, client, backend, workers)
+        finally:
+            backend.close()
+        client.report()
+    elapsed = time.perf_counter() - started
+    print(f"Processed {len(uids)} UID(s) with {workers} worker(s) in {elapsed:.2f}s")
+    write_reports("fetch_and_append")
 
 
 if __name__ == "__main__":
@@ -1,26 +1,56 @@
-"""Utility to backfill historical Free Fire progress data into monthly CSV files."""
+"""Utility to backfill historical Free Fire progress data into monthly CSV files.
+
+Sources are streamed row by row and spooled per UID, so arbitrarily large
+exports never have to fit in memory. Each player is then written in its own
+worker process, and only monthly files whose content actually changes are
+rewritten. A source with a ``UID`` column may cover many accounts; sources
+without one are attributed to ``--uid`` (default: the primary configured UID).
+
+Usage::
+
+    python scripts/generate_old_csvs.py [SOURCE ...] [--uid UID] [--workers N]
+"""
 from __future__ import annotations
 
-import calendar
+import argparse
 import csv
+import io
 import os
 import sys
-from collections import defaultdict
-from dataclasses import dataclass
-import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.config import DEFAULT_UIDS, resolve_primary_uid
+from scripts.config import DEFAULT_FETCH_WORKERS, DEFAULT_UIDS, resolve_primary_uid
+from scripts.player_history import (
+    HistoryRow,
+    PlayerHistory,
+    cell,
+    column_positions,
+    monthly_paths,
+    open_records,
+    parse_monthly_filename,
+)
+from scripts.metrics import count_bytes, default_metrics, io_delta, stage, write_reports
+from scripts.profiling import add_profile_argument, profile_target, profiled
+from scripts.safe_io import atomic_write_bytes, mirror_file, player_lock, write_if_changed
 
 BASE_DIR = PROJECT_ROOT
 SOURCE_PATH = BASE_DIR / "old_data.csv"
+PLAYERS_DIR = BASE_DIR / "players"
+UID_COLUMN = "UID"
+SPOOL_HEADER = ["Date", "XP", "XP Gained", "Notes"]
+# Keep at most this many per-UID spool files open while streaming the sources.
+MAX_OPEN_SPOOLS = 128
+
 
 def determine_target_uid() -> str:
     list_raw = os.getenv("FREEFIRE_UIDS")
@@ -28,9 +58,6 @@ def determine_target_uid() -> str:
     return resolve_primary_uid(single_raw, list_raw, DEFAULT_UIDS)
 
 
-TARGET_UID = determine_target_uid()
-OUTPUT_DIR = (BASE_DIR / "players" / TARGET_UID)
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 MONTHLY_HEADER = [
     "Date",
     "BR Score",
@@ -41,162 +68,235 @@ MONTHLY_HEADER = [
     "XP Gained",
     "Notes",
 ]
-SUMMARY_HEADER = [
-    "Year",
-    "Month",
-    "Days Logged",
-    "Start XP",
-    "End XP",
-    "Total XP Gained",
-    "Average Daily XP Gained",
-]
 
 
-@dataclass
-class DataPoint:
-    date_str: str
-    date: datetime
-    xp: int
-    xp_gained: int
-    notes: str
-
-    @classmethod
-    def from_row(cls, row: Dict[str, str]) -> "DataPoint":
-        date_str = row["Date"].strip()
-        date = datetime.strptime(date_str, "%m/%d/%Y")
-        xp = int(row["XP"].replace(",", ""))
-        xp_gained_raw = row.get("XP Gained", "").strip()
-        xp_gained = int(xp_gained_raw) if xp_gained_raw else 0
-        notes = row.get("Notes", "").strip()
-        extras = row.get(None)
-        if extras:
-            extra_notes = [part.strip() for part in extras if part and part.strip()]
-            if notes:
-                notes = ", ".join([notes] + extra_notes)
-            else:
-                notes = ", ".join(extra_notes)
-        return cls(date_str=date_str, date=date, xp=xp, xp_gained=xp_gained, notes=notes)
-
-
-def load_data(source: Path) -> List[DataPoint]:
-    with source.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        return [DataPoint.from_row(row) for row in reader]
+MonthKey = Tuple[int, int]
+
+
+def parse_source_row(values: List[str], positions: List[Optional[int]], width: int) -> List[object]:
+    """Validate one source row and return it in ``SPOOL_HEADER`` order.
+
+    Cells beyond the header (unquoted commas in the notes) are folded into the notes.
+    """
+    date_at, xp_at, gained_at, notes_at = positions
+    date_str = cell(values, date_at).strip()
+    datetime.strptime(date_str, "%m/%d/%Y")
+    xp = int(cell(values, xp_at).replace(",", ""))
+    xp_gained_raw = cell(values, gained_at).strip()
+    xp_gained = int(xp_gained_raw) if xp_gained_raw else 0
+    notes = cell(values, notes_at).strip()
+    extra_notes = [part.strip() for part in values[width:] if part and part.strip()]
+    if extra_notes:
+        notes = ", ".join(([notes] if notes else []) + extra_notes)
+    return [date_str, xp, xp_gained if xp_gained else "", notes]
 
 
 def ensure_output_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def write_monthly_files(data: Iterable[DataPoint]) -> Dict[int, List[DataPoint]]:
-    by_year: Dict[int, Dict[int, List[DataPoint]]] = defaultdict(lambda: defaultdict(list))
-    for point in data:
-        by_year[point.date.year][point.date.month].append(point)
-
-    ensure_output_dir(OUTPUT_DIR)
-
-    for year, months in by_year.items():
-        for month, rows in months.items():
-            rows.sort(key=lambda p: p.date)
-            filename = f"{year} {month:02d}.CSV"
-            path = OUTPUT_DIR / filename
-
-            with path.open("w", newline="", encoding="utf-8") as handle:
-                writer = csv.writer(handle)
-                writer.writerow(MONTHLY_HEADER)
-                for row in rows:
-                    writer.writerow(
-                        [
-                            row.date_str,
-                            "",
-                            "",
-                            "",
-                            "",
-                            row.xp,
-                            row.xp_gained if row.xp_gained else "",
-                            row.notes,
-                        ]
-                    )
-
-    # Flatten data grouped by year for summary generation.
-    grouped_by_year: Dict[int, List[DataPoint]] = {
-        year: sorted(
-            (point for month_rows in months.values() for point in month_rows),
-            key=lambda p: p.date,
-        )
-        for year, months in by_year.items()
-    }
-    return grouped_by_year
-
-
-def write_summary(data_by_year: Dict[int, List[DataPoint]]) -> None:
-    rows: List[List[str]] = []
-
-    for year in sorted(data_by_year):
-        points = data_by_year[year]
-        monthly: Dict[int, List[DataPoint]] = defaultdict(list)
-        for point in points:
-            monthly[point.date.month].append(point)
-
-        for month in sorted(monthly):
-            month_points = monthly[month]
-            month_points.sort(key=lambda p: p.date)
-            total_gain = sum(p.xp_gained for p in month_points)
-            days_logged = len(month_points)
-            avg_gain = total_gain / days_logged if days_logged else 0
-            rows.append(
-                [
-                    str(year),
-                    calendar.month_name[month],
-                    str(days_logged),
-                    str(month_points[0].xp),
-                    str(month_points[-1].xp),
-                    str(total_gain),
-                    f"{avg_gain:.2f}",
-                ]
-            )
-
-        total_gain_year = sum(p.xp_gained for p in points)
-        days_logged_year = len(points)
-        avg_gain_year = total_gain_year / days_logged_year if days_logged_year else 0
-        rows.append(
+class SpoolWriter:
+    """Append rows to one temp CSV per UID, bounding the number of open handles."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.paths: Dict[str, Path] = {}
+        self.handles: Dict[str, Tuple[TextIO, object]] = {}
+
+    def write(self, uid: str, row: List[object]) -> None:
+        if uid not in self.handles:
+            if len(self.handles) >= MAX_OPEN_SPOOLS:
+                self.close()
+            path = self.paths.setdefault(uid, self.directory / f"{uid}.csv")
+            is_new = not path.exists()
+            handle = path.open("a", newline="", encoding="utf-8")
+            writer = csv.writer(handle)
+            if is_new:
+                writer.writerow(SPOOL_HEADER)
+            self.handles[uid] = (handle, writer)
+        self.handles[uid][1].writerow(row)
+
+    def close(self) -> None:
+        for handle, _ in self.handles.values():
+            handle.close()
+        self.handles.clear()
+
+
+def spool_sources(
+    sources: Sequence[Path], default_uid: str, spool_dir: Path
+) -> Dict[str, Path]:
+    """Stream every source once, routing each row to its UID's spool file."""
+    spool = SpoolWriter(spool_dir)
+    try:
+        for source in sources:
+            with open_records(source) as (header, records):
+                uid_at = next(
+                    (index for index, name in enumerate(header) if name.strip().upper() == UID_COLUMN),
+                    None,
+                )
+                positions = column_positions(header, SPOOL_HEADER)
+                for values in records:
+                    uid = cell(values, uid_at).strip() or default_uid
+                    spool.write(uid, parse_source_row(values, positions, len(header)))
+    finally:
+        spool.close()
+    return dict(spool.paths)
+
+
+def render_month(rows: Sequence[HistoryRow]) -> bytes:
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
+    writer.writerow(MONTHLY_HEADER)
+    for row in rows:
+        writer.writerow(
             [
-                str(year),
-                "ALL",
-                str(days_logged_year),
-                str(points[0].xp),
-                str(points[-1].xp),
-                str(total_gain_year),
-                f"{avg_gain_year:.2f}",
+                row.date,
+                "",
+                "",
+                "",
+                "",
+                row.xp,
+                row.xp_gained if row.xp_gained else "",
+                row.notes,
             ]
         )
-
-    summary_path = OUTPUT_DIR / "summary.csv"
-    with summary_path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(SUMMARY_HEADER)
-        writer.writerows(rows)
-
-def sync_default_exports() -> None:
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_monthly_files(
+    months: Dict[MonthKey, List[HistoryRow]], output_dir: Path
+) -> Tuple[int, int]:
+    """Write the monthly files whose content changed; return written/unchanged counts.
+
+    Archived months are compared too; a changed one is written as a live file,
+    which overrides the archived copy until the next ``month_archive pack``.
+    """
+    ensure_output_dir(output_dir)
+    written = unchanged = 0
+    existing = {parse_monthly_filename(path): path for path in monthly_paths(output_dir)}
+
+    for (year, month), rows in months.items():
+        filename = f"{year} {month:02d}.CSV"
+        path = output_dir / filename
+        content = render_month(rows)
+        current = existing.get((year, month))
+        if current is not None and current.read_bytes() == content:
+            count_bytes("unchanged", len(content))
+            unchanged += 1
+            continue
+        atomic_write_bytes(path, content)
+        written += 1
+    return written, unchanged
+
+
+def sync_default_exports(uid: str, output_dir: Path) -> None:
     """Copy default UID exports to the repository root for compatibility."""
-    if DEFAULT_UIDS and TARGET_UID == DEFAULT_UIDS[0]:
-        for csv_path in OUTPUT_DIR.glob('*.CSV'):
-            shutil.copyfile(csv_path, BASE_DIR / csv_path.name)
-        summary_path = OUTPUT_DIR / 'summary.csv'
+    if DEFAULT_UIDS and uid == DEFAULT_UIDS[0]:
+        for csv_path in monthly_paths(output_dir):
+            mirror_file(csv_path, BASE_DIR / csv_path.name)
+        summary_path = output_dir / 'summary.csv'
         if summary_path.exists():
-            shutil.copyfile(summary_path, BASE_DIR / 'summary.csv')
-
-
-
-def main() -> None:
-    if not SOURCE_PATH.exists():
-        raise SystemExit(f"Missing source data: {SOURCE_PATH}")
-
-    data = load_data(SOURCE_PATH)
-    grouped_by_year = write_monthly_files(data)
-    write_summary(grouped_by_year)
-    sync_default_exports()
-    print(f"Backfilled data for UID {TARGET_UID} into {OUTPUT_DIR}")
+            mirror_file(summary_path, BASE_DIR / 'summary.csv')
+
+
+def backfill_player(
+    uid: str, spool_path: Path, players_dir: Path
+) -> Tuple[str, int, int, float, Dict[str, float]]:
+    """Backfill one player from its spool file; runs inside a worker process.
+
+    The summary, bundle and history are rebuilt from every month afterwards,
+    not just the backfilled ones.
+    """
+    from scripts.fetch_and_append import update_summary
+    from scripts.history_pyramid import rebuild_history
+
+    started = time.perf_counter()
+    io_before = default_metrics().io_counts()
+    output_dir = players_dir / uid
+    months = PlayerHistory.from_paths([spool_path]).by_month()
+    with player_lock(output_dir):
+        with stage("csv_write"):
+            written, unchanged = write_monthly_files(months, output_dir)
+        with stage("history"):
+            rebuild_history(output_dir, monthly_paths(output_dir))
+        update_summary(uid, full_rebuild=True)
+        with stage("mirror"):
+            sync_default_exports(uid, output_dir)
+    elapsed = time.perf_counter() - started
+    return uid, written, unchanged, elapsed, io_delta(io_before, default_metrics().io_counts())
+
+
+def try_backfill_player(
+    uid: str, spool_path: Path, players_dir: Path
+) -> Optional[Tuple[str, int, int, float, Dict[str, float]]]:
+    """Run ``backfill_player``, reporting a failure instead of aborting the other players."""
+    try:
+        return backfill_player(uid, spool_path, players_dir)
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"[{uid}] Backfill failed: {exc}", flush=True)
+        return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        type=Path,
+        default=[SOURCE_PATH],
+        help="historical CSV exports (default: old_data.csv)",
+    )
+    parser.add_argument("--uid", help="UID for rows in sources without a UID column")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_FETCH_WORKERS,
+        help="number of player worker processes",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    for source in args.sources:
+        if not source.exists():
+            raise SystemExit(f"Missing source data: {source}")
+    default_uid = args.uid or determine_target_uid()
+
+    with profiled("generate_old_csvs", args.profile), tempfile.TemporaryDirectory(
+        prefix="ff-backfill-"
+    ) as spool_root:
+        with stage("spool"):
+            spools = spool_sources(args.sources, default_uid, Path(spool_root))
+        workers = max(1, min(args.workers, len(spools)))
+        if profile_target(args.profile) is not None:
+            # The profiler does not follow worker processes.
+            workers = 1
+        results = []
+        if workers == 1:
+            for uid, path in spools.items():
+                result = try_backfill_player(uid, path, PLAYERS_DIR)
+                if result is not None:
+                    results.append(result)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(try_backfill_player, uid, path, PLAYERS_DIR)
+                    for uid, path in spools.items()
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is not None:
+                        default_metrics().add_io(result[4])
+                        results.append(result)
+
+    for uid, written, unchanged, elapsed, _ in sorted(results):
+        print(
+            f"Backfilled data for UID {uid} into {PLAYERS_DIR / uid} "
+            f"({written} month(s) written, {unchanged} unchanged, {elapsed:.2f}s)"
+        )
+    write_reports("generate_old_csvs")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+"""Multi-resolution, downsampled history of each player's XP, BR score and likes.
+
+``players/<UID>/history.json`` holds three levels for the dashboard's all-time
+charts: ``daily`` (the most recent ``DAILY_WINDOW`` days), ``weekly`` and
+``monthly`` (end-of-period values across the whole history). Each series is
+reduced to at most ``POINT_BUDGET`` points with Largest-Triangle-Three-Buckets,
+which keeps the visual shape of the curve, so chart cost stays flat however
+long the history grows.
+
+The un-downsampled buckets are kept in ``history_buckets.json`` so a newly
+appended day only updates its week and month instead of re-reading every CSV.
+
+Usage::
+
+    python -m scripts.history_pyramid [UID ...]   # full rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.player_history import MISSING, PlayerHistory, decode_int
+from scripts.safe_io import write_if_changed
+
+HISTORY_FILENAME = "history.json"
+BUCKETS_FILENAME = "history_buckets.json"
+HISTORY_VERSION = 1
+DAILY_WINDOW = 120
+POINT_BUDGET = 365
+METRICS = {"xp": "XP", "br": "BR Score", "likes": "Likes"}
+LEVELS = ("daily", "weekly", "monthly")
+
+Point = Tuple[int, int]
+
+
+def parse_value(value: object) -> Optional[int]:
+    if value is None or isinstance(value, int):
+        return value
+    text = str(value).strip().replace(",", "")
+    try:
+        return int(text) if text else None
+    except ValueError:
+        return None
+
+
+def week_key(ordinal: int) -> str:
+    year, week, _ = date.fromordinal(ordinal).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(ordinal: int) -> str:
+    day = date.fromordinal(ordinal)
+    return f"{day.year}-{day.month:02d}"
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Downsample ``points`` (sorted by x) to ``threshold`` points with LTTB."""
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        ax, ay = points[anchor]
+        best_area = -1.0
+        best_index = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = index
+        sampled.append(points[best_index])
+        anchor = best_index
+    sampled.append(points[-1])
+    return sampled
+
+
+def empty_buckets() -> Dict[str, object]:
+    return {
+        "version": HISTORY_VERSION,
+        "last_day": None,
+        "daily": {metric: [] for metric in METRICS},
+        "weekly": {metric: {} for metric in METRICS},
+        "monthly": {metric: {} for metric in METRICS},
+    }
+
+
+def add_day(buckets: Dict[str, object], ordinal: int, values: Dict[str, Optional[int]]) -> None:
+    """Fold one day into the buckets; weekly/monthly keep the period's last value."""
+    for metric, value in values.items():
+        if value is None:
+            continue
+        buckets["daily"][metric].append([ordinal, value])
+        buckets["weekly"][metric][week_key(ordinal)] = [ordinal, value]
+        buckets["monthly"][metric][month_key(ordinal)] = [ordinal, value]
+    buckets["last_day"] = ordinal
+    for metric in METRICS:
+        daily = buckets["daily"][metric]
+        cutoff = ordinal - DAILY_WINDOW
+        while daily and daily[0][0] <= cutoff:
+            daily.pop(0)
+
+
+def row_values(row: Dict[str, object]) -> Dict[str, Optional[int]]:
+    return {metric: parse_value(row.get(column)) for metric, column in METRICS.items()}
+
+
+def row_ordinal(row: Dict[str, object]) -> Optional[int]:
+    date_str = str(row.get("Date") or "").strip()
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str, "%m/%d/%Y").date().toordinal()
+    except ValueError:
+        return None
+
+
+def build_buckets(monthly_paths: Sequence[Path]) -> Dict[str, object]:
+    history = PlayerHistory.from_paths(monthly_paths)
+    days: Dict[int, Dict[str, Optional[int]]] = {}
+    for index, ordinal in enumerate(history.days):
+        if ordinal != MISSING:
+            days[ordinal] = {metric: decode_int(history.columns[metric][index]) for metric in METRICS}
+    buckets = empty_buckets()
+    for ordinal in sorted(days):
+        add_day(buckets, ordinal, days[ordinal])
+    return buckets
+
+
+def render(buckets: Dict[str, object], budget: int = POINT_BUDGET) -> Dict[str, object]:
+    levels: Dict[str, Dict[str, List[List[object]]]] = {}
+    for level in LEVELS:
+        levels[level] = {}
+        for metric in METRICS:
+            raw = buckets[level][metric]
+            points = raw if isinstance(raw, list) else sorted(raw.values())
+            reduced = lttb([(int(x), int(y)) for x, y in points], budget)
+            levels[level][metric] = [
+                [date.fromordinal(x).isoformat(), y] for x, y in reduced
+            ]
+    last_day = buckets.get("last_day")
+    return {
+        "version": HISTORY_VERSION,
+        "budget": budget,
+        "lastDate": date.fromordinal(last_day).isoformat() if last_day else None,
+        "levels": levels,
+    }
+
+
+def encode(payload: Dict[str, object]) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def load_buckets(player_dir: Path) -> Optional[Dict[str, object]]:
+    path = player_dir / BUCKETS_FILENAME
+    if not path.exists():
+        return None
+    try:
+        buckets = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if not isinstance(buckets, dict) or buckets.get("version") != HISTORY_VERSION:
+        return None
+    return buckets
+
+
+def save(player_dir: Path, buckets: Dict[str, object]) -> None:
+    write_if_changed(player_dir / BUCKETS_FILENAME, encode(buckets))
+    write_if_changed(player_dir / HISTORY_FILENAME, encode(render(buckets)))
+
+
+def rebuild_history(player_dir: Path, monthly_paths: Sequence[Path]) -> Dict[str, object]:
+    buckets = build_buckets(monthly_paths)
+    save(player_dir, buckets)
+    return buckets
+
+
+def append_history(
+    player_dir: Path, row: Dict[str, object], monthly_paths: Sequence[Path]
+) -> None:
+    """Fold a newly appended row into the pyramid, rebuilding from CSVs if out of step."""
+    ordinal = row_ordinal(row)
+    buckets = load_buckets(player_dir)
+    last_day = buckets.get("last_day") if buckets else None
+    if ordinal is None or buckets is None or (last_day is not None and ordinal <= last_day):
+        rebuild_history(player_dir, monthly_paths)
+        return
+    add_day(buckets, ordinal, row_values(row))
+    save(player_dir, buckets)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from scripts.fetch_and_append import PLAYERS_DIR, iter_monthly_files
+    from scripts.profiling import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Rebuild the downsampled history pyramids.")
+    parser.add_argument("uids", nargs="*", help="UIDs to rebuild (defaults to every player)")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    uids = args.uids or sorted(path.name for path in PLAYERS_DIR.iterdir() if path.is_dir())
+    with profiled("history_pyramid", args.profile):
+        for uid in uids:
+            buckets = rebuild_history(PLAYERS_DIR / uid, list(iter_monthly_files(uid)))
+            days = len(buckets["monthly"]["xp"])
+            print(f"[{uid}] Rebuilt history pyramid ({days} month(s) of XP).")
+
+
+if __name__ == "__main__":
+    main()
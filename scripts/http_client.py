@@ -0,0 +1,276 @@
+"""Shared HTTP client for the info and likes APIs.
+
+Every request goes through a per-host token bucket, is retried with jittered
+exponential backoff on timeouts, connection errors, 5xx and 429 responses (never
+sooner than a 429's ``Retry-After``), and is refused immediately while that
+host's circuit breaker is open; once the cooldown ends a single probe request
+decides whether it closes. Per-host counters are kept so throughput can be
+tuned against the endpoints' limits.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.config import (
+    DEFAULT_HTTP_BACKOFF,
+    DEFAULT_HTTP_BREAKER_COOLDOWN,
+    DEFAULT_HTTP_BREAKER_THRESHOLD,
+    DEFAULT_HTTP_BURST,
+    DEFAULT_HTTP_RATE,
+    DEFAULT_HTTP_RETRIES,
+    DEFAULT_HTTP_RETRY_AFTER_MAX,
+    DEFAULT_HTTP_TIMEOUT,
+)
+from scripts.metrics import default_metrics
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while a host's circuit breaker is open."""
+
+
+def env_float(name: str, fallback: float) -> float:
+    raw = os.getenv(name)
+    if raw is None:
+        return fallback
+    try:
+        return float(raw)
+    except ValueError:
+        return fallback
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """Return the seconds a ``Retry-After`` header asks to wait, or None if absent or invalid."""
+    raw = (response.headers.get("Retry-After") or "").strip()
+    if not raw:
+        return None
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available and return the time spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Half-open: exactly one caller probes; the rest fail fast until it reports back.
+            self.probing = True
+            return True
+
+    def release(self) -> None:
+        """Free the probe slot after an outcome that says nothing about the host's health."""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure and return True if it (re)opened the circuit."""
+        with self.lock:
+            self.probing = False
+            self.failures += 1
+            if self.threshold > 0 and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class HttpClient:
+    def __init__(
+        self,
+        pool_size: int = 10,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        breaker_threshold: Optional[int] = None,
+        breaker_cooldown: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate = rate if rate is not None else env_float("FREEFIRE_HTTP_RATE", DEFAULT_HTTP_RATE)
+        self.burst = burst if burst is not None else env_float("FREEFIRE_HTTP_BURST", DEFAULT_HTTP_BURST)
+        self.retries = (
+            retries
+            if retries is not None
+            else int(env_float("FREEFIRE_HTTP_RETRIES", DEFAULT_HTTP_RETRIES))
+        )
+        self.backoff = (
+            backoff if backoff is not None else env_float("FREEFIRE_HTTP_BACKOFF", DEFAULT_HTTP_BACKOFF)
+        )
+        self.breaker_threshold = (
+            breaker_threshold
+            if breaker_threshold is not None
+            else int(env_float("FREEFIRE_HTTP_BREAKER_THRESHOLD", DEFAULT_HTTP_BREAKER_THRESHOLD))
+        )
+        self.breaker_cooldown = (
+            breaker_cooldown
+            if breaker_cooldown is not None
+            else env_float("FREEFIRE_HTTP_BREAKER_COOLDOWN", DEFAULT_HTTP_BREAKER_COOLDOWN)
+        )
+        self.timeout = timeout if timeout is not None else DEFAULT_HTTP_TIMEOUT
+        self.retry_after_max = env_float("FREEFIRE_HTTP_RETRY_AFTER_MAX", DEFAULT_HTTP_RETRY_AFTER_MAX)
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.lock = threading.Lock()
+
+    def host_state(self, host: str) -> tuple:
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+                self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return self.buckets[host], self.breakers[host]
+
+    def count(self, host: str, key: str, amount: float = 1) -> None:
+        with self.lock:
+            self.counters[host][key] += amount
+        default_metrics().count_http(host, key, amount)
+
+    def get(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        """GET ``url`` and return a successful response, raising ``requests.RequestException``."""
+        host = urlsplit(url).netloc
+        bucket, breaker = self.host_state(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self.count(host, "short_circuited")
+                raise CircuitOpenError(f"Circuit open for {host}; skipping request")
+            self.count(host, "throttle_wait_s", bucket.acquire())
+            self.count(host, "requests")
+            started = time.perf_counter()
+            wait: Optional[float] = None
+            try:
+                response = self.session.get(url, timeout=timeout or self.timeout)
+                retryable = response.status_code >= 500 or response.status_code == 429
+                if not retryable:
+                    response.raise_for_status()
+                    breaker.record_success()
+                    self.count(host, "success")
+                    return response
+                error: requests.RequestException = requests.HTTPError(
+                    f"{response.status_code} Server Error for url: {url}", response=response
+                )
+                self.count(host, f"status_{response.status_code}")
+                if response.status_code == 429:
+                    wait = retry_after(response)
+            except (requests.Timeout, requests.ConnectionError) as exc:
+                error = exc
+                self.count(host, "timeouts" if isinstance(exc, requests.Timeout) else "connection_errors")
+            except requests.HTTPError:
+                # 4xx responses are the caller's problem, not the host's health.
+                breaker.release()
+                self.count(host, "client_errors")
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            finally:
+                self.count(host, "elapsed_s", time.perf_counter() - started)
+
+            if breaker.record_failure():
+                self.count(host, "circuit_opened")
+            if attempt >= self.retries or (wait is not None and wait > self.retry_after_max):
+                self.count(host, "failures")
+                raise error
+            attempt += 1
+            self.count(host, "retries")
+            delay = random.uniform(0, self.backoff * (2 ** (attempt - 1)))
+            time.sleep(max(delay, wait or 0.0))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {host: dict(values) for host, values in self.counters.items()}
+
+    def report(self) -> None:
+        for host, values in sorted(self.stats().items()):
+            parts = ", ".join(
+                f"{key}={value:.2f}" if isinstance(value, float) and not value.is_integer()
+                else f"{key}={int(value)}"
+                for key, value in sorted(values.items())
+            )
+            print(f"[http] {host}: {parts}")
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    """Return the process-wide client shared by callers that were not handed one."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
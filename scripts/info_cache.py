@@ -0,0 +1,162 @@
+"""On-disk TTL cache of parsed ``/info`` responses shared by every script.
+
+Entries live in ``.cache/info/<UID>.json``. Within the freshness window a UID
+costs at most one info API call per machine, even when several threads or
+scripts ask for it. The oldest entries are evicted once the cache holds more
+than ``max_entries`` UIDs.
+
+``.cache/`` is gitignored and the workflows do not restore it between runs,
+so in CI the cache only saves calls within a single run; on a long-lived
+machine (e.g. under the scheduler) it also spans runs.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from scripts.config import (
+    DEFAULT_INFO_CACHE_MAX_ENTRIES,
+    DEFAULT_INFO_CACHE_TTL,
+    build_api_url,
+    parse_count,
+    parse_seconds,
+)
+from scripts.http_client import HttpClient, default_client
+from scripts.journal import record_response
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / ".cache" / "info"
+# Listing the cache directory on every write would be quadratic for big rosters.
+EVICT_EVERY = 64
+
+
+def cache_enabled_by_env() -> bool:
+    return (os.getenv("FREEFIRE_INFO_CACHE") or "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def entry_mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+class InfoCache:
+    def __init__(
+        self,
+        directory: Path = CACHE_DIR,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        enabled: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl if ttl is not None else parse_seconds(
+            os.getenv("FREEFIRE_INFO_CACHE_TTL"), DEFAULT_INFO_CACHE_TTL
+        )
+        self.max_entries = max_entries if max_entries is not None else parse_count(
+            os.getenv("FREEFIRE_INFO_CACHE_MAX"), DEFAULT_INFO_CACHE_MAX_ENTRIES
+        )
+        self.enabled = enabled and cache_enabled_by_env() and self.ttl > 0
+        self.locks: Dict[str, threading.Lock] = {}
+        self.locks_guard = threading.Lock()
+        self.writes_since_evict = 0
+
+    def entry_path(self, uid: str) -> Path:
+        return self.directory / f"{uid}.json"
+
+    def uid_lock(self, uid: str) -> threading.Lock:
+        with self.locks_guard:
+            return self.locks.setdefault(uid, threading.Lock())
+
+    def get(self, uid: str) -> Optional[Dict[str, object]]:
+        if not self.enabled:
+            return None
+        path = self.entry_path(uid)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        fetched_at = entry.get("fetched_at") if isinstance(entry, dict) else None
+        if not isinstance(fetched_at, (int, float)) or time.time() - fetched_at > self.ttl:
+            return None
+        payload = entry.get("payload")
+        return payload if isinstance(payload, dict) else None
+
+    def put(self, uid: str, payload: Dict[str, object]) -> None:
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.entry_path(uid)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump({"fetched_at": time.time(), "payload": payload}, handle)
+        os.replace(tmp_path, path)
+        with self.locks_guard:
+            self.writes_since_evict += 1
+            due = self.writes_since_evict == 1 or self.writes_since_evict % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def invalidate(self, uid: str) -> None:
+        try:
+            self.entry_path(uid).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        entries = list(self.directory.glob("*.json"))
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        for path in sorted(entries, key=entry_mtime)[:excess]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def fetch_info(
+    uid: str,
+    client: Optional[HttpClient] = None,
+    cache: Optional[InfoCache] = None,
+    journal: Optional[str] = None,
+) -> Dict[str, object]:
+    """Return the parsed ``/info`` payload for ``uid``, served from the cache when fresh.
+
+    With ``journal`` set, a payload fetched from the API (never a cached one) is
+    recorded in the UID's response journal under that kind.
+    """
+    cache = cache if cache is not None else default_cache()
+    with cache.uid_lock(uid):
+        payload = cache.get(uid)
+        if payload is not None:
+            return payload
+        client = client if client is not None else default_client()
+        payload = client.get(build_api_url(uid)).json()
+        if journal:
+            record_response(uid, journal, payload)
+        if isinstance(payload, dict):
+            cache.put(uid, payload)
+        return payload
+
+
+_default_cache: Optional[InfoCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> InfoCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = InfoCache()
+        return _default_cache
+
+
+def disable_default_cache() -> None:
+    """Bypass the cache for the rest of the process (the ``--no-cache`` flag)."""
+    default_cache().enabled = False
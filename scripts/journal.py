@@ -0,0 +1,403 @@
+"""Append-only journal of raw API responses, and an offline replay from it.
+
+``fetch_and_append.py`` and ``send_likes.py`` record every ``/info`` payload
+fetched from the API (cache hits are not recorded again) and every likes API
+response (or request error) in
+``players/<UID>/journal/YYYY-MM-DD.jsonl.gz``, one JSON line per response, each
+appended as its own gzip member so an append never rewrites earlier data and
+a torn final member only loses that record. Kinds are ``info`` (the fetcher's
+daily profile), ``likes`` (likes API calls, with ``final`` telling whether a
+failure was logged) and ``likes_info`` (profile reads made by the booster).
+
+``replay`` re-derives, with no network calls, every monthly CSV row and likes
+log row the journal covers, using the same derivation code as the live
+scripts, and merges them with the existing rows for days the journal does not
+cover. Notes on existing rows are kept, and files holding no journaled day
+are copied unchanged. Output goes to ``.cache/replay/<UID>/``
+for review, or back into ``players/<UID>/`` with ``--in-place`` (which then
+rebuilds the history pyramid, summary, bundle and mirrors as well).
+``FREEFIRE_JOURNAL=0`` turns recording off.
+
+Usage::
+
+    python -m scripts.journal replay [UID ...] [--out DIR | --in-place] [--workers N]
+    python -m scripts.journal dump UID [--kind info]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.metrics import count_bytes, stage
+from scripts.player_history import (
+    LIKES_COLUMNS,
+    LIKES_LOG_FILENAME,
+    MONTHLY_HEADER,
+    PLAYERS_DIR,
+    LikesHistory,
+    PlayerHistory,
+    monthly_paths,
+    parse_int,
+    parse_monthly_filename,
+)
+from scripts.safe_io import atomic_copy, files_match, player_lock, write_if_changed
+from scripts.timeseries_store import format_day
+
+TIMEZONE = ZoneInfo("Asia/Colombo")
+JOURNAL_DIRNAME = "journal"
+REPLAY_DIR = PROJECT_ROOT / ".cache" / "replay"
+LIKES_LOG_HEADER = ["Date", "Likes Before", "Likes After", "Likes Received", "Success"]
+
+Record = Dict[str, object]
+MonthKey = Tuple[int, int]
+
+
+def journal_enabled() -> bool:
+    return os.getenv("FREEFIRE_JOURNAL", "1") != "0"
+
+
+def journal_dir(player_dir: Path) -> Path:
+    return player_dir / JOURNAL_DIRNAME
+
+
+def record_response(
+    uid: str,
+    kind: str,
+    payload: Optional[object],
+    when: Optional[datetime] = None,
+    **extra: object,
+) -> None:
+    """Append one raw response to the UID's journal; never raises."""
+    if not journal_enabled():
+        return
+    when = when if when is not None else datetime.now(TIMEZONE)
+    record: Record = {"ts": round(when.timestamp(), 3), "day": when.date().isoformat(), "kind": kind}
+    record.update(extra)
+    record["payload"] = payload
+    data = gzip.compress(
+        (json.dumps(record, separators=(",", ":"), sort_keys=True) + "\n").encode("utf-8"), mtime=0
+    )
+    player_dir = PLAYERS_DIR / uid
+    # One file per Asia/Colombo day: a committed day is never appended to again.
+    path = journal_dir(player_dir) / f"{when.date().isoformat()}.jsonl.gz"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with player_lock(player_dir), path.open("ab") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+    except OSError as exc:
+        print(f"[{uid}] Could not journal the {kind} response: {exc}")
+        return
+    count_bytes("written", len(data))
+
+
+def read_journal_file(path: Path) -> Iterator[Record]:
+    """Yield the records of one journal file, stopping quietly at a torn final member."""
+    data = path.read_bytes()
+    count_bytes("read", len(data))
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as handle:
+        try:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error, ValueError) as exc:
+            print(f"Stopped reading {path} at a damaged record: {exc}")
+
+
+def iter_records(player_dir: Path, kinds: Optional[Sequence[str]] = None) -> Iterator[Record]:
+    """Yield a player's journal records in the order they were written."""
+    directory = journal_dir(player_dir)
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.glob("*.jsonl.gz")):
+        for record in read_journal_file(path):
+            if kinds is None or record.get("kind") in kinds:
+                yield record
+
+
+def first_per_day(records: Sequence[Record], kind: str) -> Dict[int, Record]:
+    """Return the first record of ``kind`` per day, as the live scripts act on the first fetch."""
+    chosen: Dict[int, Record] = {}
+    for record in records:
+        if record.get("kind") == kind and isinstance(record.get("payload"), dict):
+            day = date.fromisoformat(str(record["day"])).toordinal()
+            chosen.setdefault(day, record)
+    return chosen
+
+
+def replay_monthly(records: Sequence[Record], existing: PlayerHistory) -> Dict[MonthKey, List[List[object]]]:
+    """Return the rows of every month holding a journaled day, re-derived and merged with the existing rows."""
+    from scripts.fetch_and_append import build_daily_row
+
+    journaled = first_per_day(records, "info")
+    dated: Dict[int, Tuple[MonthKey, List[object], str]] = {}
+    undated: Dict[MonthKey, List[List[object]]] = {}
+    for row in existing:
+        values = row.as_dict()
+        cells = [values.get(column, "") for column in MONTHLY_HEADER]
+        key = parse_monthly_filename(row.path) if row.path is not None else None
+        day = row.day
+        if day is None:
+            if key is not None:
+                undated.setdefault(key, []).append(cells)
+            continue
+        if day not in dated:
+            dated[day] = (key or month_key(day), cells, row.notes)
+
+    previous: Optional[Dict[str, object]] = None
+    months: Dict[MonthKey, List[List[object]]] = {}
+    for day in sorted(set(dated) | set(journaled)):
+        if day in journaled:
+            row = build_daily_row(journaled[day]["payload"], format_day(day), previous)  # type: ignore[arg-type]
+            if day in dated:
+                row["Notes"] = dated[day][2]
+            key = month_key(day)
+            cells = [row.get(column, "") for column in MONTHLY_HEADER]
+            previous = {"br": row["BR Score"], "likes": row["Likes"], "xp": row["XP"]}
+        else:
+            key, cells, _ = dated[day]
+            previous = state_from_cells(cells)
+        months.setdefault(key, []).append(cells)
+    for key, rows in undated.items():
+        months.setdefault(key, []).extend(rows)
+    touched = {month_key(day) for day in journaled}
+    return {key: rows for key, rows in months.items() if key in touched}
+
+
+def state_from_cells(cells: List[object]) -> Dict[str, object]:
+    """The previous-row values the live fetcher would read from the state index (blank is None)."""
+    return {
+        key: parse_int(str(cells[MONTHLY_HEADER.index(column)]))
+        for key, column in (("br", "BR Score"), ("likes", "Likes"), ("xp", "XP"))
+    }
+
+
+def month_key(day: int) -> MonthKey:
+    value = date.fromordinal(day)
+    return value.year, value.month
+
+
+def liked_count(record: Record) -> int:
+    value = parse_int(record["payload"].get("basicInfo", {}).get("liked"))  # type: ignore[union-attr]
+    return value if value is not None else 0
+
+
+def likes_for_failure(records: Sequence[Record], index: int) -> int:
+    """Likes count the booster logged for the failure at ``index``: its next profile read that day.
+
+    A read served from the info cache is not journaled; it returned the latest
+    profile fetched before the failure.
+    """
+    day = records[index].get("day")
+    for record in records[index + 1:]:
+        if record.get("day") != day or record.get("kind") == "likes":
+            break
+        if record.get("kind") == "likes_info" and isinstance(record.get("payload"), dict):
+            return liked_count(record)
+    for record in reversed(records[:index]):
+        if record.get("kind") in ("info", "likes_info") and isinstance(record.get("payload"), dict):
+            return liked_count(record)
+    return 0
+
+
+def replay_likes(records: Sequence[Record], existing: LikesHistory) -> Optional[List[List[object]]]:
+    """Merge re-derived likes log rows for journaled days into the existing log rows.
+
+    Returns None when the journal holds no likes calls, leaving the log as it is.
+    """
+    from scripts.send_likes import granted_likes
+
+    if not any(record.get("kind") == "likes" for record in records):
+        return None
+
+    derived: Dict[str, List[List[object]]] = {}
+    succeeded = set()
+    for index, record in enumerate(records):
+        if record.get("kind") != "likes":
+            continue
+        day = str(record["day"])
+        payload = record.get("payload")
+        granted = granted_likes(payload) if isinstance(payload, dict) else None
+        if day in succeeded:
+            continue
+        if granted is not None:
+            before, after, received = granted
+            if before is None or after is None:
+                before = likes_for_failure(records, index)
+                after = before + received
+            derived.setdefault(day, []).append([day, before, after, received, "TRUE"])
+            succeeded.add(day)
+        elif record.get("final", True):
+            current = likes_for_failure(records, index)
+            derived.setdefault(day, []).append([day, current, current, 0, "FALSE"])
+
+    rows: List[Tuple[str, List[object]]] = []
+    for row in existing:
+        if row.date not in derived:
+            values = ["" if row.value(name) is None else row.value(name) for name in LIKES_COLUMNS]
+            rows.append((row.date, [row.date, *values, "TRUE" if row.success else "FALSE"]))
+    for day, day_rows in derived.items():
+        rows.extend((day, row) for row in day_rows)
+    rows.sort(key=lambda item: item[0])
+    return [row for _, row in rows]
+
+
+def render_csv(header: Sequence[str], rows: Sequence[Sequence[object]]) -> bytes:
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def copy_if_changed(source: Path, target: Path) -> bool:
+    # A real copy, not a link: the review output must not follow later appends.
+    if files_match(source, target):
+        return False
+    atomic_copy(source, target)
+    return True
+
+
+def replay_player(uid: str, out_root: Optional[Path]) -> Tuple[str, int, int, int, float]:
+    """Replay one UID into ``out_root/<UID>`` (None: in place); return file and record counts."""
+    from scripts import fetch_and_append, rebuild_all
+    from scripts.timeseries_store import build_store, series_dir
+
+    started = time.perf_counter()
+    player_dir = PLAYERS_DIR / uid
+    output_dir = out_root / uid if out_root is not None else player_dir
+    with stage("replay"), player_lock(player_dir):
+        records = list(iter_records(player_dir))
+        months = replay_monthly(records, PlayerHistory.load(player_dir))
+        likes_path = player_dir / LIKES_LOG_FILENAME
+        likes_rows = replay_likes(records, LikesHistory.from_path(likes_path))
+
+        # Files the journal does not touch are left alone in place and copied verbatim otherwise.
+        written = 0
+        sources = {parse_monthly_filename(path): path for path in monthly_paths(player_dir)}
+        output_paths: List[Path] = []
+        for key in sorted(set(sources) | set(months)):
+            path = output_dir / f"{key[0]} {key[1]:02d}.CSV"
+            output_paths.append(path)
+            if key in months:
+                data = render_csv(MONTHLY_HEADER, months[key])
+                if out_root is None and key in sources and sources[key].read_bytes() == data:
+                    # Unchanged archived months stay in the archive.
+                    continue
+                written += write_if_changed(path, data)
+            elif out_root is not None:
+                written += copy_if_changed(sources[key], path)
+        if likes_rows is not None:
+            written += write_if_changed(
+                output_dir / LIKES_LOG_FILENAME, render_csv(LIKES_LOG_HEADER, likes_rows)
+            )
+        elif out_root is not None and likes_path.exists():
+            written += copy_if_changed(likes_path, output_dir / LIKES_LOG_FILENAME)
+
+        if out_root is None:
+            _, ok, _, output, _ = rebuild_all.rebuild_player(uid, ["history", "summary", "mirrors"])
+            if not ok:
+                raise RuntimeError(output.strip().splitlines()[-1] if output.strip() else "rebuild failed")
+            if series_dir(player_dir).is_dir():
+                build_store(uid)
+        else:
+            month_stats = []
+            for path in output_paths:
+                try:
+                    month_stats.append(fetch_and_append.load_monthly_stats(path))
+                except ValueError:
+                    continue
+            fetch_and_append.write_summary_csv(
+                output_dir / "summary.csv", fetch_and_append.build_summary_rows(month_stats)
+            )
+    info_days = len(first_per_day(records, "info"))
+    likes_calls = sum(1 for record in records if record.get("kind") == "likes")
+    return uid, written, info_days, likes_calls, time.perf_counter() - started
+
+
+def discover_journaled_uids() -> List[str]:
+    if not PLAYERS_DIR.is_dir():
+        return []
+    return sorted(
+        path.name for path in PLAYERS_DIR.iterdir() if journal_dir(path).is_dir()
+    )
+
+
+def run_replay(args: argparse.Namespace) -> None:
+    uids = args.uids or discover_journaled_uids()
+    if not uids:
+        print("No journaled players found.")
+        return
+    out_root = None if args.in_place else (args.out or REPLAY_DIR)
+    target = "in place" if out_root is None else f"into {out_root}"
+    print(f"Replaying {len(uids)} player(s) {target}.")
+    workers = max(1, min(args.workers, len(uids)))
+    failed: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(uid, executor.submit(replay_player, uid, out_root)) for uid in uids]
+        for uid, future in futures:
+            try:
+                _, written, info_days, likes_calls, elapsed = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[{uid}] Replay failed: {exc}")
+                failed.append(uid)
+                continue
+            print(
+                f"[{uid}] Replayed {info_days} day(s) and {likes_calls} likes call(s); "
+                f"{written} file(s) written in {elapsed:.2f}s."
+            )
+    if failed:
+        raise SystemExit(1)
+
+
+def run_dump(args: argparse.Namespace) -> None:
+    kinds = [args.kind] if args.kind else None
+    for record in iter_records(PLAYERS_DIR / args.uid, kinds):
+        print(json.dumps(record, sort_keys=True))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="rebuild CSVs from the journal without network calls")
+    replay.add_argument("uids", nargs="*", help="UIDs to replay (defaults to every journaled player)")
+    target = replay.add_mutually_exclusive_group()
+    target.add_argument("--out", type=Path, help=f"output root (default: {REPLAY_DIR})")
+    target.add_argument("--in-place", action="store_true", help="rewrite players/<UID>/ itself")
+    replay.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    dump = commands.add_parser("dump", help="print a UID's journal records as JSON lines")
+    dump.add_argument("uid")
+    dump.add_argument("--kind", choices=["info", "likes", "likes_info"])
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.command == "replay":
+        run_replay(args)
+    else:
+        run_dump(args)
+
+
+if __name__ == "__main__":
+    main()
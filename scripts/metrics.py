@@ -0,0 +1,309 @@
+"""Per-run instrumentation: stage timings, HTTP outcomes and bytes read/written.
+
+Scripts wrap their work in ``stage("http")``, ``stage("csv_read")``,
+``stage("summary")``, … and run each UID inside ``track_uid(uid)``, so every
+duration is attributed to both the stage and the UID that caused it, even
+from helpers deep in the call stack and from worker threads. The HTTP client
+counts request outcomes per host and ``safe_io`` / ``player_history`` count
+bytes. At the end of a run ``write_reports("fetch_and_append")`` writes
+``.cache/metrics/<name>.json`` and ``<name>.prom``, a Prometheus textfile
+(point the node_exporter textfile collector at ``FREEFIRE_METRICS_DIR``).
+The io counters separate files actually ``written`` from mirrors ``linked``
+into place and writes skipped because the file was ``unchanged``; the
+report line printed at the end of a run summarises them.
+``FREEFIRE_METRICS=0`` turns recording and reports off.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+METRICS_DIR = PROJECT_ROOT / ".cache" / "metrics"
+REPORT_VERSION = 1
+PROM_PREFIX = "freefire"
+
+StageKey = Tuple[str, Optional[str]]
+
+
+def tidy(values: Dict[str, float]) -> Dict[str, float]:
+    return {key: int(value) if float(value).is_integer() else round(value, 6) for key, value in values.items()}
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        # Set by scripts.profiling while a run is being profiled.
+        self.profiler = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started = time.time()
+            self.started_perf = time.perf_counter()
+            # (stage, uid) -> [calls, total seconds, max seconds]
+            self.stages: Dict[StageKey, List[float]] = {}
+            self.http: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            self.io: Dict[str, float] = defaultdict(float)
+            self.counters: Dict[str, float] = defaultdict(float)
+
+    def current_uid(self) -> Optional[str]:
+        return getattr(self.local, "uid", None)
+
+    @contextmanager
+    def track_uid(self, uid: str) -> Iterator[None]:
+        """Attribute everything recorded in this thread to ``uid`` and time it as ``total``."""
+        previous = self.current_uid()
+        self.local.uid = uid
+        try:
+            with self.stage("total"):
+                yield
+        finally:
+            self.local.uid = previous
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        profiler = self.profiler
+        if profiler is not None and profiler.wants(name):
+            with profiler.section(), self.timed(name):
+                yield
+        else:
+            with self.timed(name):
+                yield
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        key = (name, self.current_uid())
+        with self.lock:
+            entry = self.stages.get(key)
+            if entry is None:
+                self.stages[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def count(self, name: str, amount: float = 1) -> None:
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += amount
+
+    def count_http(self, host: str, key: str, amount: float = 1) -> None:
+        if self.enabled:
+            with self.lock:
+                self.http[host][key] += amount
+
+    def count_bytes(self, direction: str, amount: int) -> None:
+        if self.enabled and amount:
+            with self.lock:
+                self.io[f"bytes_{direction}"] += amount
+                self.io[f"files_{direction}"] += 1
+
+    def io_counts(self) -> Dict[str, float]:
+        with self.lock:
+            return dict(self.io)
+
+    def add_io(self, values: Dict[str, float]) -> None:
+        """Fold in io counters recorded by a worker process."""
+        if self.enabled:
+            with self.lock:
+                for key, value in values.items():
+                    self.io[key] += value
+
+    def snapshot(self, name: str) -> Dict[str, object]:
+        with self.lock:
+            stages: Dict[str, Dict[str, float]] = {}
+            uids: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+            for (stage, uid), (calls, total, peak) in sorted(
+                self.stages.items(), key=lambda item: (item[0][0], item[0][1] or "")
+            ):
+                values = {"calls": int(calls), "seconds": round(total, 6), "max_seconds": round(peak, 6)}
+                if uid is not None:
+                    uids[uid][stage] = values
+                aggregate = stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+                aggregate["calls"] += int(calls)
+                aggregate["seconds"] = round(aggregate["seconds"] + total, 6)
+                aggregate["max_seconds"] = max(aggregate["max_seconds"], round(peak, 6))
+            return {
+                "version": REPORT_VERSION,
+                "script": name,
+                "started": round(self.started, 3),
+                "duration_s": round(time.perf_counter() - self.started_perf, 6),
+                "stages": stages,
+                "uids": dict(uids),
+                "http": {host: tidy(values) for host, values in self.http.items()},
+                "io": tidy(self.io),
+                "counters": tidy(self.counters),
+            }
+
+
+def prom_labels(**labels: str) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus(report: Dict[str, object]) -> str:
+    script = str(report["script"])
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+        full = f"{PROM_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in samples:
+            lines.append(f"{full}{prom_labels(script=script, **labels)} {value!r}")
+
+    metric("run_timestamp_seconds", "gauge", "Unix time the run started.", [({}, report["started"])])
+    metric("run_duration_seconds", "gauge", "Wall-clock duration of the run.", [({}, report["duration_s"])])
+
+    stages: Dict[str, Dict[str, float]] = report["stages"]  # type: ignore[assignment]
+    metric(
+        "stage_seconds",
+        "gauge",
+        "Time spent per stage, summed over UIDs and worker threads.",
+        [({"stage": stage}, values["seconds"]) for stage, values in stages.items()],
+    )
+    metric(
+        "stage_calls",
+        "gauge",
+        "Number of times each stage ran.",
+        [({"stage": stage}, values["calls"]) for stage, values in stages.items()],
+    )
+    metric(
+        "stage_max_seconds",
+        "gauge",
+        "Slowest single run of each stage.",
+        [({"stage": stage}, values["max_seconds"]) for stage, values in stages.items()],
+    )
+
+    uids: Dict[str, Dict[str, Dict[str, float]]] = report["uids"]  # type: ignore[assignment]
+    metric(
+        "uid_stage_seconds",
+        "gauge",
+        "Time spent per UID and stage.",
+        [
+            ({"uid": uid, "stage": stage}, values["seconds"])
+            for uid, by_stage in sorted(uids.items())
+            for stage, values in by_stage.items()
+        ],
+    )
+
+    http: Dict[str, Dict[str, float]] = report["http"]  # type: ignore[assignment]
+    metric(
+        "http_events",
+        "gauge",
+        "HTTP client events per host (requests, success, status_<code>, retries, ...).",
+        [
+            ({"host": host, "event": key}, value)
+            for host, values in sorted(http.items())
+            for key, value in sorted(values.items())
+        ],
+    )
+
+    io_values: Dict[str, float] = report["io"]  # type: ignore[assignment]
+    metric(
+        "io",
+        "gauge",
+        "Bytes and files read and written by the run.",
+        [({"kind": key}, value) for key, value in sorted(io_values.items())],
+    )
+    counters: Dict[str, float] = report["counters"]  # type: ignore[assignment]
+    if counters:
+        metric(
+            "events",
+            "gauge",
+            "Script-specific outcome counters.",
+            [({"event": key}, value) for key, value in sorted(counters.items())],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def io_delta(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    return {key: value - before.get(key, 0) for key, value in after.items() if value != before.get(key, 0)}
+
+
+def describe_io(values: Dict[str, float]) -> str:
+    def amount(direction: str) -> str:
+        files = int(values.get(f"files_{direction}", 0))
+        kib = values.get(f"bytes_{direction}", 0) / 1024
+        return f"{files} file(s) / {kib:.1f} KiB {direction}"
+
+    return ", ".join(amount(direction) for direction in ("written", "linked", "unchanged", "read"))
+
+
+def metrics_dir() -> Path:
+    raw = os.getenv("FREEFIRE_METRICS_DIR")
+    return Path(raw) if raw else METRICS_DIR
+
+
+def write_reports(name: str, metrics: Optional[Metrics] = None) -> Optional[Path]:
+    """Write ``<name>.json`` and ``<name>.prom``; return the JSON path (None when disabled)."""
+    from scripts.safe_io import atomic_write_bytes
+
+    metrics = metrics if metrics is not None else default_metrics()
+    if not metrics.enabled:
+        return None
+    report = metrics.snapshot(name)
+    directory = metrics_dir()
+    json_path = directory / f"{name}.json"
+    try:
+        atomic_write_bytes(json_path, json.dumps(report, indent=2, sort_keys=True).encode("utf-8") + b"\n")
+        atomic_write_bytes(directory / f"{name}.prom", render_prometheus(report).encode("utf-8"))
+    except OSError as exc:
+        print(f"[metrics] Could not write the {name} report: {exc}")
+        return None
+    slowest = sorted(
+        report["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True  # type: ignore[union-attr]
+    )
+    parts = ", ".join(
+        f"{stage}={values['seconds']:.2f}s" for stage, values in slowest if stage != "total"
+    )
+    print(f"[metrics] {parts or 'no stages recorded'}; report written to {json_path}")
+    print(f"[metrics] Touched {describe_io(report['io'])}")  # type: ignore[arg-type]
+    return json_path
+
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def default_metrics() -> Metrics:
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics(enabled=os.getenv("FREEFIRE_METRICS", "1") != "0")
+        return _default_metrics
+
+
+def stage(name: str):
+    """Shorthand for ``default_metrics().stage(name)``."""
+    return default_metrics().stage(name)
+
+
+def track_uid(uid: str):
+    return default_metrics().track_uid(uid)
+
+
+def count_bytes(direction: str, amount: int) -> None:
+    default_metrics().count_bytes(direction, amount)
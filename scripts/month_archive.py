@@ -0,0 +1,321 @@
+"""Compressed archive of closed months, read transparently with the live CSVs.
+
+``pack`` moves every monthly CSV older than the current Asia/Colombo month
+into its own ``players/<UID>/archive/YYYY MM.zip``: the CSV deflated byte for
+byte, plus an ``index.json`` member with its size, SHA-256 and precomputed
+summary stats. A closed month's archive is written once and then left alone,
+so each month adds one new blob to the repository instead of rewriting a
+growing one. The live file is removed only after its archive has been
+written atomically and read back, so an interrupted run leaves both copies
+and nothing is lost.
+
+``monthly_paths()`` lists archived months as ``ArchivedMonth`` objects next to
+the live ``Path`` objects. They support the read-only subset of ``Path`` the
+scripts use (``name``, ``parent``, ``open``, ``read_bytes``, ``stat``, …), so
+every reader sees one chronological month list. A live file for an archived
+month wins over the archived copy (e.g. after a backfill or a ``replay
+--in-place`` fix); the next ``pack`` folds it back in. ``collect_month_stats``
+takes archived months' stats from the index without parsing them.
+
+Usage::
+
+    python -m scripts.month_archive pack [UID ...] [--keep N] [--dry-run]
+    python -m scripts.month_archive unpack UID [MONTH ...]
+    python -m scripts.month_archive list UID
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import sys
+import zipfile
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.metrics import count_bytes
+from scripts.safe_io import atomic_write_bytes, player_lock, write_if_changed
+
+ARCHIVE_DIRNAME = "archive"
+INDEX_MEMBER = "index.json"
+ARCHIVE_VERSION = 2
+TIMEZONE = ZoneInfo("Asia/Colombo")
+# A fixed member timestamp keeps the archive bytes identical when nothing changed.
+MEMBER_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class MemberStat(NamedTuple):
+    """The ``os.stat_result`` fields the readers use, for an archived month."""
+
+    st_size: int
+    st_mtime_ns: int
+
+
+class ArchivedMonth:
+    """Read-only, ``Path``-like handle on one archived month."""
+
+    __slots__ = ("archive", "name", "size", "stats")
+
+    def __init__(self, archive: Path, name: str, size: int, stats: Optional[Dict[str, float]]) -> None:
+        self.archive = archive
+        self.name = name
+        self.size = size
+        self.stats = stats
+
+    @property
+    def parent(self) -> Path:
+        return self.archive.parent.parent
+
+    @property
+    def stem(self) -> str:
+        return Path(self.name).stem
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.name).suffix
+
+    def exists(self) -> bool:
+        return self.archive.exists()
+
+    def is_file(self) -> bool:
+        return self.exists()
+
+    def stat(self) -> MemberStat:
+        return MemberStat(self.size, self.archive.stat().st_mtime_ns)
+
+    def read_bytes(self) -> bytes:
+        with zipfile.ZipFile(self.archive) as archive:
+            data = archive.read(self.name)
+        count_bytes("read", len(data))
+        return data
+
+    def open(self, mode: str = "r", encoding: Optional[str] = None, newline: Optional[str] = None):
+        if mode not in ("r", "rb"):
+            raise ValueError(f"{self} is read-only")
+        raw = io.BytesIO(self.read_bytes())
+        if mode == "rb":
+            return raw
+        return io.TextIOWrapper(raw, encoding=encoding or "utf-8", newline=newline)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ArchivedMonth) and (self.archive, self.name) == (other.archive, other.name)
+
+    def __hash__(self) -> int:
+        return hash((self.archive, self.name))
+
+    def __str__(self) -> str:
+        return f"{self.archive}:{self.name}"
+
+    def __repr__(self) -> str:
+        return f"ArchivedMonth({str(self)!r})"
+
+
+def archive_dir(player_dir: Path) -> Path:
+    return player_dir / ARCHIVE_DIRNAME
+
+
+def month_name(year: int, month: int) -> str:
+    return f"{year} {month:02d}.CSV"
+
+
+def month_archive_path(player_dir: Path, name: str) -> Path:
+    return archive_dir(player_dir) / f"{Path(name).stem}.zip"
+
+
+@lru_cache(maxsize=4096)
+def read_entry(path: Path, size: int, mtime_ns: int) -> Dict[str, object]:
+    """Return a month archive's index entry; cached per archive version (size and mtime)."""
+    with zipfile.ZipFile(path) as archive:
+        payload = json.loads(archive.read(INDEX_MEMBER))
+    if payload.get("version") != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported archive version in {path}")
+    return payload
+
+
+def archived_months(player_dir: Path) -> List[ArchivedMonth]:
+    """Return the player's archived months, oldest first."""
+    months: List[ArchivedMonth] = []
+    for path in sorted(archive_dir(player_dir).glob("*.zip")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entry = read_entry(path, stat.st_size, stat.st_mtime_ns)
+        months.append(ArchivedMonth(path, str(entry["name"]), int(entry["size"]), entry.get("stats")))  # type: ignore[arg-type]
+    return months
+
+
+def load_index(player_dir: Path) -> Dict[str, Dict[str, object]]:
+    """Return ``{month name: index entry}`` for every archived month."""
+    index: Dict[str, Dict[str, object]] = {}
+    for month in archived_months(player_dir):
+        stat = month.archive.stat()
+        index[month.name] = read_entry(month.archive, stat.st_size, stat.st_mtime_ns)
+    return index
+
+
+def render_month(name: str, data: bytes, stats: Optional[Dict[str, float]]) -> bytes:
+    """Return the archive bytes for one month; the same input always gives the same bytes."""
+    entry = {
+        "version": ARCHIVE_VERSION,
+        "name": name,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "stats": stats,
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for member, payload in (
+            (name, data),
+            (INDEX_MEMBER, json.dumps(entry, indent=1, sort_keys=True).encode("utf-8")),
+        ):
+            info = zipfile.ZipInfo(member, MEMBER_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, payload)
+    return buffer.getvalue()
+
+
+def verify_month(path: Path, name: str, data: bytes) -> None:
+    with zipfile.ZipFile(path) as archive:
+        if archive.read(name) != data:
+            raise ValueError(f"Archived {name} does not match its source")
+
+
+def pack_player(player_dir: Path, cutoff: Tuple[int, int], dry_run: bool = False) -> Tuple[int, int, int]:
+    """Archive the live months before ``cutoff``; return (months packed, live bytes, archive bytes written)."""
+    from scripts.fetch_and_append import load_monthly_stats
+    from scripts.player_history import monthly_paths, parse_monthly_filename
+
+    with player_lock(player_dir):
+        live = [
+            path
+            for path in monthly_paths(player_dir)
+            if isinstance(path, Path) and parse_monthly_filename(path) < cutoff
+        ]
+        if not live:
+            return 0, 0, 0
+        live_bytes = sum(path.stat().st_size for path in live)
+        if dry_run:
+            return len(live), live_bytes, 0
+
+        archive_dir(player_dir).mkdir(exist_ok=True)
+        archive_bytes = 0
+        for path in live:
+            data = path.read_bytes()
+            try:
+                _, _, stats = load_monthly_stats(path)
+            except ValueError:
+                stats = None
+            # Normalise the name so "2025 1.csv" and "2025 01.CSV" share one archive.
+            name = month_name(*parse_monthly_filename(path))
+            target = month_archive_path(player_dir, name)
+            payload = render_month(name, data, stats)
+            if write_if_changed(target, payload):
+                archive_bytes += len(payload)
+            verify_month(target, name, data)
+            path.unlink()
+        return len(live), live_bytes, archive_bytes
+
+
+def unpack_player(player_dir: Path, names: Sequence[str]) -> List[str]:
+    """Restore archived months as live CSVs (all of them when ``names`` is empty)."""
+    with player_lock(player_dir):
+        wanted = set(names)
+        restored: List[str] = []
+        for month in archived_months(player_dir):
+            if wanted and month.name not in wanted and month.stem not in wanted:
+                continue
+            target = player_dir / month.name
+            if target.exists():
+                continue
+            atomic_write_bytes(target, month.read_bytes())
+            month.archive.unlink()
+            restored.append(month.name)
+        directory = archive_dir(player_dir)
+        if directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+        return restored
+
+
+def cutoff_month(keep: int, now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Return the oldest month kept live when the ``keep`` newest calendar months stay live."""
+    now = now or datetime.now(TIMEZONE)
+    index = now.year * 12 + now.month - 1 - (max(keep, 1) - 1)
+    return index // 12, index % 12 + 1
+
+
+def discover_uids(players_dir: Path) -> List[str]:
+    if not players_dir.is_dir():
+        return []
+    return sorted(path.name for path in players_dir.iterdir() if path.is_dir() and path.name.isdigit())
+
+
+def run_pack(uids: Sequence[str], keep: int, dry_run: bool) -> None:
+    from scripts.fetch_and_append import PLAYERS_DIR, update_summary
+
+    cutoff = cutoff_month(keep)
+    print(f"Archiving months before {cutoff[0]}-{cutoff[1]:02d}{' (dry run)' if dry_run else ''}.")
+    for uid in uids:
+        player_dir = PLAYERS_DIR / uid
+        packed, live_bytes, archive_bytes = pack_player(player_dir, cutoff, dry_run)
+        if not packed:
+            print(f"[{uid}] Nothing to archive.")
+            continue
+        if dry_run:
+            print(f"[{uid}] Would archive {packed} month(s), {live_bytes} byte(s).")
+            continue
+        update_summary(uid)
+        print(f"[{uid}] Archived {packed} month(s): {live_bytes} byte(s) of CSV, {archive_bytes} byte(s) of archives written.")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    # Imported here: player_history imports this module, and config fixes the
+    # API base URLs when it is first imported.
+    from scripts.config import DEFAULT_ARCHIVE_KEEP_MONTHS
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="move closed months into archive/")
+    pack.add_argument("uids", nargs="*", help="UIDs to archive (defaults to every player)")
+    pack.add_argument(
+        "--keep",
+        type=int,
+        default=DEFAULT_ARCHIVE_KEEP_MONTHS,
+        help="newest calendar months to keep live, including the current one",
+    )
+    pack.add_argument("--dry-run", action="store_true", help="only report what would be archived")
+    unpack = commands.add_parser("unpack", help="restore archived months as live CSVs")
+    unpack.add_argument("uid")
+    unpack.add_argument("months", nargs="*", help="months to restore, e.g. '2025 01' (default: all)")
+    listing = commands.add_parser("list", help="print a player's archived months and stats")
+    listing.add_argument("uid")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from scripts.fetch_and_append import PLAYERS_DIR
+
+    args = parse_args(argv)
+    if args.command == "pack":
+        run_pack(args.uids or discover_uids(PLAYERS_DIR), args.keep, args.dry_run)
+    elif args.command == "unpack":
+        restored = unpack_player(PLAYERS_DIR / args.uid, args.months)
+        print(f"[{args.uid}] Restored {len(restored)} month(s): {', '.join(restored) or 'none'}")
+    else:
+        for name, entry in sorted(load_index(PLAYERS_DIR / args.uid).items()):
+            print(f"{name}  {entry['size']:>8} bytes  {json.dumps(entry.get('stats'), sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,585 @@
+"""Compact, array-backed model of a player's logged history shared by every script.
+
+``PlayerHistory`` holds the monthly CSVs as parallel ``array('q')`` columns (day
+ordinal, BR score, likes, XP and their gains) and ``LikesHistory`` does the
+same for ``likes_activity.csv``. Rows are parsed positionally with
+``csv.reader`` and exposed through small ``__slots__`` views, so a player costs
+a few dozen bytes per day instead of a dict of strings per row. Blank cells are
+stored as ``MISSING`` and read back as ``None``; notes and dates that do not
+round-trip through their canonical format are kept in sparse dicts.
+
+Usage::
+
+    python -m scripts.player_history bench [UID ...] [--rows N] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import calendar
+import csv
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.metrics import count_bytes, stage
+from scripts.month_archive import archived_months
+from scripts.timeseries_store import CSV_COLUMNS, MISSING, format_day, np
+
+PLAYERS_DIR = PROJECT_ROOT / "players"
+LIKES_LOG_FILENAME = "likes_activity.csv"
+MONTHLY_HEADER = [
+    "Date",
+    "BR Score",
+    "Rank Gained",
+    "Likes",
+    "Likes Gained",
+    "XP",
+    "XP Gained",
+    "Notes",
+]
+# Rows are converted column by column in chunks of this many rows.
+CHUNK_ROWS = 512
+LIKES_COLUMNS = {
+    "likes_before": "Likes Before",
+    "likes_after": "Likes After",
+    "likes_received": "Likes Received",
+}
+
+
+def parse_int(value: Optional[str | int]) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    text = text.replace(",", "")
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def parse_date_cell(text: str) -> Tuple[int, Optional[str]]:
+    """Return the day ordinal of an ``M/D/YYYY`` or ``YYYY-MM-DD`` cell and its style.
+
+    The style is ``"mdy"`` or ``"iso"`` when the text is exactly what
+    ``format_day`` / ``format_iso_day`` would write back, else None. The ordinal
+    is ``MISSING`` when the text is not a date. Splitting by hand and caching
+    month starts is several times faster than ``datetime.strptime``.
+    """
+    try:
+        if "/" in text:
+            month, day, year = text.split("/")
+            wanted = "mdy"
+        else:
+            year, month, day = text.split("-")
+            wanted = "iso"
+        first, length, month_styles = month_start(year, month)
+        number = int(day)
+        if not 1 <= number <= length:
+            return MISSING, None
+        canonical_day = str(number) if wanted == "mdy" else f"{number:02d}"
+        canonical = wanted in month_styles and day == canonical_day
+        return first + number - 1, wanted if canonical else None
+    except ValueError:
+        return MISSING, None
+
+
+@lru_cache(maxsize=1024)
+def month_start(year: str, month: str) -> Tuple[int, int, Tuple[str, ...]]:
+    """Return the month's first ordinal, its length and the styles its text matches.
+
+    Raises ValueError when the text is not a valid year and month.
+    """
+    if len(year) != 4 or not year.isdigit() or not month.isdigit():
+        raise ValueError(f"Not a date: {year}/{month}")
+    number = int(month)
+    first = date(int(year), number, 1)
+    styles = tuple(
+        style
+        for style, ok in (("mdy", month == str(number)), ("iso", len(month) == 2))
+        if ok
+    )
+    return first.toordinal(), calendar.monthrange(first.year, number)[1], styles
+
+
+def parse_day(text: str) -> Optional[int]:
+    """Return the day ordinal of an ``M/D/YYYY`` or ``YYYY-MM-DD`` date, or None."""
+    ordinal, _ = parse_date_cell(text.strip())
+    return decode_int(ordinal)
+
+
+def format_iso_day(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+def parse_monthly_filename(path: Path) -> Tuple[int, int]:
+    if path.suffix.lower() != ".csv":
+        raise ValueError(f"Unexpected monthly filename format: {path.name}")
+    parts = path.stem.split(" ")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Unexpected monthly filename format: {path.name}")
+    year = int(parts[0])
+    month = int(parts[1])
+    if not 1 <= month <= 12:
+        raise ValueError(f"Unexpected monthly filename format: {path.name}")
+    return year, month
+
+
+def monthly_paths(player_dir: Path) -> List[Path]:
+    """Return the player's ``YYYY MM.CSV`` files in chronological order.
+
+    Months packed into ``archive/`` are included as read-only
+    ``ArchivedMonth`` handles; a live file for the same month takes precedence.
+    """
+    paths: List[Tuple[int, int, Path]] = []
+    for candidate in player_dir.glob('*.[cC][sS][vV]'):
+        if candidate.is_file():
+            try:
+                year, month = parse_monthly_filename(candidate)
+            except ValueError:
+                continue
+            paths.append((year, month, candidate))
+    live = {(year, month) for year, month, _ in paths}
+    for archived in archived_months(player_dir):
+        year, month = parse_monthly_filename(archived)  # type: ignore[arg-type]
+        if (year, month) not in live:
+            paths.append((year, month, archived))  # type: ignore[arg-type]
+    return [path for _, _, path in sorted(paths, key=lambda item: (item[0], item[1]))]
+
+
+@contextmanager
+def open_records(path: Path, start: int = 0) -> Iterator[Tuple[List[str], Iterator[List[str]]]]:
+    """Yield a CSV's header and a positional reader over its rows from byte ``start``.
+
+    ``start`` of 0 means just after the header. Blank lines are skipped, as
+    ``csv.DictReader`` would.
+    """
+    with stage("csv_read"), path.open("rb") as raw:
+        header = next(csv.reader([raw.readline().decode("utf-8")]), [])
+        header_end = raw.tell()
+        if start:
+            raw.seek(start)
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        try:
+            yield header, (values for values in csv.reader(text) if values)
+        finally:
+            text.detach()
+            count_bytes("read", header_end + raw.tell() - max(start, header_end))
+
+
+def column_positions(header: Sequence[str], names: Sequence[str]) -> List[Optional[int]]:
+    positions = {name: index for index, name in enumerate(header)}
+    return [positions.get(name) for name in names]
+
+
+def cell(values: Sequence[str], position: Optional[int]) -> str:
+    if position is None or position >= len(values):
+        return ""
+    return values[position]
+
+
+def iter_chunks(records: Iterator[List[str]], width: int) -> Iterator[List[List[str]]]:
+    """Group rows into chunks padded to ``width`` so columns convert in one pass each."""
+    while True:
+        chunk = list(islice(records, CHUNK_ROWS))
+        if not chunk:
+            return
+        for values in chunk:
+            if len(values) < width:
+                values.extend([""] * (width - len(values)))
+        yield chunk
+
+
+def column_cells(chunk: List[List[str]], position: Optional[int]) -> List[str]:
+    if position is None:
+        return [""] * len(chunk)
+    return [values[position] for values in chunk]
+
+
+def extend_ints(target: array, cells: List[str]) -> None:
+    try:
+        target.extend(array("q", [int(text) if text else MISSING for text in cells]))
+    except ValueError:
+        target.extend(array("q", [encode_int(text) for text in cells]))
+
+
+def extend_days(
+    days: array, odd_dates: Dict[int, str], cells: List[str], style: str
+) -> None:
+    """Append date ordinals, keeping the text of any date that is not in ``style``."""
+    offset = len(days)
+    for index, text in enumerate(cells, offset):
+        text = text.strip()
+        ordinal, text_style = parse_date_cell(text) if text else (MISSING, None)
+        if text_style != style:
+            odd_dates[index] = text
+        days.append(ordinal)
+
+
+def encode_int(text: str) -> int:
+    if not text:
+        return MISSING
+    try:
+        return int(text)
+    except ValueError:
+        value = parse_int(text)
+        return MISSING if value is None else value
+
+
+def decode_int(value: int) -> Optional[int]:
+    return None if value == MISSING else value
+
+
+def column_property(name: str) -> property:
+    def getter(self) -> Optional[int]:
+        return decode_int(self.history.columns[name][self.index])
+
+    return property(getter)
+
+
+class HistoryRow:
+    """View of one row of a ``PlayerHistory``; values are read from the arrays on access."""
+
+    __slots__ = ("history", "index")
+
+    br = column_property("br")
+    rank_gained = column_property("rank_gained")
+    likes = column_property("likes")
+    likes_gained = column_property("likes_gained")
+    xp = column_property("xp")
+    xp_gained = column_property("xp_gained")
+
+    def __init__(self, history: "PlayerHistory", index: int) -> None:
+        self.history = history
+        self.index = index
+
+    @property
+    def day(self) -> Optional[int]:
+        return decode_int(self.history.days[self.index])
+
+    @property
+    def date(self) -> str:
+        return self.history.date_text(self.index)
+
+    @property
+    def notes(self) -> str:
+        return self.history.notes.get(self.index, "")
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.history.path_of(self.index)
+
+    def as_dict(self) -> Dict[str, str]:
+        """Return the row keyed by ``MONTHLY_HEADER``, as ``csv.DictReader`` would."""
+        row = {"Date": self.date}
+        for name, column in CSV_COLUMNS.items():
+            value = self.history.columns[name][self.index]
+            row[column] = "" if value == MISSING else str(value)
+        row["Notes"] = self.notes
+        return row
+
+
+class PlayerHistory:
+    """A player's monthly CSVs held as typed columns, one entry per logged row."""
+
+    __slots__ = ("days", "columns", "notes", "odd_dates", "segments", "ordered")
+
+    def __init__(self) -> None:
+        self.days = array("q")
+        self.columns: Dict[str, array] = {name: array("q") for name in CSV_COLUMNS}
+        self.notes: Dict[int, str] = {}
+        self.odd_dates: Dict[int, str] = {}
+        self.segments: List[Tuple[Path, int, int]] = []
+        self.ordered = True
+
+    @classmethod
+    def from_paths(cls, paths: Sequence[Path]) -> "PlayerHistory":
+        history = cls()
+        for path in paths:
+            history.read(path)
+        return history
+
+    @classmethod
+    def load(cls, player_dir: Path) -> "PlayerHistory":
+        return cls.from_paths(monthly_paths(player_dir))
+
+    def read(self, path: Path) -> None:
+        """Append every row of one CSV with the monthly columns (missing columns stay blank)."""
+        start = len(self.days)
+        names = list(CSV_COLUMNS)
+        with open_records(path) as (header, records):
+            date_at, notes_at = column_positions(header, ["Date", "Notes"])
+            positions = column_positions(header, [CSV_COLUMNS[name] for name in names])
+            for chunk in iter_chunks(records, len(header)):
+                offset = len(self.days)
+                extend_days(self.days, self.odd_dates, column_cells(chunk, date_at), "mdy")
+                for name, position in zip(names, positions):
+                    extend_ints(self.columns[name], column_cells(chunk, position))
+                for index, notes in enumerate(column_cells(chunk, notes_at), offset):
+                    notes = notes.strip()
+                    if notes:
+                        self.notes[index] = notes
+        self.segments.append((path, start, len(self.days)))
+        days = self.days
+        if self.ordered and any(days[index] < days[index - 1] for index in range(max(start, 1), len(days))):
+            self.ordered = False
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __getitem__(self, index: int) -> HistoryRow:
+        if index < 0:
+            index += len(self.days)
+        if not 0 <= index < len(self.days):
+            raise IndexError(index)
+        return HistoryRow(self, index)
+
+    def __iter__(self) -> Iterator[HistoryRow]:
+        return (HistoryRow(self, index) for index in range(len(self.days)))
+
+    def date_text(self, index: int) -> str:
+        text = self.odd_dates.get(index)
+        return text if text is not None else format_day(self.days[index])
+
+    def path_of(self, index: int) -> Optional[Path]:
+        for path, start, stop in self.segments:
+            if start <= index < stop:
+                return path
+        return None
+
+    def last_row(self) -> Optional[HistoryRow]:
+        """Return the last row that has a date, as a scan of the CSVs in order would."""
+        for index in range(len(self.days) - 1, -1, -1):
+            if self.days[index] != MISSING or self.odd_dates.get(index):
+                return HistoryRow(self, index)
+        return None
+
+    def find(self, date_str: str) -> Optional[HistoryRow]:
+        day = parse_day(date_str)
+        if day is None:
+            return None
+        rows = self.between(day, day)
+        return rows[-1] if rows else None
+
+    def between(self, first_day: int, last_day: int) -> List[HistoryRow]:
+        """Rows whose day ordinal lies in ``[first_day, last_day]``, in log order."""
+        if self.ordered:
+            start = bisect_left(self.days, first_day)
+            stop = bisect_right(self.days, last_day)
+            return [HistoryRow(self, index) for index in range(start, stop)]
+        return [
+            HistoryRow(self, index)
+            for index, day in enumerate(self.days)
+            if first_day <= day <= last_day
+        ]
+
+    def month(self, year: int, month: int) -> List[HistoryRow]:
+        first = date(year, month, 1)
+        following = date(year + (month == 12), month % 12 + 1, 1)
+        return self.between(first.toordinal(), following.toordinal() - 1)
+
+    def by_month(self) -> Dict[Tuple[int, int], List[HistoryRow]]:
+        """Group dated rows by ``(year, month)``, each group sorted by day."""
+        groups: Dict[Tuple[int, int], List[HistoryRow]] = {}
+        order = sorted(
+            (index for index, day in enumerate(self.days) if day != MISSING),
+            key=self.days.__getitem__,
+        )
+        for index in order:
+            day = date.fromordinal(self.days[index])
+            groups.setdefault((day.year, day.month), []).append(HistoryRow(self, index))
+        return dict(sorted(groups.items()))
+
+    def values(self, name: str, rows: Optional[Sequence[HistoryRow]] = None) -> List[int]:
+        """Non-blank values of one column, for every row or just ``rows``."""
+        column = self.columns[name]
+        indices = range(len(column)) if rows is None else (row.index for row in rows)
+        return [column[index] for index in indices if column[index] != MISSING]
+
+    def column(self, name: str):
+        """Return a column as a NumPy array (a zero-copy view) when NumPy is available."""
+        values = self.days if name == "day" else self.columns[name]
+        return np.frombuffer(values, dtype=np.int64) if np is not None else values
+
+
+class LikesRow:
+    """View of one row of a ``LikesHistory``."""
+
+    __slots__ = ("history", "index")
+
+    def __init__(self, history: "LikesHistory", index: int) -> None:
+        self.history = history
+        self.index = index
+
+    @property
+    def date(self) -> str:
+        text = self.history.odd_dates.get(self.index)
+        return text if text is not None else format_iso_day(self.history.days[self.index])
+
+    @property
+    def success(self) -> bool:
+        return bool(self.history.success[self.index])
+
+    def value(self, name: str) -> Optional[int]:
+        return decode_int(self.history.columns[name][self.index])
+
+
+class LikesHistory:
+    """A player's likes activity log held as typed columns."""
+
+    __slots__ = ("days", "columns", "success", "odd_dates")
+
+    def __init__(self) -> None:
+        self.days = array("q")
+        self.columns: Dict[str, array] = {name: array("q") for name in LIKES_COLUMNS}
+        self.success = array("b")
+        self.odd_dates: Dict[int, str] = {}
+
+    @classmethod
+    def from_path(cls, path: Path) -> "LikesHistory":
+        history = cls()
+        if path.exists():
+            history.read(path)
+        return history
+
+    def read(self, path: Path) -> None:
+        names = list(LIKES_COLUMNS)
+        with open_records(path) as (header, records):
+            date_at, success_at = column_positions(header, ["Date", "Success"])
+            positions = column_positions(header, [LIKES_COLUMNS[name] for name in names])
+            for chunk in iter_chunks(records, len(header)):
+                extend_days(self.days, self.odd_dates, column_cells(chunk, date_at), "iso")
+                for name, position in zip(names, positions):
+                    extend_ints(self.columns[name], column_cells(chunk, position))
+                self.success.extend(
+                    array("b", [text.strip().lower() == "true" for text in column_cells(chunk, success_at)])
+                )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __iter__(self) -> Iterator[LikesRow]:
+        return (LikesRow(self, index) for index in range(len(self.days)))
+
+    def last_success_date(self) -> Optional[str]:
+        """Return the latest date with a successful row, as written in the log."""
+        best: Optional[int] = None
+        for index, (day, success) in enumerate(zip(self.days, self.success)):
+            if success and day != MISSING and (best is None or day >= self.days[best]):
+                best = index
+        return LikesRow(self, best).date if best is not None else None
+
+
+def dictreader_rows(paths: Sequence[Path]) -> List[Dict[str, str]]:
+    rows: List[Dict[str, str]] = []
+    for path in paths:
+        with path.open("r", newline="", encoding="utf-8") as handle:
+            rows.extend(csv.DictReader(handle))
+    return rows
+
+
+def dictreader_typed_rows(paths: Sequence[Path]) -> List[Dict[str, object]]:
+    """DictReader rows with the dates and numbers parsed, as the scripts used to do."""
+    rows: List[Dict[str, object]] = []
+    for row in dictreader_rows(paths):
+        typed: Dict[str, object] = {column: parse_int(row.get(column)) for column in CSV_COLUMNS.values()}
+        typed["Date"] = datetime.strptime(row["Date"], "%m/%d/%Y")
+        typed["Notes"] = row.get("Notes") or ""
+        rows.append(typed)
+    return rows
+
+
+def measure(loader: Callable[[], object], repeat: int) -> Tuple[float, int, int]:
+    """Return the best load time in seconds and the retained and peak traced bytes."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        loader()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        result = loader()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return best, retained, peak
+
+
+def write_synthetic_month(path: Path, rows: int) -> None:
+    first = date(2020, 1, 1)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(MONTHLY_HEADER)
+        for offset in range(rows):
+            writer.writerow(
+                [
+                    format_day((first + timedelta(days=offset)).toordinal()),
+                    5000 + offset % 300,
+                    offset % 7 or "",
+                    100000 + offset * 90,
+                    90,
+                    7000000 + offset * 15000,
+                    15000,
+                    "Double XP Card Activated" if offset % 10 == 0 else "",
+                ]
+            )
+
+
+def bench(label: str, paths: Sequence[Path], repeat: int) -> None:
+    rows = len(dictreader_rows(paths))
+    print(f"[{label}] {rows} row(s)")
+    loaders = (
+        ("DictReader (strings)", lambda: dictreader_rows(paths)),
+        ("DictReader + parsing", lambda: dictreader_typed_rows(paths)),
+        ("PlayerHistory", lambda: PlayerHistory.from_paths(paths)),
+    )
+    for name, loader in loaders:
+        elapsed, retained, peak = measure(loader, repeat)
+        print(
+            f"  {name:<22} {elapsed * 1000:8.1f} ms  "
+            f"{retained / 1024:8.0f} KiB retained  {peak / 1024:8.0f} KiB peak"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare PlayerHistory with csv.DictReader.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_parser = sub.add_parser("bench", help="time and measure parsing the monthly CSVs")
+    bench_parser.add_argument("uids", nargs="*", help="UIDs to parse (defaults to every player)")
+    bench_parser.add_argument("--rows", type=int, default=0, help="also parse N synthetic rows")
+    bench_parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best is kept)")
+    args = parser.parse_args(argv)
+
+    uids = args.uids or sorted(path.name for path in PLAYERS_DIR.iterdir() if path.is_dir())
+    for uid in uids:
+        paths = monthly_paths(PLAYERS_DIR / uid)
+        if paths:
+            bench(uid, paths, args.repeat)
+    if args.rows > 0:
+        with tempfile.TemporaryDirectory(prefix="ff-history-bench-") as tmp:
+            path = Path(tmp) / "2020 01.CSV"
+            write_synthetic_month(path, args.rows)
+            bench("synthetic", [path], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-player state index so frequent runs can skip re-reading whole CSV logs.
+
+``players/<UID>/state.json`` is committed with the data so CI runs, which
+start from a fresh checkout, stay incremental. Its content is a pure function
+of the CSVs it describes (sorted keys, sizes rather than mtimes, no
+timestamps), so a run that changes nothing leaves it byte-identical.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from scripts.safe_io import player_lock, write_if_changed
+
+STATE_FILENAME = "state.json"
+STATE_VERSION = 1
+
+
+def state_path(player_dir: Path) -> Path:
+    return player_dir / STATE_FILENAME
+
+
+def load_state(player_dir: Path) -> Dict[str, Dict[str, object]]:
+    path = state_path(player_dir)
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != STATE_VERSION:
+        return {}
+    return {key: value for key, value in payload.items() if isinstance(value, dict)}
+
+
+def save_state(player_dir: Path, state: Dict[str, Dict[str, object]]) -> None:
+    """Write the state file atomically so readers never observe a partial file."""
+    payload = {"version": STATE_VERSION, **state}
+    data = json.dumps(payload, indent=2, sort_keys=True) + "\n"
+    write_if_changed(state_path(player_dir), data.encode("utf-8"))
+
+
+def file_signature(path: Path) -> Dict[str, object]:
+    """Identify a CSV by name and size; sizes survive a fresh git checkout, mtimes do not."""
+    size = path.stat().st_size if path.exists() else 0
+    return {"file": path.name, "size": size}
+
+
+def section_is_fresh(section: Optional[Dict[str, object]], path: Path) -> bool:
+    if not section:
+        return False
+    signature = file_signature(path)
+    return section.get("file") == signature["file"] and section.get("size") == signature["size"]
+
+
+def update_section(player_dir: Path, name: str, values: Dict[str, object]) -> None:
+    with player_lock(player_dir):
+        state = load_state(player_dir)
+        if state.get(name) == values:
+            return
+        state[name] = values
+        save_state(player_dir, state)
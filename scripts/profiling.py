@@ -0,0 +1,200 @@
+"""Opt-in cProfile and tracemalloc reports for the script entry points.
+
+Every script accepts ``--profile [STAGE]`` (or ``FREEFIRE_PROFILE=STAGE``).
+Without a stage the whole run is profiled, including the per-UID work done on
+worker threads; with one (``summary``, ``csv_read``, ``http``, … – the stage
+names from ``scripts.metrics``) only the time spent inside that stage is.
+Each run writes to ``.cache/profiles/`` (``FREEFIRE_PROFILE_DIR``):
+
+* ``<script>-<stamp>.prof``       – raw stats for ``pstats`` / snakeviz;
+* ``<script>-<stamp>-hotspots.txt`` – top functions by cumulative and own time;
+* ``<script>-<stamp>-alloc.txt``  – peak traced memory and the source lines
+  that allocated the most between the start and the end of the run.
+
+Process-pool workers (``generate_old_csvs``) are not followed, so that script
+runs its players in-process while profiling.
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from scripts.metrics import PROJECT_ROOT, default_metrics
+
+PROFILE_DIR = PROJECT_ROOT / ".cache" / "profiles"
+WHOLE_RUN = "all"
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+
+
+class RunProfiler:
+    """Collect cProfile stats from every thread that enters a profiled section."""
+
+    def __init__(self, stage: Optional[str] = None) -> None:
+        self.stage = stage
+        self.stats: Optional[pstats.Stats] = None
+        self.sections = 0
+        self.stage_peak = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def wants(self, name: str) -> bool:
+        return self.stage is None or self.stage == name
+
+    @contextmanager
+    def section(self) -> Iterator[None]:
+        # cProfile only sees the thread that enabled it and allows one profiler
+        # per thread, so nested sections in the same thread are folded into the outer one.
+        if getattr(self.local, "active", False):
+            yield
+            return
+        profile = cProfile.Profile()
+        self.local.active = True
+        if self.stage is not None and tracemalloc.is_tracing():
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        else:
+            baseline = None
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.local.active = False
+            with self.lock:
+                self.sections += 1
+                if baseline is not None:
+                    self.stage_peak = max(self.stage_peak, tracemalloc.get_traced_memory()[1] - baseline)
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=WHOLE_RUN,
+        metavar="STAGE",
+        help="write cProfile/tracemalloc reports for the run, or only for STAGE",
+    )
+
+
+def profile_target(requested: Optional[str]) -> Optional[str]:
+    """Return ``all``, a stage name, or None when profiling is off."""
+    value = (requested or os.getenv("FREEFIRE_PROFILE") or "").strip()
+    if value.lower() in ("", "0"):
+        return None
+    return WHOLE_RUN if value.lower() in ("1", WHOLE_RUN) else value
+
+
+def profile_dir() -> Path:
+    raw = os.getenv("FREEFIRE_PROFILE_DIR")
+    return Path(raw) if raw else PROFILE_DIR
+
+
+def render_hotspots(profiler: RunProfiler, name: str, elapsed: float) -> str:
+    buffer = io.StringIO()
+    scope = f"stage {profiler.stage!r}" if profiler.stage else "whole run"
+    buffer.write(
+        f"{name}: {scope}, {profiler.sections} profiled section(s), {elapsed:.3f}s wall clock\n"
+    )
+    if profiler.stats is None:
+        buffer.write("\nNothing was profiled; check the stage name.\n")
+        return buffer.getvalue()
+    for key, title in (("cumulative", "cumulative time"), ("tottime", "own time")):
+        buffer.write(f"\n=== Top {TOP_FUNCTIONS} by {title} ===\n")
+        profiler.stats.stream = buffer
+        profiler.stats.sort_stats(key).print_stats(TOP_FUNCTIONS)
+    return buffer.getvalue()
+
+
+def render_allocations(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int, stage_peak: int
+) -> str:
+    lines = [f"Peak traced memory: {peak / 1024:.1f} KiB"]
+    if stage_peak:
+        lines.append(f"Peak growth inside the profiled stage: {stage_peak / 1024:.1f} KiB")
+    lines.append("")
+    lines.append(f"=== Top {TOP_ALLOCATIONS} allocation sites (net change over the run) ===")
+    # Leave out the profiler's own bookkeeping.
+    filters = [
+        tracemalloc.Filter(False, module.__file__)
+        for module in (tracemalloc, cProfile, pstats)
+    ] + [
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    diff.sort(key=lambda stat: (abs(stat.size_diff), stat.count_diff), reverse=True)
+    lines.extend(str(stat) for stat in diff[:TOP_ALLOCATIONS])
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profiled(name: str, requested: Optional[str] = None) -> Iterator[None]:
+    """Profile the enclosed run when ``--profile`` / ``FREEFIRE_PROFILE`` asks for it."""
+    target = profile_target(requested)
+    if target is None:
+        yield
+        return
+    profiler = RunProfiler(None if target == WHOLE_RUN else target)
+    metrics = default_metrics()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    metrics.profiler = profiler
+    started = time.perf_counter()
+    try:
+        if profiler.stage is None:
+            with profiler.section():
+                yield
+        else:
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.profiler = None
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        write_profile(profiler, name, elapsed, before, after, peak)
+
+
+def write_profile(
+    profiler: RunProfiler,
+    name: str,
+    elapsed: float,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+) -> None:
+    from scripts.safe_io import atomic_write_bytes
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    suffix = f"-{profiler.stage}" if profiler.stage else ""
+    base = profile_dir() / f"{name}{suffix}-{stamp}"
+    try:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if profiler.stats is not None:
+            profiler.stats.dump_stats(f"{base}.prof")
+        atomic_write_bytes(
+            Path(f"{base}-hotspots.txt"), render_hotspots(profiler, name, elapsed).encode("utf-8")
+        )
+        atomic_write_bytes(
+            Path(f"{base}-alloc.txt"),
+            render_allocations(before, after, peak, profiler.stage_peak).encode("utf-8"),
+        )
+    except OSError as exc:
+        print(f"[profile] Could not write the {name} profile: {exc}")
+        return
+    print(f"[profile] Reports written to {base}-hotspots.txt and {base}-alloc.txt")
@@ -0,0 +1,301 @@
+"""Local read-only HTTP JSON service over the ``players/`` tree.
+
+Endpoints (all ``GET``)::
+
+    /players                                   UIDs with a player directory
+    /players/<UID>/latest                      newest daily row and likes log row
+    /players/<UID>/summary                     summary.csv as columns and rows
+    /players/<UID>/series?from=&to=&fields=    daily rows in a date range
+    /__stats                                   cache hits, misses and evictions
+
+``from``/``to`` accept ``YYYY-MM-DD`` or ``M/D/YYYY`` and default to the first
+and last logged month; ``fields`` limits the columns (``xp,br,...``). A range
+query binary-searches the sorted monthly file list for the months it covers
+and parses only those. Parsed files are kept in an LRU keyed by path and
+checked against the file's size and mtime on every hit, so rows appended by
+``fetch_and_append.py`` are picked up without a restart.
+
+Usage::
+
+    python -m scripts.query_service [--host 127.0.0.1] [--port 8780]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.config import DEFAULT_QUERY_CACHE_ENTRIES, DEFAULT_QUERY_PORT, parse_worker_count
+from scripts.dashboard_bundle import read_table
+from scripts.player_history import (
+    LIKES_COLUMNS,
+    LIKES_LOG_FILENAME,
+    PLAYERS_DIR,
+    HistoryRow,
+    LikesHistory,
+    LikesRow,
+    PlayerHistory,
+    monthly_paths,
+    parse_day,
+    parse_monthly_filename,
+)
+
+SERIES_FIELDS = ["br", "rank_gained", "likes", "likes_gained", "xp", "xp_gained", "notes"]
+
+MonthKey = Tuple[int, int]
+
+
+class QueryError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class FileCache:
+    """LRU of parsed files, each entry valid while the file's size and mtime are unchanged."""
+
+    def __init__(self, max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, Path], Tuple[Tuple[int, int], object]]" = OrderedDict()
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+    def get(self, kind: str, path: Path, loader: Callable[[Path], object]) -> object:
+        stat = path.stat()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        key = (kind, path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1]
+            self.counters["misses"] += 1
+        # Parse outside the lock; two threads racing on one file just both parse it.
+        value = loader(path)
+        with self.lock:
+            self.entries[key] = (signature, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {**self.counters, "entries": len(self.entries), "max_entries": self.max_entries}
+
+
+def load_month_index(player_dir: Path) -> Tuple[List[MonthKey], List[Path]]:
+    paths = monthly_paths(player_dir)
+    return [parse_monthly_filename(path) for path in paths], paths
+
+
+class PlayerStore:
+    """Answers queries for every player, sharing one ``FileCache``."""
+
+    def __init__(self, players_dir: Path = PLAYERS_DIR, cache: Optional[FileCache] = None) -> None:
+        self.players_dir = players_dir
+        self.cache = cache if cache is not None else FileCache()
+
+    def player_dir(self, uid: str) -> Path:
+        if not uid.isdigit():
+            raise QueryError(400, "UID must be numeric")
+        path = self.players_dir / uid
+        if not path.is_dir():
+            raise QueryError(404, f"Unknown UID {uid}")
+        return path
+
+    def month_index(self, player_dir: Path) -> Tuple[List[MonthKey], List[Path]]:
+        # A directory's mtime changes whenever a monthly file is added or removed.
+        return self.cache.get("months", player_dir, load_month_index)  # type: ignore[return-value]
+
+    def month(self, path: Path) -> PlayerHistory:
+        return self.cache.get("month", path, lambda p: PlayerHistory.from_paths([p]))  # type: ignore[return-value]
+
+    def uids(self) -> List[str]:
+        if not self.players_dir.is_dir():
+            return []
+        return sorted(path.name for path in self.players_dir.iterdir() if path.is_dir() and path.name.isdigit())
+
+    def latest(self, uid: str) -> Dict[str, object]:
+        player_dir = self.player_dir(uid)
+        _, paths = self.month_index(player_dir)
+        daily: Optional[Dict[str, object]] = None
+        for path in reversed(paths):
+            row = self.month(path).last_row()
+            if row is not None:
+                daily = {**row_payload(row, SERIES_FIELDS), "file": path.name}
+                break
+        likes: Optional[Dict[str, object]] = None
+        likes_path = player_dir / LIKES_LOG_FILENAME
+        if likes_path.exists():
+            history: LikesHistory = self.cache.get("likes", likes_path, LikesHistory.from_path)  # type: ignore[assignment]
+            if len(history):
+                last = LikesRow(history, len(history) - 1)
+                likes = {"date": last.date, "success": last.success}
+                likes.update({name: last.value(name) for name in LIKES_COLUMNS})
+                likes["last_success_date"] = history.last_success_date()
+        return {"uid": uid, "daily": daily, "likes": likes}
+
+    def summary(self, uid: str) -> Dict[str, object]:
+        path = self.player_dir(uid) / "summary.csv"
+        if not path.exists():
+            return {"uid": uid, "columns": [], "rows": []}
+        return {"uid": uid, **self.cache.get("summary", path, read_table)}  # type: ignore[dict-item]
+
+    def series(
+        self, uid: str, first: Optional[str], last: Optional[str], fields: List[str]
+    ) -> Dict[str, object]:
+        player_dir = self.player_dir(uid)
+        keys, paths = self.month_index(player_dir)
+        if not keys:
+            return {"uid": uid, "fields": fields, "rows": []}
+        first_day = query_day(first, "from") if first else date(*keys[0], 1).toordinal()
+        last_day = query_day(last, "to") if last else month_end(keys[-1])
+        if first_day > last_day:
+            raise QueryError(400, "'from' is after 'to'")
+        first_date, last_date = date.fromordinal(first_day), date.fromordinal(last_day)
+        start = bisect_left(keys, (first_date.year, first_date.month))
+        stop = bisect_right(keys, (last_date.year, last_date.month))
+        rows: List[Dict[str, object]] = []
+        for path in paths[start:stop]:
+            rows.extend(row_payload(row, fields) for row in self.month(path).between(first_day, last_day))
+        return {
+            "uid": uid,
+            "from": first_date.isoformat(),
+            "to": last_date.isoformat(),
+            "fields": fields,
+            "months": len(paths[start:stop]),
+            "rows": rows,
+        }
+
+
+def month_end(key: MonthKey) -> int:
+    year, month = key
+    return date(year + (month == 12), month % 12 + 1, 1).toordinal() - 1
+
+
+def query_day(text: str, name: str) -> int:
+    day = parse_day(text)
+    if day is None:
+        raise QueryError(400, f"'{name}' must be YYYY-MM-DD or M/D/YYYY")
+    return day
+
+
+def parse_fields(raw: Optional[str]) -> List[str]:
+    if not raw:
+        return list(SERIES_FIELDS)
+    fields = [part.strip() for part in raw.split(",") if part.strip()]
+    unknown = [field for field in fields if field not in SERIES_FIELDS]
+    if unknown:
+        raise QueryError(400, f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def row_payload(row: HistoryRow, fields: List[str]) -> Dict[str, object]:
+    day = row.day
+    payload: Dict[str, object] = {"date": date.fromordinal(day).isoformat() if day is not None else row.date}
+    for field in fields:
+        payload[field] = getattr(row, field)
+    return payload
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store: PlayerStore
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        segments = [part for part in url.path.split("/") if part]
+        try:
+            self.reply(200, self.route(segments, query))
+        except QueryError as exc:
+            self.reply(exc.status, {"error": str(exc)})
+        except Exception as exc:  # pylint: disable=broad-except
+            self.reply(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def route(self, segments: List[str], query: Dict[str, str]) -> object:
+        if segments == ["__stats"]:
+            return self.store.cache.stats()
+        if segments == ["players"]:
+            return {"players": self.store.uids()}
+        if len(segments) == 3 and segments[0] == "players":
+            uid, view = segments[1], segments[2]
+            if view == "latest":
+                return self.store.latest(uid)
+            if view == "summary":
+                return self.store.summary(uid)
+            if view == "series":
+                return self.store.series(
+                    uid, query.get("from"), query.get("to"), parse_fields(query.get("fields"))
+                )
+        raise QueryError(404, "Not found")
+
+    def reply(self, status: int, payload: object) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+def make_server(
+    store: PlayerStore, host: str = "127.0.0.1", port: int = DEFAULT_QUERY_PORT
+) -> ThreadingHTTPServer:
+    handler = type("BoundQueryHandler", (QueryHandler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("FREEFIRE_QUERY_PORT") or DEFAULT_QUERY_PORT)
+    )
+    parser.add_argument("--players-dir", type=Path, default=PLAYERS_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    cache = FileCache(
+        parse_worker_count(os.getenv("FREEFIRE_QUERY_CACHE_ENTRIES"), DEFAULT_QUERY_CACHE_ENTRIES)
+    )
+    server = make_server(PlayerStore(args.players_dir, cache), args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Query service listening on http://{host}:{port} for {args.players_dir}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Regenerate the derived files of every player after a format change or a manual CSV fix.
+
+For each ``players/<UID>/`` directory, in a process pool:
+
+* ``likes``   – normalise ``likes_activity.csv`` (drop failed rows, ``TRUE`` casing);
+* ``history`` – rebuild ``history.json`` from the monthly CSVs;
+* ``summary`` – rebuild ``summary.csv`` (ignoring the stats cache) and the dashboard bundle;
+* ``mirrors`` – refresh the repository-root copies kept for the default UIDs.
+
+Progress and per-player timings are printed as players finish. A failing
+player is reported with its output and does not stop the batch; the exit
+status is 1 if any player failed.
+
+Usage::
+
+    python -m scripts.rebuild_all [UID ...] [--workers N] [--skip likes,mirrors]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts import cleanup_likes_log, fetch_and_append
+from scripts.history_pyramid import rebuild_history
+from scripts.metrics import default_metrics, io_delta, stage, write_reports
+from scripts.player_history import LIKES_LOG_FILENAME, PLAYERS_DIR, monthly_paths
+from scripts.profiling import add_profile_argument, profile_target, profiled
+from scripts.safe_io import player_lock
+
+STEPS = ["likes", "history", "summary", "mirrors"]
+
+# uid, ok, per-step seconds, captured output, io counters recorded while rebuilding
+PlayerResult = Tuple[str, bool, Dict[str, float], str, Dict[str, float]]
+
+
+def discover_uids(players_dir: Path = PLAYERS_DIR) -> List[str]:
+    if not players_dir.is_dir():
+        return []
+    return sorted(path.name for path in players_dir.iterdir() if path.is_dir() and path.name.isdigit())
+
+
+def run_step(name: str, timings: Dict[str, float], action) -> None:
+    started = time.perf_counter()
+    with stage(name):
+        action()
+    timings[name] = time.perf_counter() - started
+
+
+def rebuild_player(uid: str, steps: Sequence[str]) -> PlayerResult:
+    """Rebuild one player's derived files; runs inside a worker process."""
+    player_dir = PLAYERS_DIR / uid
+    likes_path = player_dir / LIKES_LOG_FILENAME
+    timings: Dict[str, float] = {}
+    output = io.StringIO()
+    io_before = default_metrics().io_counts()
+    try:
+        with contextlib.redirect_stdout(output), player_lock(player_dir):
+            paths = monthly_paths(player_dir)
+            if "likes" in steps and likes_path.exists():
+                run_step("likes", timings, lambda: cleanup_likes_log.clean_likes_log(likes_path))
+            if "history" in steps and paths:
+                run_step("history", timings, lambda: rebuild_history(player_dir, paths))
+            if "summary" in steps:
+                run_step(
+                    "summary", timings, lambda: fetch_and_append.update_summary(uid, full_rebuild=True)
+                )
+            if "mirrors" in steps:
+
+                def mirror() -> None:
+                    if paths:
+                        fetch_and_append.sync_default_exports(uid, paths[-1])
+                    if likes_path.exists():
+                        cleanup_likes_log.sync_default_likes_log(uid, likes_path)
+
+                run_step("mirrors", timings, mirror)
+    except Exception:  # pylint: disable=broad-except
+        output.write(traceback.format_exc())
+        return uid, False, timings, output.getvalue(), io_delta(io_before, default_metrics().io_counts())
+    return uid, True, timings, output.getvalue(), io_delta(io_before, default_metrics().io_counts())
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+
+
+def rebuild_all(uids: Sequence[str], steps: Sequence[str], workers: int) -> List[PlayerResult]:
+    """Rebuild every UID, printing progress as players finish; return all results."""
+    results: List[PlayerResult] = []
+
+    def report(result: PlayerResult) -> None:
+        results.append(result)
+        uid, ok, timings, output, _ = result
+        total = sum(timings.values())
+        status = "ok" if ok else "FAILED"
+        print(f"[{len(results)}/{len(uids)}] {uid} {status} in {total:.2f}s ({format_timings(timings)})")
+        if not ok:
+            print("    " + output.rstrip().replace("\n", "\n    "))
+
+    if workers <= 1:
+        for uid in uids:
+            report(rebuild_player(uid, steps))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(rebuild_player, uid, steps): uid for uid in uids}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                # The worker itself died (e.g. killed); the player still counts as failed.
+                result = (futures[future], False, {}, f"{type(exc).__name__}: {exc}", {})
+            # Worker processes have their own metrics; fold their io counters in here.
+            default_metrics().add_io(result[4])
+            report(result)
+    return results
+
+
+def parse_steps(raw: Optional[List[str]]) -> List[str]:
+    skipped = {part.strip() for value in raw or [] for part in value.split(",") if part.strip()}
+    unknown = skipped - set(STEPS)
+    if unknown:
+        raise SystemExit(f"Unknown step(s) to skip: {', '.join(sorted(unknown))}")
+    return [step for step in STEPS if step not in skipped]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("uids", nargs="*", help="UIDs to rebuild (defaults to every player)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--skip", action="append", metavar="STEP", help=f"steps to skip: {', '.join(STEPS)}"
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    steps = parse_steps(args.skip)
+    uids = args.uids or discover_uids()
+    if not uids:
+        print(f"No player directories found in {PLAYERS_DIR}.")
+        return
+    workers = max(1, min(args.workers, len(uids)))
+    if profile_target(args.profile) is not None:
+        # The profiler does not follow worker processes.
+        workers = 1
+    print(f"Rebuilding {len(uids)} player(s) ({', '.join(steps)}) with {workers} worker(s).")
+
+    started = time.perf_counter()
+    with profiled("rebuild_all", args.profile):
+        results = rebuild_all(uids, steps, workers)
+    elapsed = time.perf_counter() - started
+
+    failed = [uid for uid, ok, _, _, _ in results if not ok]
+    slowest = sorted(results, key=lambda result: sum(result[2].values()), reverse=True)[:5]
+    print(f"Rebuilt {len(results) - len(failed)}/{len(results)} player(s) in {elapsed:.2f}s.")
+    if slowest:
+        print("Slowest: " + ", ".join(f"{uid} {sum(t.values()):.2f}s" for uid, _, t, _, _ in slowest))
+    write_reports("rebuild_all")
+    if failed:
+        print(f"Failed: {', '.join(sorted(failed))}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
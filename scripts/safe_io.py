@@ -0,0 +1,245 @@
+"""Crash-safe file writes and per-player advisory locks shared by every writer.
+
+* ``player_lock`` serialises writers of one ``players/<UID>/`` directory across
+  threads and processes (``flock`` on ``.lock``), so overlapping workflow runs
+  can safely process disjoint UIDs in parallel. It is re-entrant per thread.
+* ``atomic_open`` / ``atomic_copy`` write through an fsynced temp file that is
+  renamed over the target, so readers never see a half-written file.
+* ``write_if_changed`` / ``mirror_file`` compare sizes and SHA-256 digests
+  first and leave files that already hold the content alone. Mirrors are
+  reflinked or hardlinked into place when the filesystem allows it
+  (``FREEFIRE_MIRROR_LINKS=0`` always copies).
+* ``append_csv_row`` appends one fsynced row, terminating an unterminated last
+  line first so rows are never glued together.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, TextIO, Tuple
+
+from scripts.metrics import count_bytes
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock; fall back to thread locks
+    fcntl = None
+
+LOCK_FILENAME = ".lock"
+DEFAULT_FILE_MODE = 0o644
+HASH_CHUNK = 1 << 16
+# Linux ioctl that makes a file a copy-on-write clone of another (btrfs, XFS, ...).
+FICLONE = 0x40049409
+
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+def fsync_dir(path: Path) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+@contextmanager
+def player_lock(player_dir: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on a player directory."""
+    player_dir.mkdir(parents=True, exist_ok=True)
+    key = str(player_dir.resolve())
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.RLock())
+    held: Dict[str, Tuple[int, int]] = getattr(_held, "locks", None) or {}
+    _held.locks = held
+
+    with thread_lock:
+        if key in held:
+            fd, depth = held[key]
+            held[key] = (fd, depth + 1)
+            try:
+                yield
+            finally:
+                held[key] = (fd, held[key][1] - 1)
+            return
+
+        fd = os.open(player_dir / LOCK_FILENAME, os.O_RDWR | os.O_CREAT, DEFAULT_FILE_MODE)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            held[key] = (fd, 1)
+            try:
+                yield
+            finally:
+                del held[key]
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = "w", encoding: Optional[str] = "utf-8") -> Iterator[TextIO]:
+    """Yield a handle to a temp file that replaces ``path`` only if the block succeeds."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        os.chmod(tmp_name, path.stat().st_mode & 0o777 if path.exists() else DEFAULT_FILE_MODE)
+        if "b" in mode:
+            handle = os.fdopen(fd, mode)
+        else:
+            handle = os.fdopen(fd, mode, newline="", encoding=encoding)
+        with handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+            count_bytes("written", os.fstat(handle.fileno()).st_size)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    fsync_dir(path.parent)
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    with atomic_open(path, "wb") as handle:
+        handle.write(data)
+
+
+def atomic_copy(src: Path, dst: Path) -> None:
+    """Copy ``src`` over ``dst`` so that ``dst`` is always either old or new, never partial."""
+    with src.open("rb") as source, atomic_open(dst, "wb") as target:
+        shutil.copyfileobj(source, target)
+
+
+def content_digest(source: Path) -> str:
+    digest = hashlib.sha256()
+    with source.open("rb") as handle:
+        for block in iter(lambda: handle.read(HASH_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def holds_bytes(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+    except FileNotFoundError:
+        return False
+    return content_digest(path) == hashlib.sha256(data).hexdigest()
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically write ``data`` unless ``path`` already holds it; return True if written."""
+    if holds_bytes(path, data):
+        count_bytes("unchanged", len(data))
+        return False
+    atomic_write_bytes(path, data)
+    return True
+
+
+def files_match(src: Path, dst: Path) -> bool:
+    try:
+        dst_stat = dst.stat()
+    except FileNotFoundError:
+        return False
+    src_stat = src.stat()
+    if isinstance(src, Path) and (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    return src_stat.st_size == dst_stat.st_size and content_digest(src) == content_digest(dst)
+
+
+def mirror_links_enabled() -> bool:
+    return os.getenv("FREEFIRE_MIRROR_LINKS", "1") != "0"
+
+
+def reflink(src: Path, target: Path) -> bool:
+    """Create ``target`` as a copy-on-write clone of ``src``; False if unsupported."""
+    if fcntl is None or not hasattr(fcntl, "ioctl"):
+        return False
+    with src.open("rb") as source:
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, src.stat().st_mode & 0o777)
+        try:
+            fcntl.ioctl(fd, FICLONE, source.fileno())
+            os.fsync(fd)
+        except OSError:
+            os.close(fd)
+            os.unlink(target)
+            return False
+        os.close(fd)
+    return True
+
+
+def link_into_place(src: Path, dst: Path) -> bool:
+    """Reflink, else hardlink, ``src`` to a temp name renamed over ``dst``; False if neither works."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.parent / f".{dst.name}.{os.getpid()}.{threading.get_ident()}.link"
+    try:
+        if not reflink(src, tmp):
+            os.link(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        return False
+    fsync_dir(dst.parent)
+    return True
+
+
+def mirror_file(src: Path, dst: Path) -> bool:
+    """Make ``dst`` a copy of ``src`` unless it already is one; return True if ``dst`` changed.
+
+    A hardlinked mirror shares the source's inode, so in-place appends to the
+    source show up in the mirror too; atomic rewrites of the source break the
+    link and the next call relinks it. ``src`` may also be an archived month,
+    which is always copied.
+    """
+    if files_match(src, dst):
+        count_bytes("unchanged", src.stat().st_size)
+        return False
+    if isinstance(src, Path) and mirror_links_enabled() and link_into_place(src, dst):
+        count_bytes("linked", src.stat().st_size)
+        return True
+    atomic_copy(src, dst)
+    return True
+
+
+def csv_line(values: Sequence[object]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode("utf-8")
+
+
+def append_csv_row(path: Path, header: Sequence[str], values: Sequence[object]) -> None:
+    """Append one row durably, writing the header first if the file is new or empty."""
+    payload = csv_line(values)
+    with path.open("a+b") as handle:
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        if size == 0:
+            payload = csv_line(header) + payload
+        else:
+            handle.seek(size - 1)
+            if handle.read(1) != b"\n":
+                # Either a hand-edited file without a final newline or a row torn by
+                # a crash; terminate it so the new row is never glued onto it.
+                payload = b"\r\n" + payload
+        handle.write(payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    count_bytes("written", len(payload))
@@ -0,0 +1,287 @@
+"""Long-running scheduler that replaces the per-run GitHub Actions crons.
+
+One process keeps a warm pooled HTTP client, the storage backend and the info
+cache across runs and triggers, in Asia/Colombo time:
+
+* ``fetch``   – the daily progress log at ``FREEFIRE_FETCH_AT`` (08:00);
+* ``likes``   – the likes booster inside ``FREEFIRE_LIKES_WINDOW`` (00:00-06:00),
+  retried every ``FREEFIRE_RETRY_EVERY`` seconds until every UID succeeded;
+* ``cleanup`` – the incremental likes log cleanup at ``FREEFIRE_CLEANUP_AT``;
+  a day's cleanup that did not complete by midnight runs on the next poll.
+
+Each attempt is recorded in ``.cache/scheduler.json`` with the last day the
+job completed, so after a restart the daemon neither repeats a job that
+already finished nor skips one that was missed while it was down. ``FREEFIRE_SCHEDULER_HOOK`` (a shell command) runs
+after every attempt with ``FREEFIRE_JOB`` set, e.g. to commit and push.
+
+Usage::
+
+    python -m scripts.scheduler [--once]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, time as clock_time, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts import cleanup_likes_log, fetch_and_append, send_likes
+from scripts.config import (
+    DEFAULT_LIKES_WORKERS,
+    DEFAULT_SCHEDULE_CLEANUP_AT,
+    DEFAULT_SCHEDULE_FETCH_AT,
+    DEFAULT_SCHEDULE_LIKES_WINDOW,
+    DEFAULT_SCHEDULE_POLL,
+    DEFAULT_SCHEDULE_RETRY_EVERY,
+    parse_worker_count,
+)
+from scripts.http_client import HttpClient
+from scripts.metrics import default_metrics, write_reports
+from scripts.safe_io import atomic_open
+from scripts.storage import StorageBackend, open_backend
+
+STATE_PATH = PROJECT_ROOT / ".cache" / "scheduler.json"
+STATE_VERSION = 1
+TIMEZONE = fetch_and_append.TIMEZONE
+
+JobRecord = Dict[str, object]
+
+
+def parse_clock(text: str) -> clock_time:
+    hours, minutes = text.strip().split(":")
+    return clock_time(int(hours), int(minutes))
+
+
+def parse_window(text: str) -> Tuple[clock_time, clock_time]:
+    start, end = text.split("-")
+    return parse_clock(start), parse_clock(end)
+
+
+def in_window(now: clock_time, window: Tuple[clock_time, clock_time]) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def load_records(path: Path = STATE_PATH) -> Dict[str, JobRecord]:
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != STATE_VERSION:
+        return {}
+    jobs = payload.get("jobs")
+    return jobs if isinstance(jobs, dict) else {}
+
+
+def save_records(records: Dict[str, JobRecord], path: Path = STATE_PATH) -> None:
+    with atomic_open(path) as handle:
+        json.dump({"version": STATE_VERSION, "jobs": records}, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+class Job:
+    """A daily job that is due from ``start`` (or inside ``window``) until it succeeds.
+
+    With ``catch_up`` a run that did not complete on its day stays due after
+    midnight, until it has run once for that day.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], bool],
+        start: Optional[clock_time] = None,
+        window: Optional[Tuple[clock_time, clock_time]] = None,
+        catch_up: bool = False,
+    ) -> None:
+        self.name = name
+        self.run = run
+        self.start = start
+        self.window = window
+        self.catch_up = catch_up
+
+    def occurrence(self, now: datetime) -> Optional[str]:
+        """Return the day (ISO) a run started now would complete, or None outside the schedule."""
+        if self.window is not None and not in_window(now.time(), self.window):
+            return None
+        if self.start is not None and now.time() < self.start:
+            return (now.date() - timedelta(days=1)).isoformat() if self.catch_up else None
+        return now.date().isoformat()
+
+    def is_due(self, now: datetime, record: JobRecord, retry_every: float) -> bool:
+        day = self.occurrence(now)
+        if day is None or str(record.get("day") or "") >= day:
+            return False
+        last_attempt = record.get("last_attempt")
+        if record.get("attempt_day") == day and isinstance(last_attempt, (int, float)):
+            return now.timestamp() - last_attempt >= retry_every
+        return True
+
+
+class Scheduler:
+    def __init__(
+        self,
+        client: HttpClient,
+        backend: StorageBackend,
+        retry_every: float = DEFAULT_SCHEDULE_RETRY_EVERY,
+        state_path: Path = STATE_PATH,
+        hook: Optional[str] = None,
+        now: Callable[[], datetime] = lambda: datetime.now(TIMEZONE),
+    ) -> None:
+        self.client = client
+        self.backend = backend
+        self.retry_every = retry_every
+        self.state_path = state_path
+        self.hook = hook
+        self.now = now
+        self.records = load_records(state_path)
+        self.stop_event = threading.Event()
+        self.jobs = [
+            Job(
+                "likes",
+                self.run_likes,
+                window=parse_window(
+                    os.getenv("FREEFIRE_LIKES_WINDOW") or DEFAULT_SCHEDULE_LIKES_WINDOW
+                ),
+            ),
+            Job(
+                "fetch",
+                self.run_fetch,
+                start=parse_clock(os.getenv("FREEFIRE_FETCH_AT") or DEFAULT_SCHEDULE_FETCH_AT),
+            ),
+            Job(
+                "cleanup",
+                self.run_cleanup,
+                start=parse_clock(os.getenv("FREEFIRE_CLEANUP_AT") or DEFAULT_SCHEDULE_CLEANUP_AT),
+                catch_up=True,
+            ),
+        ]
+
+    def run_fetch(self) -> bool:
+        uids = fetch_and_append.determine_target_uids()
+        workers = min(fetch_and_append.determine_worker_count(), len(uids))
+        failed = fetch_and_append.run_fetch(uids, self.client, self.backend, workers)
+        return not failed
+
+    def run_likes(self) -> bool:
+        dispatcher = send_likes.build_dispatcher(self.backend, self.client)
+        results = dispatcher.run(send_likes.determine_target_uids())
+        return not results[send_likes.OUTCOME_FAILED] and not results[send_likes.OUTCOME_DEFERRED]
+
+    def run_cleanup(self) -> bool:
+        cleanup_likes_log.clean_all(incremental=True)
+        return True
+
+    def attempt(self, job: Job, now: datetime) -> bool:
+        day = job.occurrence(now) or now.date().isoformat()
+        record = self.records.setdefault(job.name, {})
+        if record.get("attempt_day") != day:
+            record["attempt_day"] = day
+            record["attempts"] = 0
+        record["attempts"] = int(record.get("attempts") or 0) + 1
+        record["last_attempt"] = now.timestamp()
+        scope = "today" if day == now.date().isoformat() else f"for {day}, catching up"
+        print(f"[scheduler] Running {job.name} (attempt {record['attempts']} {scope}).")
+
+        default_metrics().reset()
+        started = time.perf_counter()
+        try:
+            succeeded = job.run()
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[scheduler] {job.name} failed: {exc}")
+            succeeded = False
+        record["last_duration"] = round(time.perf_counter() - started, 3)
+        record["last_status"] = "ok" if succeeded else "failed"
+        if succeeded:
+            record["day"] = day
+        save_records(self.records, self.state_path)
+        print(
+            f"[scheduler] {job.name} {record['last_status']} in {record['last_duration']:.2f}s."
+        )
+        write_reports(f"scheduler_{job.name}")
+        self.run_hook(job)
+        return succeeded
+
+    def run_hook(self, job: Job) -> None:
+        if not self.hook:
+            return
+        env = {**os.environ, "FREEFIRE_JOB": job.name}
+        result = subprocess.run(self.hook, shell=True, cwd=PROJECT_ROOT, env=env, check=False)
+        if result.returncode:
+            print(f"[scheduler] Hook exited with status {result.returncode} after {job.name}.")
+
+    def run_due(self) -> List[str]:
+        """Attempt every job that is due right now; return their names."""
+        ran: List[str] = []
+        for job in self.jobs:
+            now = self.now()
+            if job.is_due(now, self.records.get(job.name, {}), self.retry_every):
+                self.attempt(job, now)
+                ran.append(job.name)
+        return ran
+
+    def serve(self, poll: float) -> None:
+        print(f"[scheduler] Started; checking for due jobs every {poll:.0f}s.")
+        while not self.stop_event.is_set():
+            self.run_due()
+            self.stop_event.wait(poll)
+        print("[scheduler] Stopped.")
+
+    def stop(self, *_args: object) -> None:
+        self.stop_event.set()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="run whatever is due now and exit"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    pool_size = max(
+        fetch_and_append.determine_worker_count(),
+        parse_worker_count(os.getenv("FREEFIRE_LIKES_WORKERS"), DEFAULT_LIKES_WORKERS),
+    )
+    backend = open_backend()
+    with HttpClient(pool_size=pool_size) as client:
+        scheduler = Scheduler(
+            client,
+            backend,
+            retry_every=float(os.getenv("FREEFIRE_RETRY_EVERY") or DEFAULT_SCHEDULE_RETRY_EVERY),
+            hook=os.getenv("FREEFIRE_SCHEDULER_HOOK"),
+        )
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        try:
+            if args.once:
+                ran = scheduler.run_due()
+                print(f"[scheduler] Ran: {', '.join(ran) if ran else 'nothing due'}.")
+            else:
+                scheduler.serve(float(os.getenv("FREEFIRE_SCHEDULE_POLL") or DEFAULT_SCHEDULE_POLL))
+        finally:
+            backend.close()
+            client.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 """Automate sending likes via the Free Fire likes API and log the results."""
 from __future__ import annotations
 
+import argparse
 import csv
 import os
 import sys
-import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import requests
 from zoneinfo import ZoneInfo
@@ -19,11 +22,27 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from scripts.config import (
     DEFAULT_LIKES_API_KEY,
+    DEFAULT_LIKES_IN_FLIGHT,
+    DEFAULT_LIKES_KEY_QUOTA,
+    DEFAULT_LIKES_RETRY_DELAY,
+    DEFAULT_LIKES_RETRY_ROUNDS,
     DEFAULT_LIKES_UIDS,
-    build_api_url,
+    DEFAULT_LIKES_WORKERS,
     build_likes_api_url,
+    parse_count,
+    parse_seconds,
     parse_uid_list,
+    parse_worker_count,
 )
+from scripts.http_client import CircuitOpenError, HttpClient, default_client
+from scripts.info_cache import default_cache, disable_default_cache, fetch_info
+from scripts.journal import record_response
+from scripts.metrics import default_metrics, stage, track_uid, write_reports
+from scripts.safe_io import append_csv_row, atomic_open, mirror_file
+from scripts.profiling import add_profile_argument, profiled
+from scripts.storage import StorageBackend, open_backend
+from scripts.player_history import LikesHistory, parse_int
+from scripts.player_state import file_signature, load_state, section_is_fresh, update_section
 
 TIMEZONE = ZoneInfo("Asia/Colombo")
 PLAYERS_DIR = PROJECT_ROOT / "players"
@@ -62,50 +81,38 @@ def sync_default_likes_log(uid: str, path: Path) -> None:
     """Copy the default likes log back to the repository root."""
     if not DEFAULT_LIKES_UIDS or uid != DEFAULT_LIKES_UIDS[0]:
         return
-    shutil.copyfile(path, PROJECT_ROOT / 'likes_activity.csv')
+    with stage("mirror"):
+        mirror_file(path, PROJECT_ROOT / 'likes_activity.csv')
 
 def ensure_log_header(path: Path) -> None:
     if path.exists():
         return
-    with path.open("w", newline="", encoding="utf-8") as handle:
+    with atomic_open(path) as handle:
         writer = csv.writer(handle)
         writer.writerow(LIKES_LOG_HEADER)
 
 
-def parse_int(value: Optional[str | int]) -> Optional[int]:
-    if value is None:
-        return None
-    if isinstance(value, int):
-        return value
-    text = str(value).strip()
-    if not text:
-        return None
-    text = text.replace(",", "")
-    try:
-        return int(text)
-    except ValueError:
-        return None
-
-
-def load_entries(path: Path) -> List[Dict[str, str]]:
-    if not path.exists():
-        return []
-    with path.open("r", newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        return list(reader)
+def last_success_date(path: Path) -> Optional[str]:
+    """Return the latest successful date in the log, preferring the per-player state index."""
+    player_dir = path.parent
+    section = load_state(player_dir).get("likes")
+    if section_is_fresh(section, path):
+        value = section.get("last_success_date")
+        return str(value) if value else None
+    latest = LikesHistory.from_path(path).last_success_date()
+    values: Dict[str, object] = dict(file_signature(path))
+    values["last_success_date"] = latest
+    update_section(player_dir, "likes", values)
+    return latest
 
 
 def success_already_logged(path: Path, date_str: str) -> bool:
-    for row in load_entries(path):
-        if row.get("Date") == date_str and row.get("Success", "").lower() == "true":
-            return True
-    return False
+    return last_success_date(path) == date_str
 
 
-def fetch_current_likes(uid: str) -> int:
-    response = requests.get(build_api_url(uid), timeout=30)
-    response.raise_for_status()
-    data = response.json()
+def fetch_current_likes(uid: str, client: Optional[HttpClient] = None) -> int:
+    with stage("http"):
+        data = fetch_info(uid, client, journal="likes_info")
     likes_raw = data.get("basicInfo", {}).get("liked")
     likes = parse_int(likes_raw)
     if likes is None:
@@ -113,9 +120,9 @@ def fetch_current_likes(uid: str) -> int:
     return likes
 
 
-def safe_current_likes(uid: str) -> int:
+def safe_current_likes(uid: str, client: Optional[HttpClient] = None) -> int:
     try:
-        return fetch_current_likes(uid)
+        return fetch_current_likes(uid, client)
     except Exception as exc:  # pylint: disable=broad-except
         print(f"[{uid}] Failed to obtain likes count for logging: {exc}")
         return 0
@@ -129,71 +136,126 @@ def append_log_entry(
     likes_received: int,
     success: bool,
 ) -> None:
-    ensure_log_header(path)
-    with path.open("a", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(
+    previous_success = last_success_date(path) if path.exists() else None
+    with stage("csv_write"):
+        append_csv_row(
+            path,
+            LIKES_LOG_HEADER,
             [
                 date_str,
                 likes_before,
                 likes_after,
                 likes_received,
                 "TRUE" if success else "FALSE",
-            ]
+            ],
         )
+    values: Dict[str, object] = dict(file_signature(path))
+    values["last_success_date"] = (
+        max(date_str, previous_success or "") if success else previous_success
+    )
+    update_section(path.parent, "likes", values)
+
 
+def call_likes_api(
+    uid: str, api_key: str, client: Optional[HttpClient] = None
+) -> Dict[str, object]:
+    client = client if client is not None else default_client()
+    with stage("http"):
+        response = client.get(build_likes_api_url(uid, api_key))
+        return response.json()
 
-def call_likes_api(uid: str, api_key: str) -> Dict[str, object]:
-    url = build_likes_api_url(uid, api_key)
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-    return response.json()
 
+def granted_likes(payload: Dict[str, object]) -> Optional[Tuple[Optional[int], Optional[int], int]]:
+    """Return ``(before, after, received)`` if the likes API granted likes, else None.
 
-def process_uid(uid: str) -> None:
-    player_dir = ensure_player_dir(uid)
-    log_path = player_dir / "likes_activity.csv"
+    ``before``/``after`` are None when the response omits them.
+    """
+    if payload.get("status") != 1:
+        return None
+    response = payload.get("response", {})
+    return (
+        parse_int(response.get("LikesbeforeCommand")),
+        parse_int(response.get("LikesafterCommand")),
+        parse_int(response.get("LikesGivenByAPI")) or 0,
+    )
+
+
+OUTCOME_GRANTED = "granted"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_FAILED = "failed"
+OUTCOME_DEFERRED = "deferred"
+# A transient failure that was not logged; the dispatcher may try the UID again.
+OUTCOME_RETRY = "retry"
+
+
+def is_transient(exc: requests.RequestException) -> bool:
+    """True for transport errors, an open circuit, 5xx and 429: failures a later attempt may fix."""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError, CircuitOpenError)):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and (response.status_code >= 500 or response.status_code == 429)
+
+
+def process_uid(
+    uid: str,
+    backend: Optional[StorageBackend] = None,
+    client: Optional[HttpClient] = None,
+    api_key: Optional[str] = None,
+    log_failure: bool = True,
+) -> str:
+    """Request likes for one UID and return the outcome.
+
+    With ``log_failure=False`` a transient failure (see ``is_transient``) is not
+    written to the log and returns ``OUTCOME_RETRY``, so a dispatcher can retry
+    it later in the same run without piling up FALSE rows. Any other failure,
+    such as the API refusing a second grant today, is final and always logged.
+    """
+    backend = backend if backend is not None else open_backend()
+    client = client if client is not None else default_client()
+    api_key = api_key or LIKES_API_KEY
     now_colombo = datetime.now(TIMEZONE)
     today_str = now_colombo.strftime("%Y-%m-%d")
 
-    if success_already_logged(log_path, today_str):
+    if backend.likes_success_logged(uid, today_str):
         print(f"[{uid}] Likes already sent successfully today; skipping API call.")
-        return
+        return OUTCOME_SKIPPED
 
     try:
-        payload = call_likes_api(uid, LIKES_API_KEY)
+        payload = call_likes_api(uid, api_key, client)
     except requests.RequestException as exc:
-        likes_current = safe_current_likes(uid)
-        append_log_entry(
-            log_path,
-            today_str,
-            likes_current,
-            likes_current,
-            0,
-            False,
-        )
-        sync_default_likes_log(uid, log_path)
+        final = log_failure or not is_transient(exc)
+        record_response(uid, "likes", None, now_colombo, error=str(exc), final=final)
+        if final:
+            likes_current = safe_current_likes(uid, client)
+            backend.append_likes(
+                uid,
+                today_str,
+                likes_current,
+                likes_current,
+                0,
+                False,
+            )
         print(f"[{uid}] Likes API request failed: {exc}")
-        return
+        return OUTCOME_FAILED if final else OUTCOME_RETRY
 
+    record_response(uid, "likes", payload, now_colombo, final=True)
     status = payload.get("status")
-    if status == 1:
-        response = payload.get("response", {})
-        likes_before = parse_int(response.get("LikesbeforeCommand"))
-        likes_after = parse_int(response.get("LikesafterCommand"))
-        likes_received = parse_int(response.get("LikesGivenByAPI")) or 0
+    granted = granted_likes(payload)
+    if granted is not None:
+        # The grant changed the likes count, so any cached /info payload is stale.
+        default_cache().invalidate(uid)
+        likes_before, likes_after, likes_received = granted
         if likes_before is None or likes_after is None:
-            likes_before = safe_current_likes(uid)
+            likes_before = safe_current_likes(uid, client)
             likes_after = likes_before + likes_received
-        append_log_entry(
-            log_path,
+        backend.append_likes(
+            uid,
             today_str,
             likes_before,
             likes_after,
             likes_received,
             True,
         )
-        sync_default_likes_log(uid, log_path)
         print(
             f"[{uid}] Likes API success:",
             {
@@ -202,18 +264,17 @@ def process_uid(uid: str) -> None:
                 "likes_received": likes_received,
             },
         )
-        return
+        return OUTCOME_GRANTED
 
-    likes_current = safe_current_likes(uid)
-    append_log_entry(
-        log_path,
+    likes_current = safe_current_likes(uid, client)
+    backend.append_likes(
+        uid,
         today_str,
         likes_current,
         likes_current,
         0,
         False,
     )
-    sync_default_likes_log(uid, log_path)
     message = payload.get("message") or payload.get("response", {}).get("message")
     print(
         f"[{uid}] Likes API did not grant likes:",
@@ -222,12 +283,167 @@ def process_uid(uid: str) -> None:
             "message": message,
         },
     )
+    return OUTCOME_FAILED
 
 
-def main() -> None:
+class KeyQuota:
+    """Per-API-key call budget for one run plus a cap on concurrent requests."""
+
+    def __init__(self, key: str, limit: int, in_flight: int) -> None:
+        self.key = key
+        self.limit = limit
+        self.used = 0
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max(in_flight, 1))
+
+    def reserve(self) -> bool:
+        with self.lock:
+            if self.limit and self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+class LikesDispatcher:
+    def __init__(
+        self,
+        backend: StorageBackend,
+        client: HttpClient,
+        keys: List[str],
+        quota: int,
+        concurrency: int,
+        in_flight: int,
+        retry_rounds: int,
+        retry_delay: float,
+    ) -> None:
+        self.backend = backend
+        self.client = client
+        self.quotas = [KeyQuota(key, quota, in_flight) for key in keys]
+        self.concurrency = max(concurrency, 1)
+        self.retry_rounds = max(retry_rounds, 0)
+        self.retry_delay = retry_delay
+        self.next_key = 0
+        self.key_lock = threading.Lock()
+
+    def reserve_key(self) -> Optional[KeyQuota]:
+        """Pick the next key (round-robin) that still has budget left."""
+        with self.key_lock:
+            start = self.next_key
+            self.next_key = (self.next_key + 1) % len(self.quotas)
+        for offset in range(len(self.quotas)):
+            quota = self.quotas[(start + offset) % len(self.quotas)]
+            if quota.reserve():
+                return quota
+        return None
+
+    def attempt(self, uid: str, final: bool) -> str:
+        quota = self.reserve_key()
+        if quota is None:
+            print(f"[{uid}] Every likes API key is out of quota for this run; deferring.")
+            return OUTCOME_DEFERRED
+        with quota.slots, track_uid(uid):
+            return process_uid(uid, self.backend, self.client, quota.key, log_failure=final)
+
+    def run(self, uids: List[str]) -> Dict[str, List[str]]:
+        started = time.perf_counter()
+        results: Dict[str, List[str]] = {
+            OUTCOME_GRANTED: [],
+            OUTCOME_SKIPPED: [],
+            OUTCOME_FAILED: [],
+            OUTCOME_DEFERRED: [],
+        }
+        today_str = datetime.now(TIMEZONE).strftime("%Y-%m-%d")
+        pending: List[str] = []
+        for uid in uids:
+            if self.backend.likes_success_logged(uid, today_str):
+                results[OUTCOME_SKIPPED].append(uid)
+            else:
+                pending.append(uid)
+
+        for round_number in range(self.retry_rounds + 1):
+            if not pending:
+                break
+            if round_number:
+                print(
+                    f"Retrying {len(pending)} UID(s) in {self.retry_delay:.0f}s "
+                    f"(round {round_number + 1}/{self.retry_rounds + 1})."
+                )
+                time.sleep(self.retry_delay)
+            final = round_number == self.retry_rounds
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as executor:
+                outcomes = list(executor.map(lambda uid: self.attempt(uid, final), pending))
+            retry: List[str] = []
+            for uid, outcome in zip(pending, outcomes):
+                if outcome == OUTCOME_RETRY:
+                    retry.append(uid)
+                else:
+                    results[outcome].append(uid)
+            pending = retry
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"Likes run finished in {elapsed:.2f}s: "
+            f"{len(results[OUTCOME_GRANTED])} granted, "
+            f"{len(results[OUTCOME_SKIPPED])} skipped, "
+            f"{len(results[OUTCOME_FAILED])} failed, "
+            f"{len(results[OUTCOME_DEFERRED])} deferred."
+        )
+        for outcome in (OUTCOME_FAILED, OUTCOME_DEFERRED):
+            if results[outcome]:
+                print(f"  {outcome}: {', '.join(results[outcome])}")
+        for outcome, outcome_uids in results.items():
+            default_metrics().count(f"uids_{outcome}", len(outcome_uids))
+        return results
+
+
+def determine_api_keys() -> List[str]:
+    return parse_uid_list(os.getenv("FREEFIRE_LIKES_KEYS"), [LIKES_API_KEY])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always call the info API instead of reusing a fresh cached response",
+    )
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def build_dispatcher(backend: StorageBackend, client: HttpClient) -> LikesDispatcher:
+    """Create a dispatcher with fresh per-run key budgets from the environment."""
+    return LikesDispatcher(
+        backend,
+        client,
+        determine_api_keys(),
+        quota=parse_worker_count(os.getenv("FREEFIRE_LIKES_KEY_QUOTA"), DEFAULT_LIKES_KEY_QUOTA),
+        concurrency=parse_worker_count(
+            os.getenv("FREEFIRE_LIKES_WORKERS"), DEFAULT_LIKES_WORKERS
+        ),
+        in_flight=parse_worker_count(
+            os.getenv("FREEFIRE_LIKES_IN_FLIGHT"), DEFAULT_LIKES_IN_FLIGHT
+        ),
+        retry_rounds=parse_count(os.getenv("FREEFIRE_LIKES_RETRY_ROUNDS"), DEFAULT_LIKES_RETRY_ROUNDS),
+        retry_delay=parse_seconds(os.getenv("FREEFIRE_LIKES_RETRY_DELAY"), DEFAULT_LIKES_RETRY_DELAY),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.no_cache:
+        disable_default_cache()
     uids = determine_target_uids()
-    for uid in uids:
-        process_uid(uid)
+    backend = open_backend()
+    client = default_client()
+    dispatcher = build_dispatcher(backend, client)
+    try:
+        with profiled("send_likes", args.profile):
+            dispatcher.run(uids)
+    finally:
+        backend.close()
+    client.report()
+    write_reports("send_likes")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,484 @@
+"""Pluggable storage backends for the daily progress and likes logs.
+
+``CsvBackend`` keeps the historical ``players/<UID>/`` CSV layout and is the
+default. ``SqliteBackend`` stores the same rows in one SQLite database indexed by
+``(uid, date)``; select it with ``FREEFIRE_STORAGE=sqlite``. Each append also
+rewrites the touched month's CSV (or the likes log) from SQLite, the summary
+from SQL-computed month stats, and the history, bundle and root mirrors, so the
+dashboard and git history keep working. The bulk exporter writes everything
+back out at once.
+
+Usage::
+
+    python -m scripts.storage import [UID ...]   # seed SQLite from the CSV tree
+    python -m scripts.storage export [UID ...] [--out DIR]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.config import DEFAULT_SQLITE_PATH, DEFAULT_STORAGE_BACKEND
+from scripts.dashboard_bundle import write_bundle
+from scripts.history_pyramid import append_history
+from scripts.metrics import stage
+from scripts.safe_io import player_lock, write_if_changed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    uid TEXT NOT NULL,
+    date TEXT NOT NULL,
+    br INTEGER,
+    rank_gained INTEGER,
+    likes INTEGER,
+    likes_gained INTEGER,
+    xp INTEGER,
+    xp_gained INTEGER,
+    notes TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (uid, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS likes_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT NOT NULL,
+    date TEXT NOT NULL,
+    likes_before INTEGER NOT NULL,
+    likes_after INTEGER NOT NULL,
+    likes_received INTEGER NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS likes_log_uid_date ON likes_log (uid, date);
+"""
+
+DAILY_COLUMNS = [
+    ("br", "BR Score"),
+    ("rank_gained", "Rank Gained"),
+    ("likes", "Likes"),
+    ("likes_gained", "Likes Gained"),
+    ("xp", "XP"),
+    ("xp_gained", "XP Gained"),
+]
+
+MONTH_STATS_SQL = """
+SELECT
+    CAST(substr(date, 1, 4) AS INTEGER) AS year,
+    CAST(substr(date, 6, 2) AS INTEGER) AS month,
+    COUNT(xp) AS days_logged,
+    (SELECT d2.xp FROM daily AS d2
+        WHERE d2.uid = d.uid AND substr(d2.date, 1, 7) = substr(d.date, 1, 7)
+          AND d2.xp IS NOT NULL
+        ORDER BY d2.date LIMIT 1) AS start_xp,
+    (SELECT d2.xp FROM daily AS d2
+        WHERE d2.uid = d.uid AND substr(d2.date, 1, 7) = substr(d.date, 1, 7)
+          AND d2.xp IS NOT NULL
+        ORDER BY d2.date DESC LIMIT 1) AS end_xp,
+    SUM(xp_gained) AS gain_sum,
+    COUNT(xp_gained) AS gain_count
+FROM daily AS d
+WHERE uid = ?
+GROUP BY substr(date, 1, 7)
+HAVING COUNT(xp) > 0
+ORDER BY year, month
+"""
+
+
+def to_iso(date_str: str) -> str:
+    return datetime.strptime(date_str.strip(), "%m/%d/%Y").date().isoformat()
+
+
+def from_iso(iso: str) -> str:
+    day = date.fromisoformat(iso)
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+def month_filename(iso: str) -> str:
+    return f"{iso[:4]} {iso[5:7]}.CSV"
+
+
+def to_int(value: object) -> Optional[int]:
+    if value is None or isinstance(value, int):
+        return value
+    text = str(value).strip().replace(",", "")
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+class StorageBackend(ABC):
+    """Interface shared by the CSV and SQLite backends."""
+
+    @abstractmethod
+    def last_logged(self, uid: str) -> Optional[Dict[str, object]]:
+        """Return ``last_date``/``last_file``/``br``/``likes``/``xp`` of the newest daily row."""
+
+    @abstractmethod
+    def append_daily(self, uid: str, when: datetime, row: Dict[str, object]) -> None:
+        ...
+
+    @abstractmethod
+    def likes_success_logged(self, uid: str, date_str: str) -> bool:
+        ...
+
+    @abstractmethod
+    def append_likes(
+        self,
+        uid: str,
+        date_str: str,
+        likes_before: int,
+        likes_after: int,
+        likes_received: int,
+        success: bool,
+    ) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class CsvBackend(StorageBackend):
+    """The original per-player CSV layout under ``players/<UID>/``."""
+
+    def __init__(self, full_rebuild: bool = False) -> None:
+        self.full_rebuild = full_rebuild
+
+    def last_logged(self, uid: str) -> Optional[Dict[str, object]]:
+        from scripts.fetch_and_append import load_last_logged_state
+
+        return load_last_logged_state(uid)
+
+    def append_daily(self, uid: str, when: datetime, row: Dict[str, object]) -> None:
+        from scripts import fetch_and_append as daily
+        from scripts.player_state import update_section
+
+        path = daily.monthly_file_path(uid, when)
+        with player_lock(path.parent):
+            daily.append_monthly_entry(path, row)
+            update_section(
+                path.parent, "monthly", daily.monthly_state_values(path, path, row)
+            )
+            with stage("history"):
+                append_history(path.parent, row, list(daily.iter_monthly_files(uid)))
+            daily.update_summary(uid, self.full_rebuild)
+            daily.sync_default_exports(uid, path)
+
+    def likes_success_logged(self, uid: str, date_str: str) -> bool:
+        from scripts import send_likes
+
+        path = send_likes.ensure_player_dir(uid) / "likes_activity.csv"
+        return send_likes.success_already_logged(path, date_str)
+
+    def append_likes(
+        self,
+        uid: str,
+        date_str: str,
+        likes_before: int,
+        likes_after: int,
+        likes_received: int,
+        success: bool,
+    ) -> None:
+        from scripts import send_likes
+
+        path = send_likes.ensure_player_dir(uid) / "likes_activity.csv"
+        with player_lock(path.parent):
+            send_likes.append_log_entry(
+                path, date_str, likes_before, likes_after, likes_received, success
+            )
+            send_likes.sync_default_likes_log(uid, path)
+            with stage("bundle"):
+                write_bundle(path.parent)
+
+
+class SqliteBackend(StorageBackend):
+    """All players in one SQLite database; safe to share between worker threads."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def last_logged(self, uid: str) -> Optional[Dict[str, object]]:
+        with stage("sqlite"), self.lock:
+            found = self.connection.execute(
+                "SELECT date, br, likes, xp FROM daily WHERE uid = ? ORDER BY date DESC LIMIT 1",
+                (uid,),
+            ).fetchone()
+        if found is None:
+            return None
+        iso, br, likes, xp = found
+        return {
+            "last_date": from_iso(iso),
+            "last_file": month_filename(iso),
+            "br": br,
+            "likes": likes,
+            "xp": xp,
+        }
+
+    def append_daily(self, uid: str, when: datetime, row: Dict[str, object]) -> None:
+        """Insert the row, then refresh the month's CSV and everything derived from it.
+
+        The summary comes from ``month_stats``; history, bundle and root mirrors are
+        updated as the CSV backend does, so the dashboard never needs a manual export.
+        """
+        from scripts import fetch_and_append as daily
+
+        self.insert_daily(uid, [row])
+        iso = to_iso(str(row["Date"]))
+        player_dir = daily.ensure_player_dir(uid)
+        with player_lock(player_dir):
+            path = player_dir / month_filename(iso)
+            with stage("csv_write"):
+                write_month_csv(path, self.daily_rows(uid, iso[:7]))
+            with stage("summary"):
+                daily.write_summary_csv(
+                    player_dir / "summary.csv", daily.build_summary_rows(self.month_stats(uid))
+                )
+            with stage("history"):
+                append_history(player_dir, row, list(daily.iter_monthly_files(uid)))
+            with stage("bundle"):
+                write_bundle(player_dir)
+            daily.sync_default_exports(uid, path)
+
+    def insert_daily(self, uid: str, rows: List[Dict[str, object]]) -> None:
+        records = []
+        for row in rows:
+            date_str = str(row.get("Date") or "").strip()
+            if not date_str:
+                continue
+            values = [to_int(row.get(header)) for _, header in DAILY_COLUMNS]
+            records.append((uid, to_iso(date_str), *values, str(row.get("Notes") or "")))
+        with stage("sqlite"), self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+
+    def likes_success_logged(self, uid: str, date_str: str) -> bool:
+        with stage("sqlite"), self.lock:
+            found = self.connection.execute(
+                "SELECT 1 FROM likes_log WHERE uid = ? AND date = ? AND success = 1 LIMIT 1",
+                (uid, date_str),
+            ).fetchone()
+        return found is not None
+
+    def append_likes(
+        self,
+        uid: str,
+        date_str: str,
+        likes_before: int,
+        likes_after: int,
+        likes_received: int,
+        success: bool,
+    ) -> None:
+        """Insert the log row, then rewrite the player's ``likes_activity.csv``, mirror and bundle."""
+        from scripts import send_likes
+
+        with stage("sqlite"), self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO likes_log (uid, date, likes_before, likes_after, likes_received, success)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (uid, date_str, likes_before, likes_after, likes_received, int(success)),
+            )
+        path = send_likes.ensure_player_dir(uid) / "likes_activity.csv"
+        with player_lock(path.parent):
+            with stage("csv_write"):
+                write_likes_csv(path, self.likes_rows(uid))
+            send_likes.sync_default_likes_log(uid, path)
+            with stage("bundle"):
+                write_bundle(path.parent)
+
+    def uids(self) -> List[str]:
+        with self.lock:
+            found = self.connection.execute(
+                "SELECT uid FROM daily UNION SELECT uid FROM likes_log ORDER BY uid"
+            ).fetchall()
+        return [uid for (uid,) in found]
+
+    def month_stats(self, uid: str) -> List[Tuple[int, int, Dict[str, float]]]:
+        """Compute the per-month summary stats in SQL, matching ``load_monthly_stats``."""
+        with self.lock:
+            found = self.connection.execute(MONTH_STATS_SQL, (uid,)).fetchall()
+        month_stats = []
+        for year, month, days_logged, start_xp, end_xp, gain_sum, gain_count in found:
+            total_gain = gain_sum if gain_count else end_xp - start_xp
+            stats: Dict[str, float] = {
+                "start_xp": start_xp,
+                "end_xp": end_xp,
+                "total_gain": total_gain,
+                "days_logged": days_logged,
+                "avg_gain": total_gain / days_logged if days_logged else 0,
+            }
+            month_stats.append((year, month, stats))
+        return month_stats
+
+    def daily_rows(self, uid: str, month: Optional[str] = None) -> List[Tuple]:
+        """Return the player's daily rows, or only those of ``month`` (``YYYY-MM``)."""
+        query = (
+            "SELECT date, br, rank_gained, likes, likes_gained, xp, xp_gained, notes"
+            " FROM daily WHERE uid = ?"
+        )
+        params: Tuple[str, ...] = (uid,)
+        if month is not None:
+            query += " AND substr(date, 1, 7) = ?"
+            params = (uid, month)
+        with stage("sqlite"), self.lock:
+            return self.connection.execute(query + " ORDER BY date", params).fetchall()
+
+    def likes_rows(self, uid: str) -> List[Tuple]:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT date, likes_before, likes_after, likes_received, success"
+                " FROM likes_log WHERE uid = ? ORDER BY id",
+                (uid,),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def determine_sqlite_path() -> Path:
+    raw = os.getenv("FREEFIRE_SQLITE_PATH")
+    return Path(raw) if raw else PROJECT_ROOT / DEFAULT_SQLITE_PATH
+
+
+def open_backend(full_rebuild: bool = False) -> StorageBackend:
+    """Return the backend named by ``FREEFIRE_STORAGE`` (``csv`` or ``sqlite``)."""
+    name = (os.getenv("FREEFIRE_STORAGE") or DEFAULT_STORAGE_BACKEND).strip().lower()
+    if name == "sqlite":
+        return SqliteBackend(determine_sqlite_path())
+    if name != "csv":
+        raise ValueError(f"Unknown FREEFIRE_STORAGE backend: {name}")
+    return CsvBackend(full_rebuild)
+
+
+def cell(value: object) -> object:
+    return "" if value is None else value
+
+
+def write_month_csv(path: Path, records: Sequence[Tuple]) -> bool:
+    """Write ``daily_rows`` records as a monthly CSV unless unchanged; return True if written."""
+    from scripts.fetch_and_append import MONTHLY_HEADER
+    from scripts.journal import render_csv
+
+    rows = [[from_iso(iso), *(cell(value) for value in values), notes] for iso, *values, notes in records]
+    return write_if_changed(path, render_csv(MONTHLY_HEADER, rows))
+
+
+def write_likes_csv(path: Path, records: Sequence[Tuple]) -> bool:
+    """Write ``likes_rows`` records as a likes log unless unchanged; return True if written."""
+    from scripts.journal import render_csv
+    from scripts.send_likes import LIKES_LOG_HEADER
+
+    rows = [
+        [iso, before, after, received, "TRUE" if success else "FALSE"]
+        for iso, before, after, received, success in records
+    ]
+    return write_if_changed(path, render_csv(LIKES_LOG_HEADER, rows))
+
+
+def export_player(backend: SqliteBackend, uid: str, output_dir: Path) -> int:
+    """Write one player's monthly CSVs, summary.csv and likes log; return the file count."""
+    from scripts.fetch_and_append import build_summary_rows, write_summary_csv
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    by_month: Dict[str, List[Tuple]] = {}
+    for record in backend.daily_rows(uid):
+        by_month.setdefault(month_filename(record[0]), []).append(record)
+
+    for filename, records in by_month.items():
+        write_month_csv(output_dir / filename, records)
+
+    written = len(by_month)
+    if by_month:
+        write_summary_csv(output_dir / "summary.csv", build_summary_rows(backend.month_stats(uid)))
+        written += 1
+
+    likes = backend.likes_rows(uid)
+    if likes:
+        write_likes_csv(output_dir / "likes_activity.csv", likes)
+        written += 1
+    return written
+
+
+def import_player(backend: SqliteBackend, uid: str) -> int:
+    """Load one player's existing CSV tree into SQLite; return the number of daily rows."""
+    from scripts.fetch_and_append import ensure_player_dir, iter_monthly_files
+
+    rows: List[Dict[str, object]] = []
+    for path in iter_monthly_files(uid):
+        with path.open("r", newline="", encoding="utf-8") as handle:
+            rows.extend(csv.DictReader(handle))
+    backend.insert_daily(uid, rows)
+
+    log_path = ensure_player_dir(uid) / "likes_activity.csv"
+    if log_path.exists():
+        with log_path.open("r", newline="", encoding="utf-8") as handle:
+            records = [
+                (
+                    uid,
+                    row.get("Date") or "",
+                    to_int(row.get("Likes Before")) or 0,
+                    to_int(row.get("Likes After")) or 0,
+                    to_int(row.get("Likes Received")) or 0,
+                    int((row.get("Success") or "").strip().lower() == "true"),
+                )
+                for row in csv.DictReader(handle)
+            ]
+        # One transaction, so a failed import never leaves the player's log half replaced.
+        with stage("sqlite"), backend.lock, backend.connection:
+            backend.connection.execute("DELETE FROM likes_log WHERE uid = ?", (uid,))
+            backend.connection.executemany(
+                "INSERT INTO likes_log (uid, date, likes_before, likes_after, likes_received, success)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                records,
+            )
+    return len(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from scripts.fetch_and_append import PLAYERS_DIR
+    from scripts.profiling import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Move player data between SQLite and CSV.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("uids", nargs="*", help="UIDs to process (defaults to every known player)")
+    parser.add_argument("--db", type=Path, default=None, help="SQLite database path")
+    parser.add_argument("--out", type=Path, default=PLAYERS_DIR, help="export root directory")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    backend = SqliteBackend(args.db or determine_sqlite_path())
+    try:
+        with profiled(f"storage_{args.command}", args.profile):
+            if args.command == "import":
+                uids = args.uids or sorted(
+                    path.name for path in PLAYERS_DIR.iterdir() if path.is_dir()
+                )
+                for uid in uids:
+                    print(f"[{uid}] Imported {import_player(backend, uid)} daily rows.")
+            else:
+                for uid in args.uids or backend.uids():
+                    print(f"[{uid}] Exported {export_player(backend, uid, args.out / uid)} file(s).")
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Local stand-in for the profile info and likes APIs, for load tests and offline runs.
+
+``/info?uid=`` answers with the ``basicInfo`` fields the fetcher reads and
+``/api/sg/<uid>?key=`` with the likes API's response shape. Every UID gets a
+deterministic profile that progresses by one simulated day every
+``--day-seconds``; a granted likes boost is reflected in later ``/info`` calls
+and a second request on the same simulated day is refused, like the real API.
+Latency, HTTP errors, rate limiting and refused likes can be injected to
+exercise the client's retries, breaker and the likes dispatcher.
+``/__stats`` returns the request counters.
+
+Usage::
+
+    python -m scripts.stub_api [--port 8765] [--latency uniform:0.02:0.2]
+        [--error-rate 0.02] [--rate-limit 50] [--likes-fail-rate 0.1]
+
+    FREEFIRE_API_BASE_URL=http://127.0.0.1:8765 \\
+    FREEFIRE_LIKES_API_BASE_URL=http://127.0.0.1:8765/api/sg \\
+        python scripts/fetch_and_append.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_PORT = 8765
+ERROR_STATUSES = (500, 502, 503)
+
+Latency = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> Latency:
+    """Parse ``fixed:S``, ``uniform:A:B``, ``normal:MEAN:SD`` or ``lognormal:MU:SIGMA`` (seconds)."""
+    kind, _, raw = spec.partition(":")
+    params = [float(part) for part in raw.split(":") if part]
+    kind = kind.strip().lower()
+    if kind in ("", "none"):
+        return lambda rng: 0.0
+    if kind == "fixed" and len(params) == 1:
+        return lambda rng: params[0]
+    if kind == "uniform" and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal" and len(params) == 2:
+        return lambda rng: max(rng.gauss(params[0], params[1]), 0.0)
+    if kind == "lognormal" and len(params) == 2:
+        return lambda rng: rng.lognormvariate(params[0], params[1])
+    raise ValueError(f"Unsupported latency spec: {spec!r}")
+
+
+@dataclass
+class StubConfig:
+    latency: str = "none"
+    error_rate: float = 0.0
+    rate_limit: float = 0.0  # requests per second across all clients; 0 disables
+    likes_fail_rate: float = 0.0
+    day_seconds: float = 86400.0
+    seed: int = 0
+
+
+class PlayerSim:
+    """Deterministic per-UID profile that advances one step per simulated day."""
+
+    def __init__(self, uid: str, seed: int) -> None:
+        self.rng = random.Random(f"{seed}:{uid}")
+        self.br = [self.rng.randint(1_000, 6_000)]
+        self.likes = [self.rng.randint(1_000, 150_000)]
+        self.xp = [self.rng.randint(1_000_000, 12_000_000)]
+        self.granted: Dict[int, int] = {}
+
+    def advance_to(self, day: int) -> None:
+        while len(self.xp) <= day:
+            self.br.append(max(self.br[-1] + self.rng.randint(-60, 150), 0))
+            self.likes.append(self.likes[-1] + self.rng.randint(0, 300))
+            self.xp.append(self.xp[-1] + self.rng.randint(0, 40_000))
+
+    def snapshot(self, day: int) -> Tuple[int, int, int]:
+        self.advance_to(day)
+        boosted = sum(amount for granted_day, amount in self.granted.items() if granted_day <= day)
+        return self.br[day], self.likes[day] + boosted, self.xp[day]
+
+
+class StubState:
+    def __init__(self, config: StubConfig) -> None:
+        self.config = config
+        self.latency = parse_latency(config.latency)
+        self.rng = random.Random(config.seed)
+        self.started = time.monotonic()
+        self.players: Dict[str, PlayerSim] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.window_start = 0
+        self.window_count = 0
+        self.lock = threading.Lock()
+
+    def today(self) -> int:
+        if self.config.day_seconds <= 0:
+            return 0
+        return int((time.monotonic() - self.started) / self.config.day_seconds)
+
+    def player(self, uid: str) -> PlayerSim:
+        if uid not in self.players:
+            self.players[uid] = PlayerSim(uid, self.config.seed)
+        return self.players[uid]
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counters[key] += 1
+
+    def roll(self, probability: float) -> bool:
+        with self.lock:
+            return probability > 0 and self.rng.random() < probability
+
+    def error_status(self) -> int:
+        with self.lock:
+            return self.rng.choice(ERROR_STATUSES)
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.latency(self.rng)
+
+    def rate_limited(self) -> bool:
+        if self.config.rate_limit <= 0:
+            return False
+        with self.lock:
+            second = int(time.monotonic())
+            if second != self.window_start:
+                self.window_start = second
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count > self.config.rate_limit
+
+    def info(self, uid: str) -> Dict[str, object]:
+        with self.lock:
+            br, likes, xp = self.player(uid).snapshot(self.today())
+        return {
+            "basicInfo": {
+                "accountId": uid,
+                "nickname": f"Stub{uid[-4:]}",
+                "rankingPoints": br,
+                "liked": likes,
+                "exp": xp,
+            }
+        }
+
+    def grant_likes(self, uid: str) -> Dict[str, object]:
+        if self.roll(self.config.likes_fail_rate):
+            return {"status": 0, "message": "Failed to send likes, try again later"}
+        with self.lock:
+            day = self.today()
+            player = self.player(uid)
+            _, before, _ = player.snapshot(day)
+            if day in player.granted:
+                return {
+                    "status": 2,
+                    "message": "Likes already sent today",
+                    "response": {"UID": uid, "LikesbeforeCommand": before, "LikesGivenByAPI": 0},
+                }
+            amount = self.rng.randint(90, 100)
+            player.granted[day] = amount
+        return {
+            "status": 1,
+            "response": {
+                "UID": uid,
+                "PlayerNickname": f"Stub{uid[-4:]}",
+                "LikesbeforeCommand": before,
+                "LikesafterCommand": before + amount,
+                "LikesGivenByAPI": amount,
+            },
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        segments = [part for part in url.path.split("/") if part]
+        if url.path == "/__stats":
+            with self.state.lock:
+                counters = dict(self.state.counters)
+            self.reply(200, counters)
+            return
+
+        self.state.count("requests")
+        delay = self.state.delay()
+        if delay > 0:
+            time.sleep(delay)
+        if self.state.rate_limited():
+            self.state.count("rate_limited")
+            self.reply(429, {"error": "Too many requests"}, {"Retry-After": "1"})
+            return
+        if self.state.roll(self.state.config.error_rate):
+            self.state.count("errors")
+            self.reply(self.state.error_status(), {"error": "Injected failure"})
+            return
+
+        if url.path.rstrip("/") == "/info":
+            uid = (query.get("uid") or [""])[0]
+            if not uid.isdigit():
+                self.reply(400, {"error": "uid is required"})
+                return
+            self.state.count("info")
+            self.reply(200, self.state.info(uid))
+        elif segments and segments[-1].isdigit():
+            self.state.count("likes")
+            self.reply(200, self.state.grant_likes(segments[-1]))
+        else:
+            self.reply(404, {"error": "Not found"})
+
+    def reply(self, status: int, payload: Dict[str, object], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+def make_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve in a background thread; return the server and its base URL."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", default="none", help="fixed:S, uniform:A:B, normal:M:SD or lognormal:MU:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 5xx")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second before answering 429")
+    parser.add_argument("--likes-fail-rate", type=float, default=0.0, help="share of likes calls refused (status 0)")
+    parser.add_argument("--day-seconds", type=float, default=86400.0, help="wall-clock length of a simulated day")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        likes_fail_rate=args.likes_fail_rate,
+        day_seconds=args.day_seconds,
+        seed=args.seed,
+    )
+    parse_latency(config.latency)
+    server = make_server(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Stub API listening on http://{host}:{port} (likes at /api/sg/<uid>).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
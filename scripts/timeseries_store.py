@@ -0,0 +1,281 @@
+"""Optional memory-mapped columnar store of each player's daily progress.
+
+Every column lives in ``players/<UID>/series/<column>.i64`` as a flat array of
+little-endian int64 values, one entry per logged day, so the files can be
+memory-mapped and viewed as NumPy arrays without copying. Blank CSV cells are
+stored as ``MISSING``. The store is opt-in per player: run ``build`` once and
+``fetch_and_append`` keeps it in sync from then on.
+
+Usage::
+
+    python -m scripts.timeseries_store build [UID ...]
+    python -m scripts.timeseries_store export [UID ...] [--out DIR]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import mmap
+import shutil
+import sys
+from array import array
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+try:  # NumPy is optional; without it the columns are exposed as memoryviews.
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from scripts.safe_io import atomic_open
+
+SERIES_DIRNAME = "series"
+COLUMNS = ("day", "br", "rank_gained", "likes", "likes_gained", "xp", "xp_gained")
+CSV_COLUMNS = {
+    "br": "BR Score",
+    "rank_gained": "Rank Gained",
+    "likes": "Likes",
+    "likes_gained": "Likes Gained",
+    "xp": "XP",
+    "xp_gained": "XP Gained",
+}
+MISSING = -(2**63)
+ITEM_SIZE = 8
+
+
+def series_dir(player_dir: Path) -> Path:
+    return player_dir / SERIES_DIRNAME
+
+
+def store_exists(player_dir: Path) -> bool:
+    return (series_dir(player_dir) / "day.i64").exists()
+
+
+def column_path(player_dir: Path, column: str) -> Path:
+    return series_dir(player_dir) / f"{column}.i64"
+
+
+def parse_day(date_str: str) -> int:
+    return datetime.strptime(date_str.strip(), "%m/%d/%Y").date().toordinal()
+
+
+def format_day(ordinal: int) -> str:
+    day = date.fromordinal(ordinal)
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+def encode(value: object) -> int:
+    if value is None or value == "":
+        return MISSING
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().replace(",", "")
+    try:
+        return int(text)
+    except ValueError:
+        return MISSING
+
+
+def decode(value: int) -> str:
+    return "" if value == MISSING else str(value)
+
+
+def row_count(player_dir: Path) -> int:
+    """Return the number of complete rows, ignoring a partially written tail."""
+    sizes = []
+    for column in COLUMNS:
+        path = column_path(player_dir, column)
+        sizes.append(path.stat().st_size // ITEM_SIZE if path.exists() else 0)
+    return min(sizes)
+
+
+def last_day(player_dir: Path) -> Optional[int]:
+    count = row_count(player_dir)
+    if not count:
+        return None
+    with column_path(player_dir, "day").open("rb") as handle:
+        handle.seek((count - 1) * ITEM_SIZE)
+        values = array("q")
+        values.frombytes(handle.read(ITEM_SIZE))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values[0]
+
+
+def write_columns(player_dir: Path, rows: Iterable[Dict[str, int]], mode: str) -> None:
+    columns: Dict[str, array] = {column: array("q") for column in COLUMNS}
+    for row in rows:
+        for column in COLUMNS:
+            columns[column].append(row[column])
+    target = series_dir(player_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    for column, values in columns.items():
+        if sys.byteorder != "little":
+            values.byteswap()
+        with column_path(player_dir, column).open(mode) as handle:
+            values.tofile(handle)
+
+
+def encode_row(row: Dict[str, object]) -> Optional[Dict[str, int]]:
+    date_str = str(row.get("Date") or "").strip()
+    if not date_str:
+        return None
+    encoded = {"day": parse_day(date_str)}
+    for column, header in CSV_COLUMNS.items():
+        encoded[column] = encode(row.get(header))
+    return encoded
+
+
+def append_row(player_dir: Path, row: Dict[str, object]) -> bool:
+    """Append one monthly CSV row to an existing store; return False if it was skipped."""
+    if not store_exists(player_dir):
+        return False
+    encoded = encode_row(row)
+    if encoded is None:
+        return False
+    count = row_count(player_dir)
+    previous = last_day(player_dir)
+    if previous is not None and encoded["day"] <= previous:
+        return False
+    for column in COLUMNS:
+        path = column_path(player_dir, column)
+        if path.stat().st_size != count * ITEM_SIZE:
+            with path.open("r+b") as handle:
+                handle.truncate(count * ITEM_SIZE)
+    write_columns(player_dir, [encoded], "ab")
+    return True
+
+
+def open_columns(player_dir: Path) -> Dict[str, Sequence[int]]:
+    """Memory-map every column read-only.
+
+    Returns ``numpy.memmap`` arrays when NumPy is installed, otherwise int64
+    memoryviews over the mapped files. Neither copies the underlying data.
+    """
+    count = row_count(player_dir)
+    columns: Dict[str, Sequence[int]] = {}
+    for column in COLUMNS:
+        path = column_path(player_dir, column)
+        if np is not None:
+            if count:
+                columns[column] = np.memmap(path, dtype="<i8", mode="r", shape=(count,))
+            else:
+                columns[column] = np.empty(0, dtype="<i8")
+            continue
+        if not count:
+            columns[column] = memoryview(array("q"))
+            continue
+        with path.open("rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), count * ITEM_SIZE, access=mmap.ACCESS_READ)
+        columns[column] = memoryview(mapped).cast("q")
+    return columns
+
+
+def month_slice(days: Sequence[int], year: int, month: int) -> slice:
+    """Return the row range of the given month within the sorted day column."""
+    start = date(year, month, 1).toordinal()
+    end = date(year + month // 12, month % 12 + 1, 1).toordinal()
+    if np is not None and isinstance(days, np.ndarray):
+        lo, hi = np.searchsorted(days, [start, end])
+        return slice(int(lo), int(hi))
+    from bisect import bisect_left
+
+    return slice(bisect_left(days, start), bisect_left(days, end))
+
+
+def build_store(uid: str) -> int:
+    """(Re)create a player's store from their monthly CSVs and return the row count."""
+    from scripts.fetch_and_append import ensure_player_dir
+    from scripts.player_history import PlayerHistory
+
+    player_dir = ensure_player_dir(uid)
+    history = PlayerHistory.load(player_dir)
+    rows: List[Dict[str, int]] = []
+    for index, day in enumerate(history.days):
+        if day != MISSING:
+            encoded = {"day": day}
+            for column in CSV_COLUMNS:
+                encoded[column] = history.columns[column][index]
+            rows.append(encoded)
+    rows.sort(key=lambda item: item["day"])
+    target = series_dir(player_dir)
+    if target.exists():
+        shutil.rmtree(target)
+    write_columns(player_dir, rows, "wb")
+    return len(rows)
+
+
+def export_csvs(uid: str, output_dir: Optional[Path] = None) -> List[Path]:
+    """Regenerate the monthly CSVs from the store.
+
+    Notes are not part of the store; they are carried over from the existing
+    monthly files (live or archived) for the same date when one is present.
+    """
+    from scripts.fetch_and_append import MONTHLY_HEADER, ensure_player_dir
+    from scripts.player_history import PlayerHistory
+
+    player_dir = ensure_player_dir(uid)
+    if not store_exists(player_dir):
+        raise FileNotFoundError(f"No time-series store for UID {uid}; run 'build' first")
+    target_dir = output_dir or player_dir
+    target_dir.mkdir(parents=True, exist_ok=True)
+    columns = open_columns(player_dir)
+
+    by_month: Dict[tuple, List[int]] = defaultdict(list)
+    for index, ordinal in enumerate(columns["day"]):
+        day = date.fromordinal(int(ordinal))
+        by_month[(day.year, day.month)].append(index)
+
+    history = PlayerHistory.load(player_dir)
+    notes = {history.days[index]: text for index, text in sorted(history.notes.items())}
+    written: List[Path] = []
+    for (year, month), indexes in sorted(by_month.items()):
+        filename = f"{year} {month:02d}.CSV"
+        path = target_dir / filename
+        with atomic_open(path) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(MONTHLY_HEADER)
+            for index in indexes:
+                date_str = format_day(int(columns["day"][index]))
+                values = {
+                    header: decode(int(columns[column][index]))
+                    for column, header in CSV_COLUMNS.items()
+                }
+                values["Date"] = date_str
+                values["Notes"] = notes.get(int(columns["day"][index]), "")
+                writer.writerow([values.get(column, "") for column in MONTHLY_HEADER])
+        written.append(path)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from scripts.fetch_and_append import determine_target_uids
+    from scripts.profiling import add_profile_argument, profiled
+
+    parser = argparse.ArgumentParser(description="Manage the per-player columnar time-series store.")
+    parser.add_argument("command", choices=["build", "export"])
+    parser.add_argument("uids", nargs="*", help="UIDs to process (defaults to FREEFIRE_UIDS)")
+    parser.add_argument("--out", type=Path, help="export into this directory instead of players/<UID>/")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    with profiled(f"timeseries_store_{args.command}", args.profile):
+        for uid in args.uids or determine_target_uids():
+            if args.command == "build":
+                count = build_store(uid)
+                print(f"[{uid}] Built time-series store with {count} rows.")
+            else:
+                output_dir = args.out / uid if args.out else None
+                paths = export_csvs(uid, output_dir)
+                print(f"[{uid}] Exported {len(paths)} monthly CSV(s).")
+
+
+if __name__ == "__main__":
+    main()